@@ -80,6 +80,19 @@ ResourceProductionDict: dict = {
     }
 }
 
+ResourceBuildingTiersDict: dict = {
+    "IronMine": "t1",
+    "Lumberyard": "t1",
+    "Tannery": "t1",
+    "Garden": "t1",
+    "Smelter": "t2",
+    "Sawmill": "t2",
+    "WeaverMill": "t2",
+    "OilPress": "t2",
+    "EtherWell": "t3",
+    "JewelStorehouse": "t3"
+}
+
 ResourceBuildingsTranslationDict: dict = {
     "IronMine": "iron",
     "Lumberyard": "wood",
@@ -93,3 +106,35 @@ ResourceBuildingsTranslationDict: dict = {
     "EtherWell": "ether",
     "JewelStorehouse": "jewels"
 }
+
+# crafting slots the sweep and the planner assume when none are passed
+DEFAULT_CRAFTING_SLOTS = 10
+
+# selling price multipliers of a surcharged and a discounted sale
+SURCHARGE_MULTIPLIER = 2
+DISCOUNT_MULTIPLIER = 0.5
+
+# item type ascension level -> value increase and crafting time reduction, every level includes the lower ones
+AscensionBonusesDict: dict = {
+    0: {"value": 0, "crafting_time": 0},
+    1: {"value": 0.05, "crafting_time": 0},
+    2: {"value": 0.05, "crafting_time": 0.05},
+    3: {"value": 0.1, "crafting_time": 0.05},
+    4: {"value": 0.1, "crafting_time": 0.1},
+    5: {"value": 0.15, "crafting_time": 0.1}
+}
+
+# enchantments ascend as two item types, told apart by the last word of their name
+EnchantmentAscensionsDict: dict = {
+    "Element": "Element",
+    "Spirit": "Spirit"
+}
+
+# chance of a craft coming out in every quality above Normal and its value multiplier, Normal takes the rest.
+# "Quality Chance xN" upgrades multiply the chances
+QualityDict: dict = {
+    "Superior": {"chance": 0.1, "value": 1.25},
+    "Flawless": {"chance": 0.02, "value": 2},
+    "Epic": {"chance": 0.004, "value": 3},
+    "Legendary": {"chance": 0.001, "value": 5}
+}
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # load the game data once per process, every request reuses it
+        from .calculator import calculator
+        calculator.load()
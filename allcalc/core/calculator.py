@@ -0,0 +1,174 @@
+"""
+Warm calculation state of the web app. The game data is loaded once when
+the app starts and every request only scores a player config against it.
+When main.py regenerates the snapshot, the next request loads the new one.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+
+# the calculator modules live in the repository root, next to the django project
+REPOSITORY_ROOT = str(settings.BASE_DIR.parent)
+if REPOSITORY_ROOT not in sys.path:
+    sys.path.append(REPOSITORY_ROOT)
+
+from blueprint_catalogue import GameDataset  # noqa: E402
+from config_validation import InvalidConfigError, validate_player_config  # noqa: E402
+from game_data import DATA_DIRECTORY, MANIFEST_FILE, read_manifest  # noqa: E402
+from ranking import candidate_mask, query_from_dict, rank, ranking_rows  # noqa: E402
+from result_cache import CACHE_DIRECTORY, ResultCache, cache_key  # noqa: E402
+
+DATA_PATH = os.path.join(REPOSITORY_ROOT, DATA_DIRECTORY)
+# shared with the CLI, results calculated by either are served to both
+CACHE_PATH = os.path.join(REPOSITORY_ROOT, CACHE_DIRECTORY)
+# API responses are cached next to the CLI result files under their own format
+API_FORMAT = 'api'
+
+
+class CalculationError(ValueError):
+    pass
+
+
+class Snapshot(NamedTuple):
+    manifest: dict
+    dataset: GameDataset
+
+
+def data_identity(manifest):
+    """
+    :return: what the calculation reads from a snapshot, a manifest with the same identity needs no reload
+    """
+    return manifest.get('version'), manifest.get('shared_hash'), manifest.get('blueprints_hash')
+
+
+class WarmCalculator:
+    def __init__(self, data_directory=DATA_PATH, cache_directory=CACHE_PATH):
+        self.data_directory = data_directory
+        self.cache = ResultCache(cache_directory)
+        # manifest and dataset are swapped together, a request never sees one without the other
+        self.snapshot = None
+        # modification time of the manifest the snapshot was checked against
+        self._manifest_mtime = None
+        self._reload_lock = threading.Lock()
+
+    def _manifest_modified(self):
+        try:
+            return os.stat(os.path.join(self.data_directory, MANIFEST_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        """
+        Maps the snapshot into memory. Called once at app startup, the
+        catalogue caches (upgrades, indexes, component graph) are built here
+        too so the first request does not pay for them.
+        """
+        self._manifest_mtime = self._manifest_modified()
+        manifest = read_manifest(self.data_directory)
+        if manifest is None:
+            # no snapshot yet, python main.py -g creates it
+            self.snapshot = None
+            return
+        if self.snapshot is not None and data_identity(manifest) == data_identity(self.snapshot.manifest):
+            # regenerated from a spreadsheet that changed nothing the calculation reads
+            self.snapshot = Snapshot(manifest, self.snapshot.dataset)
+            return
+        dataset = GameDataset.load(self.data_directory)
+        catalogue = dataset.catalogue
+        catalogue.upgraded()
+        catalogue.index()
+        catalogue.energy()
+        catalogue.component_graph()
+        catalogue.component_amounts()
+        catalogue.fingerprints()
+        self.snapshot = Snapshot(manifest, dataset)
+
+    def current(self):
+        """
+        Snapshot to calculate with, reloaded first if the manifest changed
+        since it was loaded. Loading is slow, call it off the event loop.
+        """
+        if self._manifest_modified() != self._manifest_mtime:
+            with self._reload_lock:
+                # another request may have reloaded it while this one waited
+                if self._manifest_modified() != self._manifest_mtime:
+                    self.load()
+        snapshot = self.snapshot
+        if snapshot is None:
+            raise CalculationError('data is not generated, run: python main.py -g')
+        return snapshot
+
+    def validate(self, raw_config, query_data, dataset):
+        """
+        Validates a request like the CLI does, the game data knows the
+        workers and their levels.
+        :param raw_config: player config, like config.json
+        :param query_data: ranking query, see ranking.query_from_dict
+        :param dataset: game data the request is calculated with
+        :return: (player config, query)
+        """
+        try:
+            player_config = validate_player_config(raw_config, dataset)
+        except InvalidConfigError as error:
+            raise CalculationError(f'invalid config ({error})')
+        try:
+            query = query_from_dict(query_data or dict())
+        except (TypeError, ValueError, AttributeError) as error:
+            raise CalculationError(f'invalid request ({error})')
+        return player_config, query
+
+    def prepare(self, raw_config, query_data=None):
+        """
+        Validates a request and finds its cache key. The snapshot may need a
+        reload, and the catalogue filters and the dependency key are a pass
+        over every blueprint, so run it off the event loop.
+        :param raw_config: player config, like config.json
+        :param query_data: ranking query, see ranking.query_from_dict
+        :return: (snapshot, player config, query, cache key)
+        """
+        snapshot = self.current()
+        player_config, query = self.validate(raw_config, query_data, snapshot.dataset)
+        try:
+            mask = candidate_mask(snapshot.dataset, query)
+        except ValueError as error:
+            raise CalculationError(f'invalid request ({error})')
+        # only a patch of the queried blueprints or their components invalidates the cached response
+        blueprints_key = snapshot.dataset.catalogue.dependency_key(mask)
+        key = cache_key(raw_config, snapshot.manifest, blueprints_key, output_format=API_FORMAT, query=query)
+        return snapshot, player_config, query, key
+
+    def calculate_prepared(self, snapshot, player_config, query, key):
+        """
+        :return: JSON response body, from the cache if it was calculated before
+        """
+        body = self.cache.get(key)
+        if body is not None:
+            return body
+        started = time.perf_counter()
+        try:
+            ranking = rank(snapshot.dataset, player_config, query)
+        except (KeyError, TypeError, ValueError, AttributeError) as error:
+            raise CalculationError(f'invalid request ({error!r})')
+        body = json.dumps({
+            'snapshot': snapshot.manifest.get('source_hash'),
+            'calculation_ms': round((time.perf_counter() - started) * 1000, 3),
+            'blueprints': ranking_rows(snapshot.dataset, ranking)
+        }).encode('utf-8')
+        self.cache.put(key, body)
+        return body
+
+    def calculate_bytes(self, raw_config, query_data=None):
+        """
+        :param raw_config: player config, like config.json
+        :param query_data: ranking query, see ranking.query_from_dict
+        :return: JSON response body
+        """
+        return self.calculate_prepared(*self.prepare(raw_config, query_data))
+
+
+calculator = WarmCalculator()
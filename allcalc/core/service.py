@@ -0,0 +1,86 @@
+"""
+Async front of the warm calculator for the ASGI app. CPU work runs on a
+bounded thread pool, identical requests that are in flight at the same
+time share one calculation, and new work is refused once too much of it
+is queued, so a burst can not pile up unbounded.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .calculator import calculator
+
+# threads that score configs, numpy releases the GIL for most of the work
+CALCULATION_WORKERS = getattr(settings, 'CALCULATION_WORKERS', os.cpu_count() or 1)
+# requests being prepared plus unique calculations that may be running or queued before requests are refused
+MAX_PENDING_CALCULATIONS = getattr(settings, 'MAX_PENDING_CALCULATIONS', 64)
+
+
+class ServiceOverloaded(Exception):
+    pass
+
+
+class CalculationService:
+    def __init__(self, warm_calculator, workers=CALCULATION_WORKERS, max_pending=MAX_PENDING_CALCULATIONS):
+        self.calculator = warm_calculator
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='calculation')
+        self.max_pending = max_pending
+        # event loop -> cache key -> future, futures can only be awaited on their own loop
+        self._in_flight = weakref.WeakKeyDictionary()
+        # requests admitted to the executor that are still being prepared
+        self._preparing = 0
+        # the service may be shared by the loops of several threads
+        self._lock = threading.Lock()
+
+    def pending(self):
+        return self._preparing + sum(len(in_flight) for in_flight in self._in_flight.values())
+
+    def _admit(self):
+        with self._lock:
+            if self.pending() >= self.max_pending:
+                raise ServiceOverloaded()
+            self._preparing += 1
+
+    def _prepared(self):
+        with self._lock:
+            self._preparing -= 1
+
+    async def calculate(self, raw_config, query_data=None):
+        """
+        :param raw_config: player config, like config.json
+        :param query_data: ranking query, see ranking.query_from_dict
+        :return: JSON response body
+        :raise CalculationError: on invalid requests
+        :raise ServiceOverloaded: if MAX_PENDING_CALCULATIONS are in flight already
+        """
+        loop = asyncio.get_running_loop()
+        # every request queues executor work, so it is admitted before anything is submitted
+        self._admit()
+        try:
+            # validation and the cache key need the catalogue, and maybe a reload of it, so not on the event loop
+            snapshot, player_config, query, key = await loop.run_in_executor(
+                self.executor, self.calculator.prepare, raw_config, query_data
+            )
+        finally:
+            self._prepared()
+        with self._lock:
+            in_flight = self._in_flight.setdefault(loop, dict())
+            future = in_flight.get(key)
+            if future is None:
+                # joining a running calculation is free, only new work counts against the limit
+                if self.pending() >= self.max_pending:
+                    raise ServiceOverloaded()
+                future = loop.run_in_executor(
+                    self.executor, self.calculator.calculate_prepared, snapshot, player_config, query, key
+                )
+                in_flight[key] = future
+                future.add_done_callback(lambda _: in_flight.pop(key, None))
+        # a client that goes away must not cancel the calculation the others wait for
+        return await asyncio.shield(future)
+
+
+service = CalculationService(calculator)
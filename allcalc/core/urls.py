@@ -2,5 +2,7 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('', views.index)
-]
\ No newline at end of file
+    path('', views.index),
+    path('api/calculate', views.calculate),
+    path('api/calculate/async', views.calculate_async)
+]
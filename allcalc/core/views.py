@@ -1,7 +1,59 @@
+import json
+
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .calculator import CalculationError, calculator
+from .service import ServiceOverloaded, service
 
 # Create your views here.
 
 
 def index(request):
     return render(request, 'build/index.html')
+
+
+@api_view(['POST'])
+def calculate(request):
+    """
+    Ranks the blueprints for a player config.
+    Body: {"config": {...config.json...}, "query": {"sort": ..., "top": ..., "tier": ">=8", ...}}
+    """
+    data = request.data
+    if not isinstance(data, dict) or 'config' not in data:
+        return Response({'error': 'body needs a "config" object'}, status=400)
+    try:
+        body = calculator.calculate_bytes(data['config'], data.get('query'))
+    except CalculationError as error:
+        return Response({'error': str(error)}, status=400)
+    # the body is cached JSON already, no need to parse and render it again
+    return HttpResponse(body, content_type='application/json')
+
+
+@csrf_exempt
+async def calculate_async(request):
+    """
+    Same as calculate, for the ASGI app: identical requests in flight share
+    one calculation and a full queue answers 503 instead of waiting. CSRF
+    exempt like the API view, it reads no cookies.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'only POST is allowed'}, status=405)
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'body has to be JSON'}, status=400)
+    if not isinstance(data, dict) or 'config' not in data:
+        return JsonResponse({'error': 'body needs a "config" object'}, status=400)
+    try:
+        body = await service.calculate(data['config'], data.get('query'))
+    except CalculationError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    except ServiceOverloaded:
+        response = JsonResponse({'error': 'too many calculations in progress, try again shortly'}, status=503)
+        response['Retry-After'] = '1'
+        return response
+    return HttpResponse(body, content_type='application/json')
@@ -0,0 +1,126 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from additional_data import AscensionBonusesDict, EnchantmentAscensionsDict
+from class_definitions import Ascensions
+
+ENCHANTMENT_TYPE = "Enchantment"
+
+
+def ascension_type(ascension: str) -> str:
+    # config keys may use "_" where the blueprint types have spaces
+    return ascension.replace("_", " ")
+
+
+# item types in the order of the config, blueprints of any other type have no ascension
+ASCENSION_TYPES: Tuple[str, ...] = tuple(ascension_type(ascension) for ascension in Ascensions.__annotations__)
+# group of the blueprints without an ascension, its level is always 0
+NO_ASCENSION = len(ASCENSION_TYPES)
+
+
+def ascension_bonuses(game_constants: Optional[dict]) -> Optional[Dict[int, dict]]:
+    """
+    :param game_constants: game_constants of a player config
+    :return: ascension bonuses that replace AscensionBonusesDict, None to keep it
+    """
+    return (game_constants or dict()).get("ascension_bonuses")
+
+
+def bonus_multipliers(bonuses: Dict[int, dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :param bonuses: ascension level -> value increase and crafting time reduction, like AscensionBonusesDict,
+        levels may be strings like the keys of a JSON config
+    :return: value and crafting time multiplier of every level up to the highest, levels missing from bonuses keep
+        the bonus of the level below
+    """
+    bonuses = {int(level): bonus for level, bonus in bonuses.items()}
+    max_level = max(bonuses)
+    value_multipliers = np.ones(max_level + 1)
+    time_multipliers = np.ones(max_level + 1)
+    for level in range(max_level + 1):
+        bonus = bonuses.get(level)
+        if bonus is None:
+            value_multipliers[level] = value_multipliers[level - 1]
+            time_multipliers[level] = time_multipliers[level - 1]
+            continue
+        value_multipliers[level] = 1 + bonus["value"]
+        time_multipliers[level] = 1 - bonus["crafting_time"]
+    return value_multipliers, time_multipliers
+
+
+def blueprint_ascension(blueprint_type: str, name: str) -> Optional[str]:
+    """
+    :param blueprint_type: type column of the blueprint
+    :param name: blueprint name, enchantments ascend by the last word of it
+    :return: item type of ASCENSION_TYPES, None if the blueprint has no ascension
+    """
+    if blueprint_type == ENCHANTMENT_TYPE:
+        blueprint_type = EnchantmentAscensionsDict.get(name.rsplit(" ", 1)[-1], blueprint_type)
+    return blueprint_type if blueprint_type in ASCENSION_TYPES else None
+
+
+class AscensionIndex:
+    """
+    Item type of every blueprint as an index into ASCENSION_TYPES, built
+    once per catalogue. The bonuses of a player are one value per type,
+    so applying them is a gather of the per type bonuses by this index
+    and one multiplication over all blueprints.
+    """
+
+    def __init__(self, types: List[str], names: List[str]):
+        positions = {ascension: position for position, ascension in enumerate(ASCENSION_TYPES)}
+        ascensions = [blueprint_ascension(blueprint_type, name) for blueprint_type, name in zip(types, names)]
+        # blueprints, index into ASCENSION_TYPES or NO_ASCENSION
+        self.types = np.array(
+            [NO_ASCENSION if ascension is None else positions[ascension] for ascension in ascensions],
+            dtype=np.int64
+        )
+        # level -> multiplier of AscensionBonusesDict
+        self.value_multipliers, self.time_multipliers = bonus_multipliers(AscensionBonusesDict)
+        self.max_level = len(self.value_multipliers) - 1
+
+    def uses_type(self, ascension: str) -> np.ndarray:
+        """
+        :param ascension: config key or item type, e.g. "Herbal_Medicine"
+        :return: mask of the blueprints that ascend with it
+        """
+        ascension = ascension_type(ascension)
+        if ascension not in ASCENSION_TYPES:
+            return np.zeros(len(self.types), dtype=bool)
+        return self.types == ASCENSION_TYPES.index(ascension)
+
+    def levels(self, ascensions: Dict[str, int], max_level: int = None) -> np.ndarray:
+        """
+        :param ascensions: config key or item type -> ascension level
+        :param max_level: highest level with a bonus, the one of AscensionBonusesDict if None
+        :return: level of every ASCENSION_TYPES entry, plus 0 for NO_ASCENSION
+        """
+        levels = np.zeros(len(ASCENSION_TYPES) + 1, dtype=np.int64)
+        for ascension, level in ascensions.items():
+            ascension = ascension_type(ascension)
+            # unset keys of the config are None, e.g. Herbal_Medicine next to "Herbal Medicine"
+            if level is not None and ascension in ASCENSION_TYPES:
+                levels[ASCENSION_TYPES.index(ascension)] = level
+        return np.clip(levels, 0, self.max_level if max_level is None else max_level)
+
+    def apply(self, values: np.ndarray, crafting_times: np.ndarray, ascensions: Dict[str, int],
+              rows: np.ndarray = None, bonuses: Dict[int, dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param values: upgraded values, aligned with rows
+        :param crafting_times: upgraded crafting times, aligned with rows
+        :param ascensions: config key or item type -> ascension level
+        :param rows: catalogue indexes of values and crafting_times, all blueprints if None
+        :param bonuses: bonuses per level, see ascension_bonuses, AscensionBonusesDict if None
+        :return: values (whole gold, like upgrades) and crafting times with the ascension bonuses
+        """
+        value_multipliers, time_multipliers = self.value_multipliers, self.time_multipliers
+        if bonuses is not None:
+            value_multipliers, time_multipliers = bonus_multipliers(bonuses)
+        types = self.types if rows is None else self.types[rows]
+        levels = self.levels(ascensions, len(value_multipliers) - 1)
+        values = np.trunc(values * value_multipliers[levels][types])
+        crafting_times = crafting_times * time_multipliers[levels][types]
+        return values, crafting_times
@@ -0,0 +1,44 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import json
+import os
+import re
+import sys
+from typing import Iterator, Tuple
+
+# key of a JSONL document that names the player, optional
+PLAYER_NAME_KEY = "name"
+
+
+def iter_player_configs(source: str) -> Iterator[Tuple[str, dict]]:
+    """
+    Streams player configs from a directory of JSON files (one player per
+    file, named after the file) or from a JSONL file where every line is
+    one config. "-" reads JSONL from stdin.
+    :param source: directory, JSONL file or "-"
+    :return: iterator of (player name, raw config)
+    """
+    if os.path.isdir(source):
+        for file_name in sorted(os.listdir(source)):
+            if not file_name.endswith(".json"):
+                continue
+            with open(os.path.join(source, file_name)) as config_file:
+                yield os.path.splitext(file_name)[0], json.load(config_file)
+        return
+    stream = sys.stdin if source == "-" else open(source)
+    try:
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            raw_config = json.loads(line)
+            yield str(raw_config.get(PLAYER_NAME_KEY, f"player_{line_number}")), raw_config
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def player_result_path(output_directory: str, player_name: str, extension: str = ".txt") -> str:
+    # player names come from user input, keep them to safe file names
+    safe_name = re.sub(r"[^\w\- ]", "_", player_name).strip() or "player"
+    return os.path.join(output_directory, safe_name + extension)
@@ -0,0 +1,355 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from typing import Dict, List
+
+import numpy as np
+
+from additional_data import ResourceBuildingTiersDict, ResourceProductionDict
+from blueprint_catalogue import COMPONENT_COLUMNS, EMPTY_CELL, WORKER_COLUMNS, GameDataset
+from class_definitions import Ascensions, BuildingLevels, ShopTitansPlayerConfig, WorkerLevels, \
+    WorkerTranslationDict
+from game_data import write_snapshot
+from incremental import IncrementalCalculator
+from ranking import RankingQuery, rank
+from scoring_engine import RESOURCES
+from upgrade_effects import UPGRADE_KEYS
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_PLAYERS = 20
+# writing every blueprint of a big catalogue is the slowest stage, so only this many players are written
+DEFAULT_OUTPUT_PLAYERS = 1
+DEFAULT_SEED = 0
+# a stage counts as a regression when it is this much slower than the baseline
+DEFAULT_TOLERANCE = 0.2
+
+MAX_TIER = 15
+MAX_WORKER_LEVEL = 40
+QUEST_COMPONENTS = tuple(f"Quest Component {number}" for number in range(1, 27))
+# upgrade texts as they appear in the spreadsheet, filled in per blueprint
+UPGRADE_TEMPLATES = (
+    "x1.25 Value Increase",
+    "x1.5 Value Increase",
+    "-20% Craft Time Reduction",
+    "-25% Craft Time Reduction",
+    "Quality Chance x2",
+    "Quality Chance x3",
+    "+10% Multicraft Chance",
+    "-{amount} {resource} Spent",
+    "-1 {component} Spent"
+)
+
+
+def synthetic_sheets(size: int, rng: np.random.Generator) -> Dict[str, Dict[str, list]]:
+    """
+    Blueprints, Workers and Worker Levels sheets shaped like the ones read
+    from the spreadsheet, with random numbers and upgrade texts. Components
+    are quest components or blueprints earlier in the catalogue, so the
+    component graph stays acyclic like the real one.
+    :param size: number of blueprints
+    :param rng: random numbers, seeded for comparable runs
+    :return: sheet name -> column name -> cells
+    """
+    jobs = list(WorkerTranslationDict.__annotations__)
+    types = [ascension.replace("_", " ") for ascension in Ascensions.__annotations__]
+    tiers = rng.integers(1, MAX_TIER + 1, size)
+    values = np.round(50 * 2.0 ** tiers * rng.uniform(0.5, 2.0, size))
+    crafting_times = np.round(15 * 1.8 ** tiers * rng.uniform(0.5, 2.0, size))
+    blueprints: Dict[str, list] = {
+        "Name": [f"Blueprint {row:07d}" for row in range(size)],
+        "Type": [types[index] for index in rng.integers(0, len(types), size).tolist()],
+        "Tier": tiers.astype(float).tolist(),
+        "Value": values.tolist(),
+        "Crafting Time (seconds)": crafting_times.tolist()
+    }
+    first_job = rng.integers(0, len(jobs), size)
+    second_job = np.where(rng.random(size) < 0.4, rng.integers(0, len(jobs), size), -1)
+    for column, indexes in zip(WORKER_COLUMNS, (first_job, second_job)):
+        blueprints[column] = [jobs[index] if index >= 0 else EMPTY_CELL for index in indexes.tolist()]
+    # t1 resources on everything, higher tier resources only on higher tier blueprints
+    for column, resource in enumerate(RESOURCES):
+        resource_tier = 1 + column // 4 if column < 8 else 3
+        used = (tiers >= 3 * resource_tier - 2) & (rng.random(size) < 0.35)
+        amounts = np.round(tiers * rng.uniform(1, 20, size) / resource_tier)
+        blueprints[resource] = [
+            float(amount) if use else EMPTY_CELL for amount, use in zip(amounts.tolist(), used.tolist())
+        ]
+    components: List[List[str]] = list()
+    for name_column, quality_column, amount_column in COMPONENT_COLUMNS:
+        kinds = rng.random(size)
+        quest = rng.integers(0, len(QUEST_COMPONENTS), size).tolist()
+        crafted = (rng.random(size) * np.arange(size)).astype(int).tolist()
+        names = [
+            QUEST_COMPONENTS[quest[row]] if kind < 0.3 else
+            blueprints["Name"][crafted[row]] if kind < 0.4 and row > 0 else
+            EMPTY_CELL
+            for row, kind in enumerate(kinds.tolist())
+        ]
+        blueprints[name_column] = names
+        blueprints[quality_column] = [EMPTY_CELL] * size
+        blueprints[amount_column] = [
+            EMPTY_CELL if name == EMPTY_CELL else float(amount)
+            for name, amount in zip(names, rng.integers(1, 6, size).tolist())
+        ]
+        components.append(names)
+    templates = rng.integers(0, len(UPGRADE_TEMPLATES), (size, len(UPGRADE_KEYS))).tolist()
+    upgrade_resources = rng.integers(0, len(RESOURCES), (size, len(UPGRADE_KEYS))).tolist()
+    upgrade_components = rng.integers(0, len(COMPONENT_COLUMNS), (size, len(UPGRADE_KEYS))).tolist()
+    upgrades = [[EMPTY_CELL] * size for _ in UPGRADE_KEYS]
+    for row in range(size):
+        for slot in range(len(UPGRADE_KEYS)):
+            text = UPGRADE_TEMPLATES[templates[row][slot]]
+            resource = RESOURCES[upgrade_resources[row][slot]]
+            component = components[upgrade_components[row][slot]][row]
+            if "{resource}" in text and blueprints[resource][row] != EMPTY_CELL:
+                upgrades[slot][row] = text.format(amount=1 + row % 3, resource=resource.capitalize())
+            elif "{component}" in text and component != EMPTY_CELL:
+                upgrades[slot][row] = text.format(component=component)
+            elif "{" not in text:
+                upgrades[slot][row] = text
+    for key, column in zip(UPGRADE_KEYS, upgrades):
+        blueprints[key] = column
+    discount_energy = np.round(values / 200 + 5)
+    blueprints["Discount Energy"] = discount_energy.tolist()
+    blueprints["Surcharge Energy"] = np.round(discount_energy * 2.2).tolist()
+
+    workers = {
+        "Worker": jobs,
+        "Name": list(WorkerLevels.__annotations__)
+    }
+    bonuses = np.round(np.linspace(0, 0.5, MAX_WORKER_LEVEL), 2).tolist()
+    worker_levels = {
+        "Worker Level": [float(level) for level in range(1, MAX_WORKER_LEVEL + 1)],
+        "Crafting Speed Bonus": [EMPTY_CELL] + bonuses[1:]
+    }
+    return {"Blueprints": blueprints, "Workers": workers, "Worker Levels": worker_levels}
+
+
+def synthetic_players(count: int, rng: np.random.Generator) -> List[dict]:
+    """
+    :param count: number of players
+    :param rng: random numbers, seeded for comparable runs
+    :return: raw player configs, like the ones read from config.json
+    """
+    players = list()
+    for number in range(count):
+        players.append({
+            "name": f"player{number:05d}",
+            # level 1 has no crafting speed, every real player is past it
+            "workers": {
+                worker: int(rng.integers(2, MAX_WORKER_LEVEL + 1)) for worker in WorkerLevels.__annotations__
+            },
+            "buildings": {
+                building: int(rng.integers(1, len(ResourceProductionDict[ResourceBuildingTiersDict[building]]) + 1))
+                for building in BuildingLevels.__annotations__
+            },
+            "guild_boosts": {
+                "craft_speed": float(rng.choice([1.0, 0.9, 0.85, 0.8, 0.75])),
+                "resource_generation": float(rng.choice([1.0, 1.1, 1.25, 1.5])),
+                "quest_rest_speed": 1.0,
+                "xp_earned": 1.0
+            },
+            "ascensions": {
+                ascension.replace("_", " "): int(rng.integers(0, 4)) for ascension in Ascensions.__annotations__
+            },
+            "quest_component_prices": {
+                component: int(rng.integers(1000, 200000)) for component in QUEST_COMPONENTS
+            },
+            "non_quest_component_prices": dict(),
+            "max_energy": int(rng.integers(500, 5000))
+        })
+    return players
+
+
+class StageTimer:
+    """
+    Wall clock time of named stages, a stage run several times keeps every run.
+    """
+
+    def __init__(self):
+        self.runs: Dict[str, List[float]] = dict()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.runs.setdefault(name, list()).append(time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "runs": len(runs),
+                "total_seconds": sum(runs),
+                "mean_seconds": sum(runs) / len(runs),
+                "min_seconds": min(runs),
+                "max_seconds": max(runs)
+            }
+            for name, runs in self.runs.items()
+        }
+
+
+def benchmark_size(size: int, players: int, output_players: int, seed: int, directory: str) -> dict:
+    """
+    Times every stage of a calculation on one synthetic catalogue:
+    - snapshot: writing the snapshot, upgrade texts are parsed here
+    - data_load: GameDataset.load from the snapshot
+    - upgrades: applying the compiled upgrades to the catalogue
+    - metrics: a full metric computation per player
+    - incremental_metrics: the same players one after the other, like batch mode
+    - ranking: the top 20 blueprints per player
+    - output: ShopTitansCalculator.calculate with the text table, per output player
+    :return: machine readable results of this size
+    """
+    # imported here, main.py pulls in the whole CLI
+    from main import ShopTitansCalculator
+
+    rng = np.random.default_rng(seed)
+    timer = StageTimer()
+    sheets = synthetic_sheets(size, rng)
+    population = synthetic_players(players, rng)
+    data_directory = os.path.join(directory, f"data_{size}")
+    with timer.stage("snapshot"):
+        write_snapshot(sheets, "synthetic", f"synthetic-{size}-{seed}", data_directory)
+    del sheets
+    with timer.stage("data_load"):
+        dataset = GameDataset.load(data_directory)
+    with timer.stage("upgrades"):
+        dataset.catalogue.upgraded()
+    for raw_config in population:
+        player_config = ShopTitansPlayerConfig(**raw_config)
+        with timer.stage("metrics"):
+            IncrementalCalculator(dataset).calculate(player_config)
+    incremental = IncrementalCalculator(dataset)
+    for raw_config in population:
+        player_config = ShopTitansPlayerConfig(**raw_config)
+        with timer.stage("incremental_metrics"):
+            incremental.calculate(player_config)
+    for raw_config in population:
+        player_config = ShopTitansPlayerConfig(**raw_config)
+        with timer.stage("ranking"):
+            rank(dataset, player_config, RankingQuery(top=20))
+    result_path = os.path.join(directory, "result.txt")
+    for raw_config in population[:output_players]:
+        with timer.stage("output"):
+            ShopTitansCalculator(
+                player_config=raw_config, dataset=dataset, result_path=result_path, echo=False
+            ).calculate()
+    return {
+        "blueprints": size,
+        "players": players,
+        "output_players": min(output_players, players),
+        "seed": seed,
+        "stages": timer.summary()
+    }
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    :param results: results of this run
+    :param baseline: results of an earlier run, e.g. of the main branch
+    :param tolerance: allowed slowdown, 0.2 is 20%
+    :return: one message per stage that got slower than allowed
+    """
+    found = list()
+    baseline_sizes = {entry["blueprints"]: entry for entry in baseline.get("sizes", ())}
+    for entry in results["sizes"]:
+        previous = baseline_sizes.get(entry["blueprints"])
+        if previous is None:
+            continue
+        for stage, timing in entry["stages"].items():
+            previous_timing = previous["stages"].get(stage)
+            if previous_timing is None:
+                continue
+            # the fastest run is the least noisy
+            before, after = previous_timing["min_seconds"], timing["min_seconds"]
+            if after > before * (1 + tolerance):
+                found.append(
+                    f"{entry['blueprints']} blueprints, {stage}: {before:.4f}s -> {after:.4f}s "
+                    f"(+{(after / before - 1) * 100:.0f}%)"
+                )
+    return found
+
+
+def generate_args():
+    args = ArgumentParser(
+        description="Times the calculation stages on synthetic blueprint catalogues and player populations"
+    )
+    args.add_argument(
+        "--sizes",
+        type=str,
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="comma separated catalogue sizes, e.g. 1000,10000,100000,1000000"
+    )
+    args.add_argument(
+        "--players",
+        type=int,
+        default=DEFAULT_PLAYERS
+    )
+    args.add_argument(
+        "--output-players",
+        type=int,
+        default=DEFAULT_OUTPUT_PLAYERS,
+        help="players whose whole result is written, the output stage is the slowest one"
+    )
+    args.add_argument(
+        "--seed",
+        type=int,
+        default=DEFAULT_SEED
+    )
+    args.add_argument(
+        "--output",
+        type=str,
+        help="write the JSON results to this file instead of stdout"
+    )
+    args.add_argument(
+        "--baseline",
+        type=str,
+        help="JSON results of an earlier run, exits with 1 if a stage got slower than --tolerance allows"
+    )
+    args.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE
+    )
+    return args
+
+
+def main():
+    args = generate_args().parse_args()
+    results = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "sizes": list()
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (int(size) for size in args.sizes.split(",") if size.strip()):
+            results["sizes"].append(benchmark_size(size, args.players, args.output_players, args.seed, directory))
+            print(f"{size} blueprints done", file=sys.stderr)
+    report = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report + "\n")
+    else:
+        print(report)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            found = regressions(results, json.load(baseline_file), args.tolerance)
+        for message in found:
+            print(f"regression: {message}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
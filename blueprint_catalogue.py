@@ -0,0 +1,282 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import hashlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import profiling
+from ascensions import AscensionIndex
+from blueprint_index import BlueprintIndex
+from component_costs import ComponentCosts, ComponentGraph
+from game_data import BLUEPRINTS_SHEET, DATA_DIRECTORY, FINGERPRINTS_SHEET, SheetTable, open_sheet
+from scoring_engine import RESOURCES, EnergyTable, round_values
+from upgrade_effects import EFFECTS_SHEET, UpgradeEffectTable
+
+WORKERS_SHEET = "Workers"
+WORKER_LEVELS_SHEET = "Worker Levels"
+# the first header has a trailing space in the spreadsheet,
+# of the other duplicated headers only the last column is kept
+WORKER_COLUMNS = (
+    "Required Worker ",
+    "Required Worker"
+)
+COMPONENT_COLUMNS = (
+    ("Component1", "Component Quality1", "Amount Needed1"),
+    ("Component2", "Component Quality2", "Amount Needed2")
+)
+EMPTY_CELL = "---"
+NO_WORKER = -1
+
+
+def _numbers(table, name: str) -> np.ndarray:
+    return np.asarray(table.numbers(name))
+
+
+def _strings(table, name: str) -> List[str]:
+    return [str() if value == EMPTY_CELL else value for value in table.column(name)]
+
+
+class BlueprintCatalogue:
+    """
+    Player independent blueprint data of a snapshot: base values, times
+    and resource costs as arrays, plus the compiled upgrade effects.
+    """
+
+    def __init__(self, names: List[str], types: List[str], tiers: np.ndarray, jobs: List[str],
+                 workers: np.ndarray, components: List[List[Tuple[str, str, float]]],
+                 values: np.ndarray, crafting_times: np.ndarray, resources: np.ndarray,
+                 effects: UpgradeEffectTable, discount_energy: np.ndarray, surcharge_energy: np.ndarray,
+                 fingerprint_table: SheetTable = None):
+        self.names = names
+        self.types = types
+        self.tiers = tiers
+        # worker jobs, e.g. "Blacksmith", in the order of the Workers sheet
+        self.jobs = jobs
+        # blueprints x WORKER_COLUMNS, indexes into jobs or NO_WORKER
+        self.workers = workers
+        # (name, quality, amount) of both components, empty name if there is none
+        self.components = components
+        self.values = values
+        # seconds
+        self.crafting_times = crafting_times
+        # blueprints x RESOURCES, NaN if the blueprint does not use the resource
+        self.resources = resources
+        self.effects = effects
+        # energy a discount gives and a surcharge costs
+        self.discount_energy = discount_energy
+        self.surcharge_energy = surcharge_energy
+        # FINGERPRINTS_SHEET of the snapshot, decoded on first use
+        self.fingerprint_table = fingerprint_table
+        self._fingerprints = None
+        self._upgraded = None
+        self._energy = None
+        self._component_amounts = None
+        self._component_graph = None
+        self._index = None
+        self._ascension_index = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def uses_job(self, job: str) -> np.ndarray:
+        """
+        :param job: worker job, e.g. "Wizard"
+        :return: boolean mask of the blueprints that require the job
+        """
+        return (self.workers == self.jobs.index(job)).any(axis=1)
+
+    @classmethod
+    def load(cls, data_directory: str = DATA_DIRECTORY) -> "BlueprintCatalogue":
+        table = open_sheet(BLUEPRINTS_SHEET, data_directory)
+        jobs = [job for job in open_sheet(WORKERS_SHEET, data_directory).column("Worker") if job]
+        job_indexes = {job: index for index, job in enumerate(jobs)}
+        workers = np.full((table.rows, len(WORKER_COLUMNS)), NO_WORKER, dtype=np.int64)
+        for position, column in enumerate(WORKER_COLUMNS):
+            workers[:, position] = [job_indexes.get(job, NO_WORKER) for job in table.column(column)]
+        components = [list() for _ in range(table.rows)]
+        for name_column, quality_column, amount_column in COMPONENT_COLUMNS:
+            amounts = np.nan_to_num(_numbers(table, amount_column)).tolist()
+            for index, component in enumerate(zip(
+                    _strings(table, name_column), _strings(table, quality_column), amounts)):
+                components[index].append(component)
+        return cls(
+            names=table.column("Name"),
+            types=table.column("Type"),
+            tiers=np.trunc(_numbers(table, "Tier")),
+            jobs=jobs,
+            workers=workers,
+            components=components,
+            # costs and values are whole numbers in the game
+            values=np.trunc(_numbers(table, "Value")),
+            crafting_times=_numbers(table, "Crafting Time (seconds)").copy(),
+            resources=np.trunc(np.stack([_numbers(table, resource) for resource in RESOURCES], axis=1)),
+            effects=UpgradeEffectTable.from_sheet(open_sheet(EFFECTS_SHEET, data_directory)),
+            discount_energy=_numbers(table, "Discount Energy").copy(),
+            surcharge_energy=_numbers(table, "Surcharge Energy").copy(),
+            fingerprint_table=open_sheet(FINGERPRINTS_SHEET, data_directory)
+        )
+
+    def upgraded(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Values, crafting times and resources with every crafting and
+        ascension upgrade applied, computed once per catalogue.
+        :return: values, crafting times, resources
+        """
+        if self._upgraded is None:
+            with profiling.span("apply upgrades"):
+                self._upgraded = self.effects.apply(self.values, self.crafting_times, self.resources)
+            if profiling.enabled():
+                profiling.count("upgrades applied", self.effects.active_upgrades())
+        return self._upgraded
+
+    def energy(self) -> EnergyTable:
+        """
+        :return: energy table with the gold price of energy, built once per catalogue
+        """
+        if self._energy is None:
+            self._energy = EnergyTable.build(
+                round_values(self.upgraded()[0]), self.discount_energy, self.surcharge_energy
+            )
+        return self._energy
+
+    def component_amounts(self) -> np.ndarray:
+        """
+        :return: blueprints x COMPONENT_COLUMNS amounts with every upgrade applied
+        """
+        if self._component_amounts is None:
+            amounts = np.array([[amount for _, _, amount in row] for row in self.components], dtype=np.float64)
+            self._component_amounts = self.effects.apply_components(amounts.reshape(len(self), -1))
+        return self._component_amounts
+
+    def component_graph(self) -> ComponentGraph:
+        """
+        :return: component DAG, built once per catalogue
+        """
+        if self._component_graph is None:
+            self._component_graph = ComponentGraph(self.names, self.components)
+        return self._component_graph
+
+    def component_costs(self, prices: Dict[str, float], ascensions: Dict[str, int] = None,
+                        bonuses: Dict[int, dict] = None) -> ComponentCosts:
+        """
+        :param prices: gold per component, see component_costs.component_prices
+        :param ascensions: ascension levels of the player, a crafted component is worth its ascended value
+        :param bonuses: ascension bonuses of the player, see ascensions.ascension_bonuses
+        :return: component costs of every blueprint, crafted components cost their rounded value, the gold
+            they could have been sold for
+        """
+        values, crafting_times, _ = self.upgraded()
+        if ascensions or bonuses is not None:
+            values, _ = self.ascension_index().apply(values, crafting_times, ascensions or dict(), bonuses=bonuses)
+        return self.component_graph().resolve(self.component_amounts(), prices, round_values(values))
+
+    def index(self) -> BlueprintIndex:
+        """
+        :return: tier, worker and resource indexes, built once per catalogue
+        """
+        if self._index is None:
+            self._index = BlueprintIndex(self)
+        return self._index
+
+    def ascension_index(self) -> AscensionIndex:
+        """
+        :return: item type ascension of every blueprint, built once per catalogue
+        """
+        if self._ascension_index is None:
+            self._ascension_index = AscensionIndex(self.types, self.names)
+        return self._ascension_index
+
+    def fingerprints(self) -> List[str]:
+        """
+        :return: fingerprint of every Blueprints row, see game_data.fingerprint_rows
+        """
+        if self._fingerprints is None:
+            if self.fingerprint_table is None:
+                raise ValueError("the catalogue was not loaded from a snapshot, it has no fingerprints")
+            self._fingerprints = self.fingerprint_table.column("Fingerprint")
+        return self._fingerprints
+
+    def dependency_key(self, mask: np.ndarray) -> str:
+        """
+        Hash of the data a calculation of the masked blueprints reads: their
+        rows and the rows of everything they are crafted from, in catalogue
+        order, plus the value per energy, which every blueprint contributes to.
+        A patch that changes none of these leaves the key as it was.
+        :param mask: blueprints that are calculated
+        :return: hex digest
+        """
+        fingerprints = self.fingerprints()
+        digest = hashlib.sha256()
+        for row in np.flatnonzero(self.component_graph().with_components(mask)).tolist():
+            digest.update(fingerprints[row].encode("utf-8"))
+        digest.update(repr(self.energy().value_per_energy).encode("utf-8"))
+        return digest.hexdigest()
+
+    def apply_workers(self, crafting_times: np.ndarray, craft_times: Dict[str, float],
+                      worker_names: Dict[str, str], rows: np.ndarray = None) -> np.ndarray:
+        """
+        Multiplies the crafting times with the craft time coefficients of
+        the required workers, one worker column after another.
+        :param crafting_times: crafting times of every blueprint, or of rows
+        :param craft_times: worker name -> craft time coefficient
+        :param worker_names: job -> worker name
+        :param rows: indexes of the blueprints crafting_times belongs to
+        :return: adjusted crafting times
+        """
+        workers = self.workers if rows is None else self.workers[rows]
+        # the trailing 1.0 is picked by NO_WORKER
+        job_coefficients = np.array(
+            [craft_times[worker_names[job]] for job in self.jobs] + [1.0]
+        )
+        for position in range(len(WORKER_COLUMNS)):
+            crafting_times = crafting_times * job_coefficients[workers[:, position]]
+        return crafting_times
+
+
+class GameDataset:
+    """
+    Everything a calculation reads from the snapshot. It does not depend
+    on the player, so one instance is shared by any number of configs.
+    """
+
+    def __init__(self, catalogue: BlueprintCatalogue, worker_names: Dict[str, str],
+                 worker_level_speeds: Dict[int, float]):
+        self.catalogue = catalogue
+        # job -> worker name, e.g. "Blacksmith" -> "Wallace"
+        self.worker_names = worker_names
+        # worker level -> craft time coefficient
+        self.worker_level_speeds = worker_level_speeds
+
+    @classmethod
+    def load(cls, data_directory: str = DATA_DIRECTORY) -> "GameDataset":
+        with profiling.span("load game data"):
+            workers = open_sheet(WORKERS_SHEET, data_directory)
+            worker_names = {
+                job: name for job, name in zip(workers.column("Worker"), workers.column("Name")) if job
+            }
+            worker_level_speeds = dict()
+            worker_level_speeds[1] = 0
+            for level in open_sheet(WORKER_LEVELS_SHEET, data_directory).records():
+                try:
+                    worker_level = int(level["Worker Level"])
+                    # craft speed needs to be rounded to 2 decimals, because lulfloats
+                    craft_speed = round(
+                        1.0 - float(level["Crafting Speed Bonus"]), 2
+                    )
+                    worker_level_speeds[worker_level] = craft_speed
+                except ValueError:
+                    pass
+            return cls(
+                catalogue=BlueprintCatalogue.load(data_directory),
+                worker_names=worker_names,
+                worker_level_speeds=worker_level_speeds
+            )
+
+    def worker_craft_time(self, level: int, craft_speed: float) -> float:
+        """
+        :param level: worker level
+        :param craft_speed: guild craft speed boost
+        :return: craft time coefficient of a worker
+        """
+        return self.worker_level_speeds[level] * craft_speed
@@ -0,0 +1,75 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import bisect
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from scoring_engine import RESOURCES, effective_resources
+
+
+class BlueprintIndex:
+    """
+    Secondary indexes over the blueprints of one snapshot. They only use
+    player independent data, so they are built once per catalogue:
+    - tier -> blueprints, and tier ranges through the tier sorted order
+    - worker job -> blueprints that require it
+    - resource -> blueprints that use it after upgrades
+    Sets of blueprints are boolean masks, combining them is one vector op.
+    """
+
+    def __init__(self, catalogue: "BlueprintCatalogue"):
+        self.size = len(catalogue)
+        tiers = catalogue.tiers.astype(np.int64)
+        self._tier_order = np.argsort(tiers, kind="stable")
+        self._sorted_tiers: List[int] = tiers[self._tier_order].tolist()
+        self.tiers: Dict[int, np.ndarray] = {
+            tier: np.flatnonzero(tiers == tier) for tier in np.unique(tiers).tolist()
+        }
+        self.jobs: Dict[str, np.ndarray] = {job: catalogue.uses_job(job) for job in catalogue.jobs}
+        _, _, resources = catalogue.upgraded()
+        # costs upgrades brought to 0 or below are not used, like in the metrics
+        costs = effective_resources(resources)
+        used = costs > 0
+        self.resources: Dict[str, np.ndarray] = {
+            resource: used[:, column] for column, resource in enumerate(RESOURCES)
+        }
+
+    def tier_range(self, low: Optional[int] = None, high: Optional[int] = None) -> np.ndarray:
+        """
+        :param low: lowest tier, inclusive, None for no lower bound
+        :param high: highest tier, inclusive, None for no upper bound
+        :return: blueprints in the range, by tier
+        """
+        start = 0 if low is None else bisect.bisect_left(self._sorted_tiers, low)
+        end = len(self._sorted_tiers) if high is None else bisect.bisect_right(self._sorted_tiers, high)
+        return self._tier_order[start:end]
+
+    def mask(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def select(self, low_tier: Optional[int] = None, high_tier: Optional[int] = None,
+               jobs: Iterable[str] = (), uses: Iterable[str] = (), without: Iterable[str] = ()) -> np.ndarray:
+        """
+        E.g. all Jeweler items of tier 10+ that use no jewels:
+        select(low_tier=10, jobs=["Jeweler"], without=["jewels"])
+        :param low_tier: lowest tier, inclusive
+        :param high_tier: highest tier, inclusive
+        :param jobs: required worker jobs, all of them
+        :param uses: resources the blueprints must use, all of them
+        :param without: resources the blueprints must not use
+        :return: mask of the matching blueprints
+        """
+        if low_tier is None and high_tier is None:
+            mask = np.ones(self.size, dtype=bool)
+        else:
+            mask = self.mask(self.tier_range(low_tier, high_tier))
+        for job in jobs:
+            mask &= self.jobs[job]
+        for resource in uses:
+            mask &= self.resources[resource]
+        for resource in without:
+            mask &= ~self.resources[resource]
+        return mask
@@ -1,22 +1,91 @@
 #!/bin/bash python
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import List, Tuple
 
 from prodict import Prodict
 
 
-class ComponentRequirement(Prodict):
+# marks a field that was never set, None is a value a field can be set to
+_UNSET = object()
+
+
+class SlottedRecord:
+    """
+    Fixed field record for the per blueprint data. Fields live in
+    __slots__ instead of a dict, which keeps every record small and the
+    attribute access fast when many players' results are held at once.
+    Unset fields read as None and are left out of keys() and items(),
+    like a Prodict without that attribute.
+    """
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        if len(args) > len(self.__slots__):
+            raise TypeError(f"{type(self).__name__} takes at most {len(self.__slots__)} fields")
+        for field, value in zip(self.__slots__, args):
+            setattr(self, field, value)
+        for field, value in kwargs.items():
+            self.set_attribute(field, value)
+
+    def __getattr__(self, key: str):
+        # only called for fields that were never set
+        if key in self.__slots__:
+            return None
+        raise AttributeError(f"{type(self).__name__} has no field {key}")
+
+    def _value(self, key: str):
+        try:
+            return object.__getattribute__(self, key)
+        except AttributeError:
+            return _UNSET
+
+    def set_attribute(self, key: str, value):
+        if key not in self.__slots__:
+            raise AttributeError(f"{type(self).__name__} has no field {key}")
+        setattr(self, key, value)
+
+    def get(self, key: str, default=None):
+        value = self._value(key) if key in self.__slots__ else _UNSET
+        return default if value is _UNSET else value
+
+    def __getitem__(self, key: str):
+        value = self.get(key, _UNSET)
+        if value is _UNSET:
+            raise KeyError(key)
+        return value
+
+    def keys(self) -> List[str]:
+        return [field for field in self.__slots__ if self._value(field) is not _UNSET]
+
+    def items(self) -> List[Tuple[str, object]]:
+        return [(field, getattr(self, field)) for field in self.keys()]
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.items() == other.items()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{key}={value!r}' for key, value in self.items())})"
+
+
+class ComponentRequirement(SlottedRecord):
+    __slots__ = ("name", "amount", "value")
     name: str
     amount: int
     value: int
 
 
-class TransformedBP(Prodict):
+class TransformedBP(SlottedRecord):
     """
     This class is what the name, tier, costs and value look like for
     a Shop Titans blueprint when all crafting and ascension upgrades
     have been applied.
     """
+    __slots__ = (
+        "name", "tier", "value", "crafting_time", "workers", "components",
+        "iron", "wood", "leather", "herbs",
+        "steel", "ironwood", "fabric", "oils",
+        "ether", "jewels"
+    )
     # general
     name: str
     tier: int
@@ -39,10 +108,26 @@ class TransformedBP(Prodict):
     jewels: int
 
 
-class TransformedBPData(Prodict):
+class TransformedBPData(SlottedRecord):
+    # same order as METRIC_NAMES and then ENERGY_METRIC_NAMES in scoring_engine, after the name
+    __slots__ = (
+        "name", "value_per_minute_per_slot", "profit_per_minute_per_slot",
+        "iron_per_minute_per_slot", "wood_per_minute_per_slot",
+        "leather_per_minute_per_slot", "herbs_per_minute_per_slot",
+        "steel_per_minute_per_slot", "ironwood_per_minute_per_slot",
+        "fabric_per_minute_per_slot", "oils_per_minute_per_slot",
+        "ether_per_minute_per_slot", "jewels_per_minute_per_slot",
+        "value_per_iron", "value_per_wood", "value_per_leather", "value_per_herbs",
+        "value_per_steel", "value_per_ironwood", "value_per_fabric", "value_per_oils",
+        "value_per_ether", "value_per_jewels",
+        "surcharge_profit_per_minute_per_slot", "discount_profit_per_minute_per_slot",
+        "surcharge_energy_per_minute_per_slot", "discount_energy_per_minute_per_slot",
+        "surcharge_gold_per_energy"
+    )
     # general
     name: str
     value_per_minute_per_slot: float
+    profit_per_minute_per_slot: float
     # t1
     iron_per_minute_per_slot: float
     wood_per_minute_per_slot: float
@@ -71,12 +156,20 @@ class TransformedBPData(Prodict):
     value_per_ether: float
     value_per_jewels: float
 
+    # energy, same order as ENERGY_METRIC_NAMES
+    surcharge_profit_per_minute_per_slot: float
+    discount_profit_per_minute_per_slot: float
+    surcharge_energy_per_minute_per_slot: float
+    discount_energy_per_minute_per_slot: float
+    surcharge_gold_per_energy: float
+
 
 class OutputSpacings(Prodict):
     # how many chars should each key take up in the txt output
     # general
     name: int
     value_per_minute_per_slot: int
+    profit_per_minute_per_slot: int
     # t1
     iron_per_minute_per_slot: int
     wood_per_minute_per_slot: int
@@ -106,11 +199,12 @@ class OutputSpacings(Prodict):
     value_per_jewels: int
 
 
-# this has to be true for calculations to work
-assert OutputSpacings().keys() == TransformedBPData().keys()
+# this has to be true for calculations to work, the text table leaves out the energy columns
+assert tuple(OutputSpacings.__annotations__) == TransformedBPData.__slots__[:len(OutputSpacings.__annotations__)]
 
 
-class FinalBPData(Prodict):
+class FinalBPData(SlottedRecord):
+    __slots__ = ("transformed_data", "calculated_values")
     transformed_data: TransformedBP
     calculated_values: TransformedBPData
 
@@ -224,11 +318,29 @@ class Ascensions(Prodict):
     Spirit: int
 
 
+class GameConstants(Prodict):
+    # estimates of additional_data the config can override, unset ones keep the estimate
+    # selling price multipliers of a surcharged and a discounted sale
+    surcharge_multiplier: float
+    discount_multiplier: float
+    # ascension level -> {"value": ..., "crafting_time": ...}, replaces AscensionBonusesDict
+    ascension_bonuses: dict
+    # quality name -> {"chance": ..., "value": ...}, replaces QualityDict
+    qualities: dict
+
+
 class ShopTitansPlayerConfig(Prodict):
     workers: WorkerLevels
     buildings: BuildingLevels
     guild_boosts: GuildBoosts
     ascensions: Ascensions
+    # component name -> gold, components without a price are crafted or free
+    quest_component_prices: dict
+    non_quest_component_prices: dict
+    # energy cap, surcharges that cost more can not be done
+    max_energy: int
+    # overrides of the estimated game constants, optional
+    game_constants: GameConstants
 
 
 class ShopTitansCalculatorConfig(Prodict):
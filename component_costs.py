@@ -0,0 +1,159 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+from collections import deque
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+import numpy as np
+
+# component that is not a blueprint of the catalogue, e.g. a quest component
+NOT_CRAFTED = -1
+
+
+class ComponentCycleError(ValueError):
+    pass
+
+
+class ComponentCosts(NamedTuple):
+    # gold spent on components per craft of every blueprint
+    costs: np.ndarray
+    # blueprints x components, gold per single component
+    unit_costs: np.ndarray
+    # components with no price that no blueprint crafts, counted as free
+    missing: Set[str]
+    # crafted components with no price and no value, counted as the cost of their own components
+    from_components: Set[str]
+
+
+class ComponentGraph:
+    """
+    Blueprint -> component relations of a catalogue as a DAG. A component
+    is either bought (quest components, or anything the player prices) or
+    crafted from another blueprint. A crafted component costs the value it
+    could have been sold for, and only without a value what its own
+    components cost. The topological order puts every crafted component
+    before the blueprints that use it, so resolving the costs of the whole
+    catalogue is one pass over its edges, every blueprint's cost computed
+    once and reused by everything that uses it.
+    """
+
+    def __init__(self, names: List[str], components: List[List[Tuple[str, str, float]]]):
+        """
+        :param names: blueprint names
+        :param components: (name, quality, amount) of every component of every blueprint
+        """
+        rows = dict()
+        for row, name in enumerate(names):
+            rows.setdefault(name, row)
+        self.names = names
+        self.component_names: List[List[str]] = [[name for name, _, _ in row] for row in components]
+        # blueprints x components, the crafted blueprint or NOT_CRAFTED
+        self.sources = np.array([
+            [rows.get(name, NOT_CRAFTED) if name else NOT_CRAFTED for name in row]
+            for row in self.component_names
+        ], dtype=np.int64).reshape(len(names), -1)
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[int]:
+        """
+        Kahn's algorithm, components first.
+        :raise ComponentCycleError: if blueprints need each other as components
+        """
+        size = len(self.names)
+        users: List[List[int]] = [list() for _ in range(size)]
+        pending = np.zeros(size, dtype=np.int64)
+        for row, sources in enumerate(self.sources.tolist()):
+            for source in sources:
+                if source != NOT_CRAFTED:
+                    users[source].append(row)
+                    pending[row] += 1
+        pending = pending.tolist()
+        ready = deque(row for row in range(size) if pending[row] == 0)
+        order = list()
+        while ready:
+            row = ready.popleft()
+            order.append(row)
+            for user in users[row]:
+                pending[user] -= 1
+                if pending[user] == 0:
+                    ready.append(user)
+        if len(order) < size:
+            cycle = sorted(self.names[row] for row in range(size) if pending[row] > 0)
+            raise ComponentCycleError(f"blueprints need each other as components: {', '.join(cycle)}")
+        return order
+
+    def with_components(self, mask: np.ndarray) -> np.ndarray:
+        """
+        :param mask: blueprints
+        :return: mask plus every blueprint they are crafted from, directly or through other components
+        """
+        mask = mask.tolist()
+        sources = self.sources.tolist()
+        # users before their components, so a component is marked before it is visited
+        for row in reversed(self.order):
+            if mask[row]:
+                for source in sources[row]:
+                    if source != NOT_CRAFTED:
+                        mask[source] = True
+        return np.array(mask, dtype=bool)
+
+    def dependents(self, names: Set[str]) -> np.ndarray:
+        """
+        :param names: blueprint names, e.g. the ones a patch changed
+        :return: mask of the blueprints that use one of them as a component, directly or through other components
+        """
+        dependents = [False] * len(self.names)
+        sources = self.sources.tolist()
+        # components before their users, so a user sees whether its components depend on names
+        for row in self.order:
+            dependents[row] = any(
+                name in names or (source != NOT_CRAFTED and dependents[source])
+                for name, source in zip(self.component_names[row], sources[row]) if name
+            )
+        return np.array(dependents, dtype=bool)
+
+    def resolve(self, amounts: np.ndarray, prices: Dict[str, float], values: np.ndarray) -> ComponentCosts:
+        """
+        :param amounts: blueprints x components, amount of every component per craft
+        :param prices: gold per component, a price also overrides crafting the component
+        :param values: value of every blueprint with the player's bonuses, what an unpriced crafted component costs
+        :return: component costs of every blueprint
+        """
+        costs = [0.0] * len(self.names)
+        unit_costs = np.zeros(self.sources.shape)
+        missing = set()
+        from_components = set()
+        sources = self.sources.tolist()
+        amounts = amounts.tolist()
+        values = values.tolist()
+        for row in self.order:
+            cost = 0.0
+            for position, (name, source) in enumerate(zip(self.component_names[row], sources[row])):
+                if not name:
+                    continue
+                if name in prices:
+                    unit_cost = float(prices[name])
+                elif source != NOT_CRAFTED and values[source] == values[source] and values[source] > 0:
+                    unit_cost = values[source]
+                elif source != NOT_CRAFTED:
+                    # no value in the sheet, its own components are already resolved, the order puts them first
+                    unit_cost = costs[source]
+                    from_components.add(name)
+                else:
+                    missing.add(name)
+                    continue
+                unit_costs[row, position] = unit_cost
+                cost += amounts[row][position] * unit_cost
+            costs[row] = cost
+        return ComponentCosts(
+            costs=np.array(costs), unit_costs=unit_costs, missing=missing, from_components=from_components
+        )
+
+
+def component_prices(player_config) -> Dict[str, float]:
+    """
+    :param player_config: ShopTitansPlayerConfig
+    :return: component name -> gold, non quest prices win over quest prices
+    """
+    prices = dict(player_config.get("quest_component_prices") or dict())
+    prices.update(player_config.get("non_quest_component_prices") or dict())
+    return prices
@@ -0,0 +1,90 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+from numbers import Real
+
+from additional_data import ResourceBuildingTiersDict, ResourceProductionDict
+from blueprint_catalogue import GameDataset
+from class_definitions import ShopTitansPlayerConfig
+
+
+class InvalidConfigError(ValueError):
+    pass
+
+
+def _number(value, what: str, optional: bool = False):
+    if value is None and optional:
+        return
+    if isinstance(value, bool) or not isinstance(value, Real):
+        raise InvalidConfigError(f"{what} has to be a number, not {value!r}")
+
+
+def validate_player_config(raw_config: dict, dataset: GameDataset) -> ShopTitansPlayerConfig:
+    """
+    Checks everything a calculation reads from a player config, so a bad
+    config fails here with one error type instead of somewhere in the
+    middle of the calculation.
+    :param raw_config: player config as loaded from JSON
+    :param dataset: game data, knows the workers and their levels
+    :return: the parsed config
+    :raise InvalidConfigError: on the first problem found
+    """
+    if not isinstance(raw_config, dict):
+        raise InvalidConfigError("config has to be a JSON object")
+    try:
+        player_config = ShopTitansPlayerConfig(**raw_config)
+    except (TypeError, ValueError, AttributeError) as error:
+        raise InvalidConfigError(str(error)) from error
+    for section in ("workers", "buildings", "guild_boosts"):
+        if not isinstance(player_config.get(section), dict):
+            raise InvalidConfigError(f"{section} is missing")
+
+    workers = player_config.workers
+    for worker in dataset.worker_names.values():
+        if workers.get(worker) not in dataset.worker_level_speeds:
+            raise InvalidConfigError(f"worker {worker} needs a level of {min(dataset.worker_level_speeds)} to "
+                                     f"{max(dataset.worker_level_speeds)}, not {workers.get(worker)!r}")
+    for worker in workers:
+        if worker not in dataset.worker_names.values():
+            raise InvalidConfigError(f"unknown worker {worker}")
+
+    buildings = player_config.buildings
+    for building, tier in ResourceBuildingTiersDict.items():
+        if buildings.get(building) not in ResourceProductionDict[tier]:
+            raise InvalidConfigError(f"building {building} needs a level of {min(ResourceProductionDict[tier])} to "
+                                     f"{max(ResourceProductionDict[tier])}, not {buildings.get(building)!r}")
+
+    _number(player_config.guild_boosts.get("craft_speed"), "guild_boosts.craft_speed")
+    _number(player_config.guild_boosts.get("resource_generation"), "guild_boosts.resource_generation")
+    for ascension, level in (player_config.get("ascensions") or dict()).items():
+        _number(level, f"ascensions.{ascension}", optional=True)
+    for prices in ("quest_component_prices", "non_quest_component_prices"):
+        for component, price in (player_config.get(prices) or dict()).items():
+            _number(price, f"{prices}.{component}")
+    _number(player_config.get("max_energy"), "max_energy", optional=True)
+
+    game_constants = player_config.get("game_constants") or dict()
+    if not isinstance(game_constants, dict):
+        raise InvalidConfigError("game_constants has to be a JSON object")
+    for constant in ("surcharge_multiplier", "discount_multiplier"):
+        _number(game_constants.get(constant), f"game_constants.{constant}", optional=True)
+    bonuses = game_constants.get("ascension_bonuses")
+    if bonuses is not None:
+        if not isinstance(bonuses, dict) or not bonuses:
+            raise InvalidConfigError("game_constants.ascension_bonuses has to be a JSON object of ascension levels")
+        for level, bonus in bonuses.items():
+            if not str(level).isdigit():
+                raise InvalidConfigError(f"ascension level {level!r} has to be a whole number")
+            if not isinstance(bonus, dict):
+                raise InvalidConfigError(f"game_constants.ascension_bonuses.{level} has to be a JSON object")
+            for key in ("value", "crafting_time"):
+                _number(bonus.get(key), f"game_constants.ascension_bonuses.{level}.{key}")
+    qualities = game_constants.get("qualities")
+    if qualities is not None:
+        if not isinstance(qualities, dict):
+            raise InvalidConfigError("game_constants.qualities has to be a JSON object of qualities")
+        for name, quality in qualities.items():
+            if not isinstance(quality, dict):
+                raise InvalidConfigError(f"game_constants.qualities.{name} has to be a JSON object")
+            for key in ("chance", "value"):
+                _number(quality.get(key), f"game_constants.qualities.{name}.{key}")
+    return player_config
@@ -0,0 +1,294 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import heapq
+import math
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from scoring_engine import RESOURCES
+
+EPSILON = 1e-9
+# after this many pivots the simplex switches to Bland's rule, which can not cycle
+DANTZIG_PIVOTS = 500
+MAX_PIVOTS = 10000
+# branch and bound stops once the best plan is this close to the bound
+RELATIVE_GAP = 1e-3
+# and gives up refining after this many nodes, keeping the best plan found
+MAX_NODES = 1000
+
+
+class CraftingPlan(NamedTuple):
+    # (blueprint index, slots), slots are fractional for the relaxation
+    assignments: List[Tuple[int, float]]
+    value_per_minute: float
+    # resources used per minute, in RESOURCES order
+    resource_usage: List[float]
+    # no plan earns more than this, equal to value_per_minute for the relaxation
+    upper_bound: float
+
+    @property
+    def gap(self) -> float:
+        # how far the plan may be from the best possible one, relative
+        return (self.upper_bound - self.value_per_minute) / max(self.upper_bound, EPSILON)
+
+
+def simplex(objective: np.ndarray, constraints: np.ndarray,
+            limits: np.ndarray) -> Optional[Tuple[float, np.ndarray, np.ndarray]]:
+    """
+    Maximizes objective @ x subject to constraints @ x <= limits and x >= 0
+    with a dense tableau simplex. limits must not be negative, so x = 0
+    is a feasible starting basis and no first phase is needed.
+    :param objective: n coefficients
+    :param constraints: m x n matrix
+    :param limits: m right hand sides, all >= 0
+    :return: (optimum, x, reduced costs of x), or None if the problem is unbounded
+    """
+    rows, columns = constraints.shape
+    tableau = np.zeros((rows + 1, columns + rows + 1))
+    tableau[:rows, :columns] = constraints
+    tableau[:rows, columns:columns + rows] = np.eye(rows)
+    tableau[:rows, -1] = limits
+    tableau[-1, :columns] = -objective
+    basis = np.arange(columns, columns + rows)
+    for pivot in range(MAX_PIVOTS):
+        reduced_costs = tableau[-1, :-1]
+        if pivot < DANTZIG_PIVOTS:
+            entering = int(np.argmin(reduced_costs))
+            if reduced_costs[entering] >= -EPSILON:
+                break
+        else:
+            candidates = np.flatnonzero(reduced_costs < -EPSILON)
+            if len(candidates) == 0:
+                break
+            entering = int(candidates[0])
+        column = tableau[:rows, entering]
+        positive = column > EPSILON
+        if not positive.any():
+            return None
+        ratios = np.full(rows, np.inf)
+        ratios[positive] = tableau[:rows, -1][positive] / column[positive]
+        best_ratio = ratios.min()
+        # ties go to the lowest basic variable, as Bland's rule requires
+        tied = np.flatnonzero(ratios <= best_ratio + EPSILON)
+        leaving = int(tied[np.argmin(basis[tied])])
+        tableau[leaving] /= tableau[leaving, entering]
+        factors = tableau[:, entering].copy()
+        factors[leaving] = 0
+        tableau -= np.outer(factors, tableau[leaving])
+        basis[leaving] = entering
+    solution = np.zeros(columns + rows)
+    solution[basis] = tableau[:rows, -1]
+    return float(tableau[-1, -1]), np.maximum(solution[:columns], 0), tableau[-1, :columns].copy()
+
+
+def undominated(values: np.ndarray, resources: np.ndarray) -> np.ndarray:
+    """
+    Blueprints no other blueprint beats: another one that earns at least as
+    much while using no more of any resource can take its slots in any
+    plan, fractional or whole, so dominated blueprints are never needed.
+    Of identical blueprints the first one is kept.
+    :param values: value per minute of every blueprint
+    :param resources: blueprints x RESOURCES used per minute
+    :return: indexes of the undominated blueprints
+    """
+    keep = list()
+    # best first, so a blueprint can only be dominated by one already kept
+    for index in np.lexsort((resources.sum(axis=1), -values)):
+        if keep:
+            kept = np.array(keep)
+            if ((values[kept] >= values[index]) & (resources[kept] <= resources[index]).all(axis=1)).any():
+                continue
+        keep.append(index)
+    return np.sort(np.array(keep, dtype=np.int64))
+
+
+class _Problem:
+    """
+    Arrays of one planning problem, restricted to some candidate blueprints.
+    """
+
+    def __init__(self, candidates: np.ndarray, values: np.ndarray, resources: np.ndarray,
+                 regen: np.ndarray, slots: int):
+        # indexes of the blueprints in the full catalogue
+        self.candidates = candidates
+        self.values = values
+        self.resources = resources
+        self.regen = regen
+        self.slots = slots
+        # slot row first, then one row per resource
+        self.constraints = np.vstack([np.ones(len(candidates)), resources.T])
+        self.limits = np.concatenate([[slots], regen])
+
+    def restricted(self, columns: np.ndarray) -> "_Problem":
+        return _Problem(self.candidates[columns], self.values[columns], self.resources[columns],
+                        self.regen, self.slots)
+
+    def solve_node(self, lower: Dict[int, int],
+                   upper: Dict[int, int]) -> Optional[Tuple[float, np.ndarray, np.ndarray]]:
+        """
+        LP of a branch and bound node. Lower bounds are substituted away
+        (x = lower + y), which keeps every limit non-negative because all
+        coefficients are; upper bounds become extra rows.
+        :return: (optimum, x, reduced costs), or None if the node is infeasible
+        """
+        limits = self.limits.copy()
+        offset = 0.0
+        for index, bound in lower.items():
+            limits -= bound * self.constraints[:, index]
+            offset += bound * self.values[index]
+        if (limits < -EPSILON).any():
+            return None
+        limits = np.maximum(limits, 0)
+        constraints = self.constraints
+        if upper:
+            bound_rows = np.zeros((len(upper), len(self.values)))
+            bound_limits = np.empty(len(upper))
+            for row, (index, bound) in enumerate(upper.items()):
+                bound_rows[row, index] = 1
+                bound_limits[row] = bound - lower.get(index, 0)
+            if (bound_limits < 0).any():
+                return None
+            constraints = np.vstack([constraints, bound_rows])
+            limits = np.concatenate([limits, bound_limits])
+        solved = simplex(self.values, constraints, limits)
+        if solved is None:
+            return None
+        optimum, solution, reduced_costs = solved
+        for index, bound in lower.items():
+            solution[index] += bound
+        return optimum + offset, solution, reduced_costs
+
+    def round_down(self, solution: np.ndarray) -> np.ndarray:
+        """
+        Feasible whole-slot plan from a fractional one: floor every
+        assignment, then fill free slots greedily with the best blueprint
+        that still fits the regeneration.
+        """
+        solution = np.floor(solution + EPSILON)
+        free_slots = self.slots - solution.sum()
+        remaining = self.regen - self.resources.T @ solution
+        for index in np.argsort(-self.values):
+            if free_slots < 1:
+                break
+            while free_slots >= 1 and (self.resources[index] <= remaining + EPSILON).all():
+                solution[index] += 1
+                free_slots -= 1
+                remaining -= self.resources[index]
+        return solution
+
+    def plan(self, solution: np.ndarray, upper_bound: Optional[float] = None) -> CraftingPlan:
+        used = np.flatnonzero(solution > EPSILON)
+        value = float(self.values @ solution)
+        return CraftingPlan(
+            assignments=sorted(
+                ((int(self.candidates[index]), float(solution[index])) for index in used),
+                key=lambda assignment: -assignment[1]
+            ),
+            value_per_minute=value,
+            resource_usage=(self.resources.T @ solution).tolist(),
+            upper_bound=value if upper_bound is None else max(value, upper_bound)
+        )
+
+
+class CraftingPlanner:
+    """
+    Picks the mix of blueprints for the crafting slots that earns the most
+    value per minute while every resource is used at most as fast as it
+    regenerates:
+
+        maximize    sum(value_per_minute[i] * x[i])
+        subject to  sum(x[i]) <= slots
+                    sum(resource_per_minute[i, r] * x[i]) <= regen[r]  for every resource
+                    x[i] >= 0, integer for whole slots
+
+    The relaxation is a linear program solved with the simplex. Whole slots
+    are found with best-first branch and bound on top of it, after dominated
+    blueprints and blueprints whose reduced cost rules them out are dropped.
+    The search stops within RELATIVE_GAP of the bound or after MAX_NODES
+    nodes, the plan reports how far from the bound it ended.
+    """
+
+    def __init__(self, values_per_minute: np.ndarray, resources_per_minute: np.ndarray,
+                 regen: np.ndarray, slots: int):
+        # blueprints that earn nothing or are dominated are never worth a slot
+        candidates = np.flatnonzero(values_per_minute > 0)
+        resources_per_minute = np.nan_to_num(resources_per_minute[candidates])
+        kept = undominated(values_per_minute[candidates], resources_per_minute)
+        self.problem = _Problem(
+            candidates=candidates[kept],
+            values=values_per_minute[candidates[kept]],
+            resources=resources_per_minute[kept],
+            regen=np.asarray(regen, dtype=np.float64),
+            slots=slots
+        )
+
+    def solve_relaxation(self) -> CraftingPlan:
+        """
+        :return: best plan when a slot may be split between blueprints over time
+        """
+        if len(self.problem.values) == 0:
+            return self.problem.plan(np.zeros(0))
+        return self.problem.plan(self.problem.solve_node(dict(), dict())[1])
+
+    def solve(self, relative_gap: float = RELATIVE_GAP) -> CraftingPlan:
+        """
+        :param relative_gap: stop once no plan can earn this much more, relative
+        :return: best plan found that puts every slot on one blueprint
+        """
+        problem = self.problem
+        if len(problem.values) == 0:
+            return problem.plan(np.zeros(0))
+        root_value, root_solution, reduced_costs = problem.solve_node(dict(), dict())
+        best_solution = problem.round_down(root_solution)
+        best_value = float(problem.values @ best_solution)
+        # a slot on a blueprint costs at least its reduced cost off the LP bound,
+        # blueprints that can not beat the first whole-slot plan that way are dropped
+        columns = np.flatnonzero(root_value - reduced_costs > best_value + EPSILON)
+        columns = np.union1d(columns, np.flatnonzero(best_solution))
+        best_solution = best_solution[columns]
+        problem = problem.restricted(columns)
+        root = problem.solve_node(dict(), dict())
+        # max heap on the LP bound, the counter keeps entries comparable
+        queue = [(-root[0], 0, dict(), dict(), root[1])]
+        counter = 1
+        nodes = 0
+        while queue:
+            if -queue[0][0] <= best_value * (1 + relative_gap) + EPSILON:
+                break
+            nodes += 1
+            if nodes > MAX_NODES:
+                break
+            bound, _, lower, upper, solution = heapq.heappop(queue)
+            fractions = np.abs(solution - np.round(solution))
+            branch = int(np.argmax(fractions))
+            if fractions[branch] <= 1e-6:
+                # whole slots already, nothing to branch on
+                best_value, best_solution = -bound, np.round(solution)
+                continue
+            candidate = problem.round_down(solution)
+            if problem.values @ candidate > best_value:
+                best_value, best_solution = float(problem.values @ candidate), candidate
+            split = math.floor(solution[branch])
+            for child_lower, child_upper in (
+                    (lower, {**upper, branch: split}),
+                    ({**lower, branch: split + 1}, upper)):
+                solved = problem.solve_node(child_lower, child_upper)
+                if solved is not None and solved[0] > best_value * (1 + relative_gap) + EPSILON:
+                    heapq.heappush(queue, (-solved[0], counter, child_lower, child_upper, solved[1]))
+                    counter += 1
+        # open nodes are the only place a better plan can still be
+        return problem.plan(best_solution, -queue[0][0] if queue else None)
+
+
+def format_plan(plan: CraftingPlan, names: List[str], slots: int, regen: np.ndarray) -> List[str]:
+    lines = [
+        f"Crafting plan for {slots} slots: {round(plan.value_per_minute, 3)} value/minute"
+        + (f" (at most {round(plan.gap * 100, 2)}% below the best plan)" if plan.gap > RELATIVE_GAP else "")
+    ]
+    for index, assigned_slots in plan.assignments:
+        lines.append(f"{round(assigned_slots, 3)} x {names[index]}")
+    for resource, used, available in zip(RESOURCES, plan.resource_usage, regen):
+        if used > EPSILON:
+            lines.append(f"{resource}: {round(used, 3)} of {round(float(available), 3)} per minute")
+    return lines
@@ -0,0 +1,428 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import datetime
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, List, Iterable, Optional
+
+import openpyxl
+
+from upgrade_effects import EFFECTS_SHEET, build_effect_columns
+
+DATA_DIRECTORY = "spreadsheet_data"
+MANIFEST_FILE = "manifest.json"
+SHEET_FILE_EXTENSION = ".bin"
+
+# bump whenever the binary layout or the derived data changes,
+# snapshots with a different version are rebuilt
+SNAPSHOT_VERSION = 5
+SNAPSHOT_MAGIC = b"STCSNAP\0"
+# magic, version, header length
+SHEET_HEADER = struct.Struct("<8sII")
+ALIGNMENT = 8
+# string id that marks a numeric cell in a mixed column
+NUMERIC_CELL = 0xFFFFFFFF
+
+# only these sheets are read by the calculator, the rest of the workbook is skipped
+USED_SHEETS = (
+    "Blueprints",
+    "Workers",
+    "Worker Levels"
+)
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+BLUEPRINTS_SHEET = "Blueprints"
+# derived sheet, the fingerprint of every Blueprints row, row for row
+FINGERPRINTS_SHEET = "Blueprint Fingerprints"
+# sheets that hold one row per blueprint, the rest is shared by every blueprint
+BLUEPRINT_SHEETS = (BLUEPRINTS_SHEET, EFFECTS_SHEET, FINGERPRINTS_SHEET)
+
+
+def _normalize_cell(value):
+    """
+    Converts an openpyxl cell value to the same representation
+    the old excel2json (xlrd) conversion produced, so the calculator
+    sees identical data: empty cells are "", numbers are floats and
+    times are fractions of a day.
+    :param value: raw cell value
+    :return: normalized cell value
+    """
+    if value is None:
+        return str()
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds() / SECONDS_PER_DAY
+    if isinstance(value, datetime.time):
+        seconds = value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+        return seconds / SECONDS_PER_DAY
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _read_sheet(worksheet) -> Dict[str, list]:
+    """
+    Streams a worksheet into columns. When a header is duplicated the
+    last column wins, same as with the per-row dicts excel2json wrote.
+    :param worksheet: read-only openpyxl worksheet
+    :return: dict of header -> list of normalized cell values
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, tuple())
+    column_indexes = dict()
+    for index, name in enumerate(header):
+        # columns without a header are only spacers in the spreadsheet
+        if name is None:
+            continue
+        column_indexes[str(name)] = index
+    columns = {name: list() for name in column_indexes}
+    for row in rows:
+        # skip trailing empty rows that read-only mode reports
+        if all(cell is None for cell in row):
+            continue
+        for name, index in column_indexes.items():
+            value = row[index] if index < len(row) else None
+            columns[name].append(_normalize_cell(value))
+    return columns
+
+
+def read_sheets(spreadsheet_file: str, sheet_names: Iterable[str] = USED_SHEETS) -> Dict[str, Dict[str, list]]:
+    """
+    Reads the requested sheets of the spreadsheet in read-only mode.
+    :param spreadsheet_file: path to the xlsx file
+    :param sheet_names: names of the sheets to read
+    :return: dict of sheet name -> columns
+    """
+    workbook = openpyxl.load_workbook(spreadsheet_file, read_only=True, data_only=True)
+    try:
+        return {name: _read_sheet(workbook[name]) for name in sheet_names}
+    finally:
+        workbook.close()
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprint_rows(columns: Dict[str, list]) -> List[str]:
+    """
+    :param columns: dict of header -> list of normalized cell values
+    :return: hash of every row, rows with the same cells in every column have the same fingerprint
+    """
+    names = sorted(columns)
+    return [
+        hashlib.blake2b(repr(row).encode("utf-8"), digest_size=8).hexdigest()
+        for row in zip(*(columns[name] for name in names))
+    ]
+
+
+class StringTable:
+    """
+    Interns every string of a sheet once, columns only store ids.
+    """
+
+    def __init__(self):
+        self.strings: List[str] = list()
+        self._ids: Dict[str, int] = dict()
+
+    def intern(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self._ids[value] = string_id
+            self.strings.append(value)
+        return string_id
+
+
+def encode_sheet(columns: Dict[str, list]) -> bytes:
+    """
+    Encodes sheet columns into the binary snapshot layout:
+    a fixed header, a JSON description of the columns with the string
+    table, and 8 byte aligned column blocks.
+
+    Columns are stored as one of three kinds:
+    - number: float64 values, non-numeric cells are NaN and decode to
+      the single placeholder string of the column (usually "---")
+    - string: uint32 ids into the string table
+    - mixed: a float64 block (NaN for text cells) plus a uint32 block
+      where NUMERIC_CELL means the float is the value
+    :param columns: dict of header -> list of normalized cell values
+    :return: bytes of the sheet file
+    """
+    strings = StringTable()
+    rows = len(next(iter(columns.values()), list()))
+    descriptors = list()
+    blocks: List[array] = list()
+    offset = 0
+
+    def add_block(block: array) -> int:
+        nonlocal offset
+        block_offset = offset
+        blocks.append(block)
+        offset = _align(offset + len(block) * block.itemsize)
+        return block_offset
+
+    for name, values in columns.items():
+        texts = {value for value in values if not isinstance(value, float)}
+        has_numbers = len(texts) == 0 or any(isinstance(value, float) for value in values)
+        descriptor = {"name": name}
+        if has_numbers and len(texts) <= 1:
+            descriptor["kind"] = "number"
+            descriptor["fill"] = strings.intern(texts.pop() if texts else str())
+            descriptor["offset"] = add_block(array(
+                "d", (value if isinstance(value, float) else math.nan for value in values)
+            ))
+        elif has_numbers:
+            descriptor["kind"] = "mixed"
+            descriptor["offset"] = add_block(array(
+                "d", (value if isinstance(value, float) else math.nan for value in values)
+            ))
+            descriptor["ids_offset"] = add_block(array(
+                "I", (NUMERIC_CELL if isinstance(value, float) else strings.intern(value) for value in values)
+            ))
+        else:
+            descriptor["kind"] = "string"
+            descriptor["offset"] = add_block(array("I", (strings.intern(value) for value in values)))
+        descriptors.append(descriptor)
+
+    header = json.dumps({
+        "rows": rows,
+        "byteorder": sys.byteorder,
+        "strings": strings.strings,
+        "columns": descriptors
+    }, separators=(",", ":")).encode("utf-8")
+    data_start = _align(SHEET_HEADER.size + len(header))
+    result = bytearray(data_start + offset)
+    SHEET_HEADER.pack_into(result, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header))
+    result[SHEET_HEADER.size:SHEET_HEADER.size + len(header)] = header
+    block_offset = data_start
+    for block in blocks:
+        raw = block.tobytes()
+        result[block_offset:block_offset + len(raw)] = raw
+        block_offset = _align(block_offset + len(raw))
+    return bytes(result)
+
+
+class SheetTable:
+    """
+    A memory mapped sheet of the snapshot. Numeric columns are exposed
+    as zero-copy float64 views, row dicts are only built on request.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as sheet_file:
+            self._buffer = mmap.mmap(sheet_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = SHEET_HEADER.unpack_from(self._buffer)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"{path} is not a version {SNAPSHOT_VERSION} snapshot")
+        header = json.loads(bytes(self._buffer[SHEET_HEADER.size:SHEET_HEADER.size + header_length]))
+        if header["byteorder"] != sys.byteorder:
+            raise SnapshotError(f"{path} was written on a {header['byteorder']} endian machine")
+        self.rows: int = header["rows"]
+        self.strings: List[str] = header["strings"]
+        self._columns: Dict[str, dict] = {column["name"]: column for column in header["columns"]}
+        self._data_start = _align(SHEET_HEADER.size + header_length)
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._columns.keys())
+
+    def _view(self, offset: int, typecode: str) -> memoryview:
+        start = self._data_start + offset
+        size = self.rows * struct.calcsize(typecode)
+        return memoryview(self._buffer)[start:start + size].cast(typecode)
+
+    def kind(self, name: str) -> str:
+        return self._columns[name]["kind"]
+
+    def numbers(self, name: str) -> memoryview:
+        """
+        :param name: column header
+        :return: float64 view of a number or mixed column, NaN where the cell is not a number
+        """
+        column = self._columns[name]
+        if column["kind"] == "string":
+            raise SnapshotError(f"Column {name} does not hold numbers")
+        return self._view(column["offset"], "d")
+
+    def string_ids(self, name: str) -> memoryview:
+        """
+        :param name: column header
+        :return: uint32 view of the string ids of a string column
+        """
+        column = self._columns[name]
+        if column["kind"] != "string":
+            raise SnapshotError(f"Column {name} does not hold strings")
+        return self._view(column["offset"], "I")
+
+    def column(self, name: str) -> list:
+        """
+        Decodes a column back to the normalized cell values.
+        :param name: column header
+        :return: list of floats and strings
+        """
+        column = self._columns[name]
+        strings = self.strings
+        if column["kind"] == "number":
+            fill = strings[column["fill"]]
+            return [fill if value != value else value for value in self._view(column["offset"], "d").tolist()]
+        if column["kind"] == "string":
+            return [strings[string_id] for string_id in self._view(column["offset"], "I").tolist()]
+        ids = self._view(column["ids_offset"], "I").tolist()
+        values = self._view(column["offset"], "d").tolist()
+        return [value if string_id == NUMERIC_CELL else strings[string_id] for value, string_id in zip(values, ids)]
+
+    def records(self) -> List[dict]:
+        names = self.column_names
+        return [dict(zip(names, row)) for row in zip(*(self.column(name) for name in names))]
+
+
+def _write_atomic(path: str, data: bytes):
+    # readers may still have the old file mapped, so never write into it
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as output:
+        output.write(data)
+    os.replace(temporary_path, path)
+
+
+def read_manifest(data_directory: str = DATA_DIRECTORY) -> Optional[dict]:
+    try:
+        with open(os.path.join(data_directory, MANIFEST_FILE)) as manifest_file:
+            return json.load(manifest_file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def generate_snapshot(spreadsheet_file: str, data_directory: str = DATA_DIRECTORY) -> dict:
+    """
+    Compiles the used sheets into one binary file per sheet and writes
+    a manifest that records the hash of the source spreadsheet.
+    :param spreadsheet_file: path to the xlsx file
+    :param data_directory: directory the snapshot is written to
+    :return: the written manifest
+    """
+    source_hash = hash_file(spreadsheet_file)
+    return write_snapshot(read_sheets(spreadsheet_file), os.path.basename(spreadsheet_file), source_hash,
+                          data_directory)
+
+
+def write_snapshot(sheets: Dict[str, Dict[str, list]], source: str, source_hash: str,
+                   data_directory: str = DATA_DIRECTORY) -> dict:
+    """
+    Writes already read sheets as a snapshot, e.g. generated test data.
+    Sheets whose bytes did not change since the previous snapshot in
+    data_directory are not rewritten.
+    :param sheets: sheet name -> column name -> cells, needs at least USED_SHEETS
+    :param source: name of where the sheets came from
+    :param source_hash: hash of the source, decides when the snapshot is outdated
+    :param data_directory: directory the snapshot is written to
+    :return: the written manifest
+    """
+    sheets = dict(sheets)
+    # upgrade texts are parsed here once instead of on every run
+    sheets[EFFECTS_SHEET] = build_effect_columns(sheets[BLUEPRINTS_SHEET])
+    sheets[FINGERPRINTS_SHEET] = {
+        "Name": list(sheets[BLUEPRINTS_SHEET]["Name"]),
+        "Fingerprint": fingerprint_rows(sheets[BLUEPRINTS_SHEET])
+    }
+    previous = read_manifest(data_directory) or dict()
+    previous_hashes = previous.get("sheet_hashes", dict()) if previous.get("version") == SNAPSHOT_VERSION else dict()
+    os.makedirs(data_directory, exist_ok=True)
+    sheet_hashes = dict()
+    rewritten = list()
+    for name, columns in sheets.items():
+        data = encode_sheet(columns)
+        sheet_hashes[name] = hash_bytes(data)
+        path = os.path.join(data_directory, name + SHEET_FILE_EXTENSION)
+        if previous_hashes.get(name) == sheet_hashes[name] and os.path.exists(path):
+            continue
+        _write_atomic(path, data)
+        rewritten.append(name)
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "source": source,
+        "source_hash": source_hash,
+        "sheets": list(sheets.keys()),
+        "sheet_hashes": sheet_hashes,
+        # what results depend on: the blueprint rows, and the sheets every blueprint shares
+        "blueprints_hash": sheet_hashes[BLUEPRINTS_SHEET],
+        "shared_hash": hash_bytes("".join(
+            sheet_hashes[name] for name in sorted(sheet_hashes) if name not in BLUEPRINT_SHEETS
+        ).encode("utf-8")),
+        "rewritten_sheets": rewritten
+    }
+    _write_atomic(os.path.join(data_directory, MANIFEST_FILE), json.dumps(manifest, indent=4).encode("utf-8"))
+    return manifest
+
+
+def snapshot_outdated(spreadsheet_file: str, data_directory: str = DATA_DIRECTORY) -> bool:
+    """
+    :param spreadsheet_file: path to the xlsx file
+    :param data_directory: directory that holds the snapshot
+    :return: True if the spreadsheet changed since the snapshot was generated or the snapshot layout is outdated
+    """
+    manifest = read_manifest(data_directory)
+    if not os.path.exists(spreadsheet_file):
+        if manifest is None:
+            raise FileNotFoundError(spreadsheet_file)
+        # nothing to compare against, use what was generated before
+        return False
+    if (
+        manifest is not None
+        and manifest.get("version") == SNAPSHOT_VERSION
+        and manifest.get("source_hash") == hash_file(spreadsheet_file)
+    ):
+        return False
+    return True
+
+
+def ensure_snapshot(spreadsheet_file: str, data_directory: str = DATA_DIRECTORY) -> bool:
+    """
+    Rebuilds the snapshot only if it is outdated, see snapshot_outdated.
+    :return: True if the snapshot was rebuilt
+    """
+    if not snapshot_outdated(spreadsheet_file, data_directory):
+        return False
+    generate_snapshot(spreadsheet_file, data_directory)
+    return True
+
+
+def open_sheet(sheet_name: str, data_directory: str = DATA_DIRECTORY) -> SheetTable:
+    return SheetTable(os.path.join(data_directory, sheet_name + SHEET_FILE_EXTENSION))
+
+
+def load_sheet(sheet_name: str, data_directory: str = DATA_DIRECTORY) -> List[dict]:
+    """
+    Loads one sheet from the snapshot as a list of row dicts, the
+    same shape the per-sheet JSON files used to have.
+    :param sheet_name: name of the sheet, e.g. "Blueprints"
+    :param data_directory: directory that holds the snapshot
+    :return: list of row dicts
+    """
+    return open_sheet(sheet_name, data_directory).records()
@@ -0,0 +1,161 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import copy
+from typing import Dict, Optional
+
+import numpy as np
+
+from ascensions import ascension_bonuses
+from blueprint_catalogue import NO_WORKER, GameDataset
+from class_definitions import ShopTitansPlayerConfig
+from component_costs import component_prices
+from scoring_engine import BlueprintMatrix, compute_energy_metrics, compute_metrics, market_multipliers, round_values
+
+
+class IncrementalCalculator:
+    """
+    Keeps the scores of the last player config and, for the next config,
+    recomputes only the blueprints whose inputs changed.
+
+    Every blueprint depends on:
+    - the levels of its required workers
+    - the guild craft speed boost, if it requires any worker
+    - the ascension level of its item type and the bonuses of the levels, for its value and crafting time
+    - the prices of its components, directly or through crafted components, and the
+      ascended values of its crafted components
+    - the energy cap and the surcharge and discount multipliers, for the energy columns
+    Buildings and resource boosts only change regeneration, which none of
+    the per blueprint metrics depend on, so they never trigger a recompute.
+    """
+
+    def __init__(self, dataset: GameDataset):
+        self.dataset = dataset
+        catalogue = dataset.catalogue
+        # upgraded, before the player's ascension bonuses
+        self.base_values, self.base_crafting_times, self.resources = catalogue.upgraded()
+        self.ascension_index = catalogue.ascension_index()
+        self.values: Optional[np.ndarray] = None
+        self.crafting_times: Optional[np.ndarray] = None
+        self.component_costs: Optional[np.ndarray] = None
+        self.metrics: Optional[Dict[str, np.ndarray]] = None
+        # number of blueprints the last calculate() recomputed
+        self.recomputed = 0
+        self._inputs: Optional[dict] = None
+        self._jobs = {name: job for job, name in dataset.worker_names.items()}
+
+    @staticmethod
+    def _player_inputs(player_config: ShopTitansPlayerConfig) -> dict:
+        return {
+            "workers": dict(player_config.workers),
+            "craft_speed": player_config.guild_boosts.craft_speed,
+            "ascensions": dict(player_config.get("ascensions") or dict()),
+            "ascension_bonuses": copy.deepcopy(ascension_bonuses(player_config.get("game_constants"))),
+            "component_prices": component_prices(player_config),
+            "max_energy": player_config.get("max_energy"),
+            "market_multipliers": market_multipliers(player_config.get("game_constants"))
+        }
+
+    def _component_costs(self, inputs: dict) -> np.ndarray:
+        catalogue = self.dataset.catalogue
+        # crafted components cost their ascended value
+        keys = ("component_prices", "ascensions", "ascension_bonuses")
+        if self._inputs is not None and all(inputs[key] == self._inputs[key] for key in keys):
+            return self.component_costs
+        return catalogue.component_costs(
+            inputs["component_prices"], inputs["ascensions"], inputs["ascension_bonuses"]
+        ).costs
+
+    def _affected(self, inputs: dict, component_costs: np.ndarray) -> Optional[np.ndarray]:
+        """
+        :param inputs: player inputs of the new config
+        :param component_costs: component costs of the new config
+        :return: mask of the blueprints to recompute, None for all of them
+        """
+        if self._inputs is None:
+            return None
+        for key in ("max_energy", "market_multipliers", "ascension_bonuses"):
+            if inputs[key] != self._inputs[key]:
+                return None
+        catalogue = self.dataset.catalogue
+        affected = np.zeros(len(catalogue), dtype=bool)
+        if inputs["craft_speed"] != self._inputs["craft_speed"]:
+            affected |= (catalogue.workers != NO_WORKER).any(axis=1)
+        previous_workers = self._inputs["workers"]
+        for worker, level in inputs["workers"].items():
+            if previous_workers.get(worker) != level:
+                affected |= catalogue.uses_job(self._jobs[worker])
+        previous_ascensions = self._inputs["ascensions"]
+        for ascension, level in inputs["ascensions"].items():
+            if previous_ascensions.get(ascension) != level:
+                affected |= self.ascension_index.uses_type(ascension)
+        # resolving already followed crafted components, compare the results
+        affected |= component_costs != self.component_costs
+        return affected
+
+    def calculate(self, player_config: ShopTitansPlayerConfig) -> Dict[str, np.ndarray]:
+        """
+        :param player_config: config to score
+        :return: dict of metric name -> array with one value per blueprint
+        """
+        inputs = self._player_inputs(player_config)
+        craft_times = {
+            worker: self.dataset.worker_craft_time(level, inputs["craft_speed"])
+            for worker, level in inputs["workers"].items()
+        }
+        component_costs = self._component_costs(inputs)
+        affected = self._affected(inputs, component_costs)
+        self._inputs = inputs
+        self.component_costs = component_costs
+        if affected is None:
+            values, crafting_times = self.ascension_index.apply(
+                self.base_values, self.base_crafting_times, inputs["ascensions"],
+                bonuses=inputs["ascension_bonuses"]
+            )
+            self.values = round_values(values)
+            self.crafting_times = self.dataset.catalogue.apply_workers(
+                crafting_times, craft_times, self.dataset.worker_names
+            )
+            matrix = BlueprintMatrix(
+                self.dataset.catalogue.names, self.values, self.crafting_times, self.resources
+            )
+            self.metrics = compute_metrics(matrix, profits=self.values - component_costs)
+            self.metrics.update(compute_energy_metrics(
+                matrix, component_costs, self.dataset.catalogue.energy(), inputs["max_energy"],
+                *inputs["market_multipliers"]
+            ))
+            self.recomputed = len(self.values)
+            return self.metrics
+
+        rows = np.flatnonzero(affected)
+        self.recomputed = len(rows)
+        if len(rows) == 0:
+            return self.metrics
+        values, crafting_times = self.ascension_index.apply(
+            self.base_values[rows], self.base_crafting_times[rows], inputs["ascensions"], rows,
+            inputs["ascension_bonuses"]
+        )
+        # copies, so arrays handed out for the previous config stay valid
+        self.values = self.values.copy()
+        self.values[rows] = round_values(values)
+        self.crafting_times = self.crafting_times.copy()
+        self.crafting_times[rows] = self.dataset.catalogue.apply_workers(
+            crafting_times, craft_times, self.dataset.worker_names, rows
+        )
+        matrix = BlueprintMatrix(
+            [self.dataset.catalogue.names[row] for row in rows],
+            self.values[rows],
+            self.crafting_times[rows],
+            self.resources[rows]
+        )
+        changed = compute_metrics(matrix, profits=self.values[rows] - component_costs[rows])
+        changed.update(compute_energy_metrics(
+            matrix, component_costs[rows], self.dataset.catalogue.energy().take(rows), inputs["max_energy"],
+            *inputs["market_multipliers"]
+        ))
+        metrics = dict()
+        for key, column in self.metrics.items():
+            column = column.copy()
+            column[rows] = changed[key]
+            metrics[key] = column
+        self.metrics = metrics
+        return self.metrics
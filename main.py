@@ -1,16 +1,34 @@
 #!/bin/bash python
 # -*- coding: utf-8 -*-
 import json
-import re
+import os
 import sys
 import traceback
 from argparse import ArgumentParser
-from typing import List, Any, Callable, Union
+from typing import Dict, List, Optional, Tuple
 
-import excel2json
+import numpy as np
 
+import profiling
 from additional_data import *
 from class_definitions import *
+from ascensions import ascension_bonuses
+from batch import iter_player_configs, player_result_path
+from blueprint_catalogue import NO_WORKER, GameDataset
+from component_costs import component_prices
+from config_validation import InvalidConfigError, validate_player_config
+from game_data import SnapshotError, read_manifest, snapshot_outdated
+from parallel import imap_ordered, shared_dataset
+from result_writers import WRITERS, TextTableWriter, open_writer
+from simulator import DEFAULT_HOURS, format_simulation, simulate_player
+from snapshot_diff import DEFAULT_REPORT_TOP, format_report, regenerate
+from sweep import SensitivitySweep, format_sweep
+from crafting_planner import CraftingPlanner, format_plan
+from incremental import IncrementalCalculator
+from quality_simulation import DEFAULT_SAMPLES, DEFAULT_SEED, format_quality, quality_table, simulate_quality
+from result_cache import CACHE_DIRECTORY, ResultCache, cache_key, shared_cache
+from ranking import DEFAULT_SORT, RankingQuery, candidate_mask, parse_comparison, rank
+from scoring_engine import ENERGY_METRIC_NAMES, METRIC_NAMES, RESOURCES, regeneration_rate, regeneration_rates
 
 
 def generate_args():
@@ -35,40 +53,270 @@ def generate_args():
         type=str,
         default="config.json"
     )
-    return args.parse_args()
+    args.add_argument(
+        "--batch", "-b",
+        type=str,
+        help="directory of player config JSON files, or a JSONL file of configs (- for stdin)"
+    )
+    args.add_argument(
+        "--output-dir", "-o",
+        type=str,
+        default="results",
+        help="where batch mode writes one result per player"
+    )
+    args.add_argument(
+        "--sweep",
+        action="store_true",
+        help="show how much every +1 worker or building level raises the best value/minute"
+    )
+    args.add_argument(
+        "--plan",
+        action="store_true",
+        help="find the blueprint mix for your slots that earns the most within your resource regeneration"
+    )
+    args.add_argument(
+        "--simulate",
+        type=float,
+        nargs="?",
+        const=DEFAULT_HOURS,
+        metavar="HOURS",
+        help=f"play out crafting the best blueprints for HOURS (default {DEFAULT_HOURS}) with your slots, "
+             f"regeneration and storage, with --batch for every player"
+    )
+    args.add_argument(
+        "--monte-carlo",
+        action="store_true",
+        help="sample quality procs and multicrafts, shows the expected value/minute and its spread"
+    )
+    args.add_argument(
+        "--samples",
+        type=int,
+        default=DEFAULT_SAMPLES,
+        help="crafts sampled per blueprint by --monte-carlo"
+    )
+    args.add_argument(
+        "--seed",
+        type=int,
+        default=DEFAULT_SEED,
+        help="seed of --monte-carlo, the same seed gives the same numbers"
+    )
+    args.add_argument(
+        "--slots",
+        type=int,
+        default=DEFAULT_CRAFTING_SLOTS,
+        help="crafting slots the sweep and the plan assume"
+    )
+    args.add_argument(
+        "--output-format", "-f",
+        choices=list(WRITERS),
+        default="text",
+        help="format of the result file, parquet needs pyarrow"
+    )
+    args.add_argument(
+        "--output",
+        type=str,
+        help="result file of a single calculation, result.<format extension> by default"
+    )
+    args.add_argument(
+        "--quiet", "-q",
+        action="store_true",
+        help="do not print the result table"
+    )
+    args.add_argument(
+        "--sort",
+        choices=METRIC_NAMES + ENERGY_METRIC_NAMES,
+        help=f"rank the blueprints by this metric, best first (default {DEFAULT_SORT} when filtering)"
+    )
+    args.add_argument(
+        "--ascending",
+        action="store_true",
+        help="rank the lowest values first"
+    )
+    args.add_argument(
+        "--top",
+        type=int,
+        help="only write the best N blueprints"
+    )
+    args.add_argument(
+        "--tier",
+        type=str,
+        help="tier filter like '>=8', '<5' or '10'"
+    )
+    args.add_argument(
+        "--worker",
+        action="append",
+        default=list(),
+        help="only blueprints that require this worker (job or name), can be repeated"
+    )
+    args.add_argument(
+        "--uses",
+        action="append",
+        default=list(),
+        choices=RESOURCES,
+        help="only blueprints that use this resource, can be repeated"
+    )
+    args.add_argument(
+        "--without",
+        action="append",
+        default=list(),
+        choices=RESOURCES,
+        help="only blueprints that do not use this resource, can be repeated"
+    )
+    for resource in RESOURCES:
+        args.add_argument(
+            f"--max-{resource}-per-minute",
+            type=float,
+            help=f"only blueprints that use at most this much {resource} per minute per slot"
+        )
+    args.add_argument(
+        "--skyline",
+        type=str,
+        help="comma separated metrics, only keep the blueprints no other blueprint beats in all of them. "
+             "Resource per minute metrics are minimized, the rest maximized, append :min or :max to change it"
+    )
+    args.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always calculate, do not read or write cached results"
+    )
+    args.add_argument(
+        "--cache-dir",
+        type=str,
+        default=CACHE_DIRECTORY,
+        help="directory of the cached results"
+    )
+    args.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=1,
+        help="worker processes for batch mode, 0 uses every CPU"
+    )
+    args.add_argument(
+        "--profile",
+        action="store_true",
+        help="print how long every stage took, counters and peak memory"
+    )
+    args.add_argument(
+        "--profile-trace",
+        type=str,
+        help="also write the stages as a Chrome trace JSON file (chrome://tracing, ui.perfetto.dev)"
+    )
+    parsed = args.parse_args()
+    # ranking options are checked here, so a bad one is a usage error instead of a traceback
+    parsed.query = query_from_args(parsed, args)
+    return parsed
+
+
+def query_from_args(args, parser: ArgumentParser) -> Optional[RankingQuery]:
+    """
+    :param args: parsed CLI arguments
+    :param parser: reports invalid ranking options
+    :return: ranking query of the CLI arguments, None if no ranking option was passed
+    """
+    for worker in args.worker:
+        # a worker is given by job or by the name the config levels it under
+        if worker not in WorkerTranslationDict.__annotations__ and worker not in WorkerLevels.__annotations__:
+            parser.error(f"unknown worker {worker}, use a job like Blacksmith or a worker name like Wallace")
+    max_per_minute = tuple(
+        (resource, getattr(args, f"max_{resource}_per_minute")) for resource in RESOURCES
+        if getattr(args, f"max_{resource}_per_minute") is not None
+    )
+    skyline = tuple(objective for objective in (args.skyline or "").split(",") if objective.strip())
+    if not (args.sort or args.top is not None or args.tier or args.worker or args.uses or args.without
+            or max_per_minute or skyline):
+        return None
+    return RankingQuery(
+        sort=args.sort or DEFAULT_SORT,
+        top=args.top,
+        ascending=args.ascending,
+        tier=_tier_from_args(args.tier, parser) if args.tier else None,
+        workers=tuple(args.worker),
+        uses=tuple(args.uses),
+        without=tuple(args.without),
+        max_per_minute=max_per_minute,
+        skyline=skyline
+    )
+
+
+def _tier_from_args(tier: str, parser: ArgumentParser) -> Tuple[str, float]:
+    try:
+        return parse_comparison(tier)
+    except ValueError:
+        parser.error(f"invalid tier filter {tier}, use e.g. '>=8', '<5' or '10'")
 
 
 class ShopTitansCalculator:
     class DataNotGeneratedError(Exception):
         pass
 
-    def __init__(self, config_file: str):
+    def __init__(self, config_file: str = None, dataset: GameDataset = None,
+                 player_config: dict = None, result_path: str = "result.txt", echo: bool = True,
+                 output_format: str = "text"):
+        """
+        :param config_file: path to a player config JSON, or
+        :param player_config: an already parsed player config
+        :param dataset: shared game data, loaded from the snapshot if not passed
+        :param result_path: where the result is written
+        :param echo: also print the result as a text table
+        :param output_format: format of the result file, a key of result_writers.WRITERS
+        :raise InvalidConfigError: before the result file is touched
+        """
+        self.echo = TextTableWriter(sys.stdout) if echo else None
+        # prep game data, shared between calculators in batch mode
+        if dataset is None:
+            try:
+                dataset = GameDataset.load()
+            except (FileNotFoundError, SnapshotError):
+                self.data_not_generated()
+        self.dataset = dataset
+        # prep player config, validated against the game data
+        if player_config is None:
+            with open(config_file) as player_config_file:
+                player_config = json.load(player_config_file)
+        self.player_config = validate_player_config(player_config, dataset)
         # prep result file
-        self.result_file = open("result.txt", "w")
-        # self.result_json = open("result.json", "w")
-        # prep player config
-        raw_data = json.load(open(config_file))
+        self.result_path = result_path
+        self.result_writer = open_writer(output_format, result_path)
         try:
-            self.player_config = ShopTitansPlayerConfig(**raw_data)
-        except ValueError:
-            print("Invalid JSON input file")
-        # prep translation data for workers
-        raw_worker_translation_data = json.load(open("spreadsheet_data/Workers.json"))
-        worker_translation_data = dict()
-        for worker in raw_worker_translation_data:
-            worker_translation_data[worker["Worker"]] = worker["Name"]
-        self.worker_translation_dict = WorkerTranslationDict(**worker_translation_data)
-        # prep calc config
-        self.calc_config = self.generate_calc_config()
+            # prep translation data for workers
+            self.worker_translation_dict = WorkerTranslationDict(**dataset.worker_names)
+            # prep calc config
+            with profiling.span("generate_calc_config"):
+                self.calc_config = self.generate_calc_config()
+        except BaseException:
+            self._discard_result()
+            raise
+
+    def _discard_result(self):
+        """
+        Closes the result file and removes it, a failed calculation leaves no partial result behind.
+        """
+        self.result_writer.close()
+        try:
+            os.remove(self.result_path)
+        except FileNotFoundError:
+            pass
 
     def _write(self, msg: str):
-        print(msg)
-        self.result_file.write(f"{msg}\n")
+        if self.echo is not None:
+            self.echo.write_line(msg)
+        self.result_writer.write_line(msg)
         return None
 
     @staticmethod
-    def generate_data(spreadsheet_file):
-        excel2json.convert_from_file(spreadsheet_file, "spreadsheet_data")
+    def generate_data(spreadsheet_file: str, config_file: str = None, sort: str = None, top: int = None):
+        """
+        Regenerates the snapshot and prints what the patch changed and how
+        the ranking of config_file moved, if there is such a config.
+        """
+        player_config = None
+        if config_file is not None and os.path.exists(config_file):
+            with open(config_file) as player_config_file:
+                player_config = ShopTitansPlayerConfig(**json.load(player_config_file))
+        with profiling.span("generate snapshot"):
+            report = regenerate(spreadsheet_file, player_config, sort or DEFAULT_SORT, top or DEFAULT_REPORT_TOP)
+        for line in format_report(report):
+            print(line)
 
     def data_not_generated(self):
         raise self.DataNotGeneratedError("Data is not generated")
@@ -76,24 +324,10 @@ class ShopTitansCalculator:
     def generate_calc_config(self) -> ShopTitansCalculatorConfig:
         try:
             result = ShopTitansCalculatorConfig()
-            levels_json = json.load(open("spreadsheet_data/Worker Levels.json"))
-            translation_dict = dict()
-            translation_dict[1] = 0
-            for level in levels_json:
-                try:
-                    worker_level = int(level["Worker Level"])
-                    # craft speed needs to be rounded to 2 decimals, because lulfloats
-                    craft_speed = round(
-                        1.0 - float(level["Crafting Speed Bonus"]), 2
-                    )
-                    translation_dict[worker_level] = craft_speed
-                except ValueError:
-                    pass
-
             self._write(DIVIDER_STRING)
             result.player_craft_times = WorkerCraftTimes()
             for worker, worker_level in self.player_config.workers.items():
-                craft_time = translation_dict[worker_level] * self.player_config.guild_boosts.craft_speed
+                craft_time = self.dataset.worker_craft_time(worker_level, self.player_config.guild_boosts.craft_speed)
                 result.player_craft_times.set_attribute(worker, craft_time)
                 self._write(f"Worker: {worker}, "
                             f"level: {worker_level}, "
@@ -101,26 +335,12 @@ class ShopTitansCalculator:
             self._write(DIVIDER_STRING)
 
             regen_dict_data = {
-                "iron": ResourceProductionDict["t1"][self.player_config.buildings.IronMine] *
-                self.player_config.guild_boosts.resource_generation,
-                "wood": ResourceProductionDict["t1"][self.player_config.buildings.Lumberyard] *
-                self.player_config.guild_boosts.resource_generation,
-                "leather": ResourceProductionDict["t1"][self.player_config.buildings.Tannery] *
-                self.player_config.guild_boosts.resource_generation,
-                "herbs": ResourceProductionDict["t1"][self.player_config.buildings.Garden] *
-                self.player_config.guild_boosts.resource_generation,
-                "steel": ResourceProductionDict["t2"][self.player_config.buildings.Smelter] *
-                self.player_config.guild_boosts.resource_generation,
-                "ironwood": ResourceProductionDict["t2"][self.player_config.buildings.Sawmill] *
-                self.player_config.guild_boosts.resource_generation,
-                "fabric": ResourceProductionDict["t2"][self.player_config.buildings.WeaverMill] *
-                self.player_config.guild_boosts.resource_generation,
-                "oils": ResourceProductionDict["t2"][self.player_config.buildings.OilPress] *
-                self.player_config.guild_boosts.resource_generation,
-                "ether": ResourceProductionDict["t3"][self.player_config.buildings.EtherWell] *
-                self.player_config.guild_boosts.resource_generation,
-                "jewels": ResourceProductionDict["t3"][self.player_config.buildings.JewelStorehouse] *
-                self.player_config.guild_boosts.resource_generation,
+                resource: regeneration_rate(
+                    building,
+                    self.player_config.buildings[building],
+                    self.player_config.guild_boosts.resource_generation
+                )
+                for building, resource in ResourceBuildingsTranslationDict.items()
             }
             regen_values = PlayerRegenerationValues(**regen_dict_data)
             result.set_attribute("player_regen_values", regen_values)
@@ -135,236 +355,107 @@ class ShopTitansCalculator:
             return result
         except ValueError:
             traceback.print_exc()
-            self.result_file.close()
+            self.result_writer.close()
             self.data_not_generated()
 
-    def calculate(self):
-        # make sure base_keys are lowercase
-        special_base_keys = [
-            "crafting time (seconds)",
-            "required worker",
-            "required worker "
-        ]
-        base_keys = [
-            "name",
-            "value",
-            "tier",
-            "iron",
-            "wood",
-            "leather",
-            "herbs",
-            "steel",
-            "ironwood",
-            "oils",
-            "fabric",
-            # TODO: fix to ether
-            "ether",
-            "jewels"
-        ]
-        # make sure these are all lowercase
-        assert False not in [x.lower() == x for x in special_base_keys]
-        assert False not in [x.lower() == x for x in base_keys]
-        upgrade_keys = [
-            "Crafting Upgrade 1",
-            "Crafting Upgrade 2",
-            "Crafting Upgrade 3",
-            "Crafting Upgrade 4",
-            "Crafting Upgrade 5",
-            "Ascension Upgrade 1",
-            "Ascension Upgrade 2",
-            "Ascension Upgrade 3"
-        ]
-        bp_json: List[dict] = json.load(open("spreadsheet_data/Blueprints.json"))
+    def calculate(self, query: RankingQuery = None):
+        """
+        :param query: only write the blueprints the query ranks, best first,
+        all of them in catalogue order if None
+        """
+        try:
+            self._calculate(query)
+        except BaseException:
+            self._discard_result()
+            raise
 
-        # apply upgrades to blueprints (mastery, ascensions)
-        transformed_bps = list()
-        for blueprint in bp_json:
-            transformed_bp = TransformedBP(
-                workers=list(),
-                components=list()
-            )
-            # transformed_bp.workers = list()
-            # get base values
-            for key, value in blueprint.items():
-                if key.lower() in base_keys:
-                    # skip empty keys
-                    if value == "---":
-                        continue
-                    try:
-                        transformed_bp.set_attribute(key.lower(), value)
-                    except ValueError:
-                        pass
-                elif key.lower() in special_base_keys:
-                    if key.lower() == "crafting time (seconds)":
-                        transformed_bp.set_attribute("crafting_time", value)
-                    elif key.lower() in ["required worker", "required worker "]:
-                        if value in self.worker_translation_dict:
-                            transformed_bp.workers.append(self.worker_translation_dict[value])
-            component_1 = blueprint.get("Component1", str()) if blueprint.get("Component1", str()) != "---" else str()
-            quality_1 = blueprint.get("Component Quality1", str()) if blueprint.get("Component Quality1", str()) != "---" else str()
-            amount_1 = blueprint.get("Amount Needed1", str())
-            component_2 = blueprint.get("Component2", str())
-            quality_2 = blueprint.get("Component Quality2", str())
-            amount_2 = blueprint.get("Amount Needed2", str())
-            transformed_bp.components.append(
-                ComponentRequirement(
-                    name=component_1,
-                    amount=amount_1,
-                    value=0
-                )
+    def _calculate(self, query: RankingQuery = None):
+        catalogue = self.dataset.catalogue
+        # upgrades (mastery, ascensions) were compiled with the data, only the numbers are applied here,
+        # ascension tree bonuses and player values are applied and all metrics are computed in one batched pass
+        with profiling.span("metrics"):
+            if query is None:
+                scorer = IncrementalCalculator(self.dataset)
+                metrics = scorer.calculate(self.player_config)
+                rows = np.arange(len(catalogue))
+                values, crafting_times, resources = scorer.values, scorer.crafting_times, scorer.resources
+            else:
+                # filters and the limit are applied before any record is built
+                ranking = rank(self.dataset, self.player_config, query)
+                metrics = ranking.metrics
+                rows, values, crafting_times, resources = \
+                    ranking.rows, ranking.values, ranking.crafting_times, ranking.resources
+        profiling.count("blueprints processed", len(rows))
+        component_costs = catalogue.component_costs(
+            component_prices(self.player_config), self.player_config.get("ascensions") or dict(),
+            ascension_bonuses(self.player_config.get("game_constants"))
+        )
+        if component_costs.missing:
+            self._write(f"Components without a price, counted as free: {', '.join(sorted(component_costs.missing))}")
+        if component_costs.from_components:
+            self._write(
+                "Crafted components without a price or value, counted as their own components: "
+                f"{', '.join(sorted(component_costs.from_components))}"
             )
-            transformed_bp.components.append(
-                ComponentRequirement(
-                    name=component_2,
-                    amount=amount_2,
-                    value=0
-                )
+        if component_costs.missing or component_costs.from_components:
+            self._write(DIVIDER_STRING)
+        with profiling.span("build records"):
+            final_data_list = self._records(
+                rows, values, crafting_times, resources, component_costs.unit_costs[rows], metrics
             )
+        with profiling.span("write result"):
+            if self.echo is not None:
+                self.echo.write_rows(final_data_list)
+            self.result_writer.write_rows(final_data_list)
+            self.result_writer.close()
+        profiling.count("rows written", len(final_data_list))
+
+    def _records(self, rows: np.ndarray, values: np.ndarray, crafting_times: np.ndarray, resources: np.ndarray,
+                 component_unit_costs: np.ndarray, metrics: Dict[str, np.ndarray]) -> List[FinalBPData]:
+        """
+        :return: output records of the blueprints in rows, all arrays are aligned with rows
+        """
+        catalogue = self.dataset.catalogue
+        metrics = {key: column.tolist() for key, column in metrics.items()}
+        component_amounts = catalogue.component_amounts()[rows].tolist()
+        component_unit_costs = component_unit_costs.tolist()
 
-            # fix value, resource costs
-            resource_regex = r"-(\d+) (\w+) Spent"
-            for key, value in blueprint.items():
-                adjusted_value_coeffient = 1
-                adjusted_time_coefficient = 1
-                if key in upgrade_keys:
-                    # extract value increase
-                    if "Value Increase" in value:
-                        adjusted_value_coeffient *= float(value.split()[0][1:])
-                    elif "Craft Time Reduction" in value:
-                        extracted_coefficient = float(1 - (float(value.split()[0][1:-1]) / 100))
-                        adjusted_time_coefficient *= extracted_coefficient
-                    elif re.match(resource_regex, value):
-                        amount, resource = re.findall(resource_regex, value)[0]
-                        amount = int(amount)
-                        if resource.lower() in transformed_bp:
-                            transformed_bp.set_attribute(
-                                resource.lower(),
-                                transformed_bp[resource.lower()] - amount
-                            )
-                transformed_bp.value *= adjusted_value_coeffient
-                transformed_bp.crafting_time *= adjusted_time_coefficient
-            # apply player values
-            for worker in transformed_bp.workers:
-                transformed_bp.crafting_time *= self.calc_config.player_craft_times[worker]
-            # round value
-            transformed_bp.value = self._round(transformed_bp.value)
+        transformed_bps: List[TransformedBP] = list()
+        for row, tier, value, crafting_time, worker_indexes, costs, amounts, unit_costs in zip(
+                rows.tolist(), catalogue.tiers[rows].astype(int).tolist(), values.astype(int).tolist(),
+                crafting_times.tolist(), catalogue.workers[rows].tolist(), resources.tolist(),
+                component_amounts, component_unit_costs):
+            transformed_bp = TransformedBP(
+                name=catalogue.names[row],
+                tier=tier,
+                value=value,
+                crafting_time=crafting_time,
+                workers=[
+                    self.worker_translation_dict[catalogue.jobs[worker_index]]
+                    for worker_index in worker_indexes if worker_index != NO_WORKER
+                ],
+                components=[
+                    ComponentRequirement(name=component_name, amount=int(amount), value=int(unit_cost))
+                    for (component_name, quality, _), amount, unit_cost
+                    in zip(catalogue.components[row], amounts, unit_costs)
+                ]
+            )
+            for resource, cost in zip(RESOURCES, costs):
+                # skip resources the blueprint does not use, costs are whole like the blueprint records
+                if cost == cost:
+                    transformed_bp.set_attribute(resource, int(cost))
             transformed_bps.append(transformed_bp)
 
-        # now prep the data from transformed BPs
-        final_data_list: List[FinalBPData] = list()
-        no_resource_found = -1
-        # noinspection PyUnusedLocal
-        resource_gone_fix: Callable[[Any], Union[int, Any]] = lambda x: no_resource_found if x == 0 else x
-        for transformed_bp in transformed_bps:
-            # get value, calculate profit
-            value = transformed_bp.value
-            profit = value
-            # in mins
-            craft_time = transformed_bp.crafting_time / 60
-            # resources
-            # if upgrades make a resource go to 0, choose -1
-            # t1
-            iron: int = max(resource_gone_fix(transformed_bp.get("iron", no_resource_found)), no_resource_found)
-            wood: int = max(resource_gone_fix(transformed_bp.get("wood", no_resource_found)), no_resource_found)
-            leather: int = max(resource_gone_fix(transformed_bp.get("leather", no_resource_found)), no_resource_found)
-            herbs: int = max(resource_gone_fix(transformed_bp.get("herbs", no_resource_found)), no_resource_found)
-            # t2
-            steel: int = max(resource_gone_fix(transformed_bp.get("steel", no_resource_found)), no_resource_found)
-            ironwood: int = max(resource_gone_fix(transformed_bp.get("ironwood", no_resource_found)), no_resource_found)
-            fabric: int = max(resource_gone_fix(transformed_bp.get("fabric", no_resource_found)), no_resource_found)
-            oils: int = max(resource_gone_fix(transformed_bp.get("oils", no_resource_found)), no_resource_found)
-            # t3
-            ether: int = max(resource_gone_fix(transformed_bp.get("ether", no_resource_found)), no_resource_found)
-            jewels: int = max(resource_gone_fix(transformed_bp.get("jewels", no_resource_found)), no_resource_found)
-            calculated_data = TransformedBPData(
-                # general
-                name=transformed_bp.name,
-                value_per_minute_per_slot=value / craft_time,
-                profit_per_minute_per_slot=profit / craft_time,
-                # if iron < 0 due to point above, choose 0
-                # t1
-                iron_per_minute_per_slot=max(iron / craft_time, 0),
-                wood_per_minute_per_slot=max(wood / craft_time, 0),
-                leather_per_minute_per_slot=max(leather / craft_time, 0),
-                herbs_per_minute_per_slot=max(herbs / craft_time, 0),
-                # t2
-                steel_per_minute_per_slot=max(steel / craft_time, 0),
-                ironwood_per_minute_per_slot=max(ironwood / craft_time, 0),
-                fabric_per_minute_per_slot=max(fabric / craft_time, 0),
-                oils_per_minute_per_slot=max(oils / craft_time, 0),
-                # t3
-                ether_per_minute_per_slot=max(ether / craft_time, 0),
-                jewels_per_minute_per_slot=max(jewels / craft_time, 0),
-                # t1
-                value_per_iron=max(value / iron, 0),
-                value_per_wood=max(value / wood, 0),
-                value_per_leather=max(value / leather, 0),
-                value_per_herbs=max(value / herbs, 0),
-                # t2
-                value_per_steel=max(value / steel, 0),
-                value_per_ironwood=max(value / ironwood, 0),
-                value_per_fabric=max(value / fabric, 0),
-                value_per_oils=max(value / oils, 0),
-                # t3
-                value_per_ether=max(value / ether, 0),
-                value_per_jewels=max(value / jewels, 0)
+        # now prep the data from transformed BPs, metric fields are in METRIC_NAMES then ENERGY_METRIC_NAMES order
+        return [
+            FinalBPData(
+                transformed_data=transformed_bp,
+                calculated_values=TransformedBPData(transformed_bp.name, *row)
             )
-            final_data_list.append(
-                FinalBPData(
-                    transformed_data=transformed_bp,
-                    calculated_values=calculated_data
-                )
+            for transformed_bp, row in zip(
+                transformed_bps, zip(*(metrics[key] for key in METRIC_NAMES + ENERGY_METRIC_NAMES))
             )
-        spacings = OutputSpacings(
-            # general
-            name=30,
-            value_per_minute_per_slot=40,
-            profit_per_minute_per_slot=40,
-            # t1
-            iron_per_minute_per_slot=40,
-            wood_per_minute_per_slot=40,
-            leather_per_minute_per_slot=40,
-            herbs_per_minute_per_slot=40,
-            # t2
-            steel_per_minute_per_slot=40,
-            ironwood_per_minute_per_slot=40,
-            fabric_per_minute_per_slot=40,
-            oils_per_minute_per_slot=40,
-            # t3
-            ether_per_minute_per_slot=40,
-            jewels_per_minute_per_slot=40,
-            # t1
-            value_per_iron=40,
-            value_per_wood=40,
-            value_per_leather=40,
-            value_per_herbs=40,
-            # t2
-            value_per_steel=40,
-            value_per_ironwood=40,
-            value_per_fabric=40,
-            value_per_oils=40,
-            # t3
-            value_per_ether=40,
-            value_per_jewels=40
-        )
-        header = str()
-        for key, spacing in spacings.items():
-            key = key.replace("_per_", "/")
-            header += key.center(spacing) + "|"
-        self._write(
-            msg=header
-        )
-        for bp in final_data_list:
-            write_line = str()
-            for key, spacing in spacings.items():
-                current_key_value = bp.calculated_values.get(key)
-                if isinstance(current_key_value, float):
-                    current_key_value = round(current_key_value, 3)
-                write_line += str(current_key_value).center(spacing) + "|"
-            # input(json.dumps(final_data_list, indent=4))
-            self._write(msg=write_line)
-
-        self.result_file.close()
+        ]
 
     @staticmethod
     def _round(value):
@@ -378,16 +469,285 @@ class ShopTitansCalculator:
         return int(value)
 
 
+def calculate_cached(player_config: dict, result_path: str, output_format: str = "text",
+                     query: RankingQuery = None, echo: bool = True, dataset: GameDataset = None,
+                     cache: ResultCache = None, manifest: dict = None) -> bool:
+    """
+    Calculates one player config into result_path, or copies the result of
+    an identical earlier calculation from the cache.
+    :param player_config: raw player config
+    :param result_path: where the result is written
+    :param output_format: format of the result file
+    :param query: ranking the result is limited to, all blueprints if None
+    :param echo: also print the result as a text table
+    :param dataset: shared game data, loaded from the snapshot if not passed
+    :param cache: result cache, None to always calculate
+    :param manifest: manifest of the snapshot, part of the cache key
+    :return: True if the result came from the cache
+    """
+    key = None
+    # the echo of a non text result is a text table the cache does not hold
+    if cache is not None and manifest is not None and (not echo or output_format == "text"):
+        with profiling.span("cache lookup"):
+            blueprints_key = None
+            if query is not None:
+                # a ranking only holds some blueprints, a patch that changed none of them keeps it cached
+                dataset = dataset if dataset is not None else load_dataset()
+                blueprints_key = dataset.catalogue.dependency_key(candidate_mask(dataset, query))
+            key = cache_key(
+                player_config, manifest, blueprints_key, output_format=output_format, query=query
+            )
+            data = cache.get(key)
+        if data is not None:
+            profiling.count("cache hits")
+            with open(result_path, "wb") as result_file:
+                result_file.write(data)
+            if echo:
+                sys.stdout.write(data.decode("utf-8"))
+            return True
+    calc = ShopTitansCalculator(
+        player_config=player_config,
+        dataset=dataset,
+        result_path=result_path,
+        echo=echo,
+        output_format=output_format
+    )
+    calc.calculate(query)
+    if key is not None:
+        with open(result_path, "rb") as result_file:
+            cache.put(key, result_file.read())
+    return False
+
+
+def _calculate_player(task: tuple) -> tuple:
+    """
+    Calculates one player of a batch, in this process or in a pool worker.
+    :param task: (player name, raw config, result path, output format, ranking query or None,
+        cache directory or None, snapshot manifest)
+    :return: (player name, error message or None)
+    """
+    player_name, player_config, result_path, output_format, query, cache_directory, manifest = task
+    try:
+        calculate_cached(
+            player_config=player_config,
+            result_path=result_path,
+            output_format=output_format,
+            query=query,
+            echo=False,
+            dataset=shared_dataset(),
+            cache=None if cache_directory is None else shared_cache(cache_directory),
+            manifest=manifest
+        )
+    except InvalidConfigError as error:
+        return player_name, f"invalid config ({error})"
+    return player_name, None
+
+
+def run_batch(source: str, output_directory: str, jobs: int = 1, output_format: str = "text",
+              query: RankingQuery = None, cache_directory: Optional[str] = CACHE_DIRECTORY):
+    """
+    Calculates every player config of source with one shared dataset,
+    so the game data is loaded once instead of once per player.
+    :param source: directory of JSON configs or a JSONL file
+    :param output_directory: one result file per player is written here
+    :param jobs: number of worker processes, 0 for one per CPU
+    :param output_format: format of the result files
+    :param query: ranking every player's result is limited to, all blueprints if None
+    :param cache_directory: result cache shared by all workers, None to always calculate
+    """
+    manifest = read_manifest()
+    if manifest is None:
+        raise ShopTitansCalculator.DataNotGeneratedError("Data is not generated")
+    os.makedirs(output_directory, exist_ok=True)
+    tasks = (
+        (
+            player_name,
+            player_config,
+            player_result_path(output_directory, player_name, WRITERS[output_format].extension),
+            output_format,
+            query,
+            cache_directory,
+            manifest
+        )
+        for player_name, player_config in iter_player_configs(source)
+    )
+    calculated = 0
+    for player_name, error in imap_ordered(_calculate_player, tasks, jobs):
+        if error is None:
+            calculated += 1
+        else:
+            print(f"Skipping {player_name}: {error}")
+    print(f"Calculated {calculated} player configs into {output_directory}")
+
+
+def load_dataset() -> GameDataset:
+    try:
+        return GameDataset.load()
+    except (FileNotFoundError, SnapshotError):
+        raise ShopTitansCalculator.DataNotGeneratedError("Data is not generated")
+
+
+def load_player_config(config_file: str, dataset: GameDataset) -> ShopTitansPlayerConfig:
+    """
+    Reads a player config and validates it against the game data, the same
+    check a full calculation runs before it starts.
+    :raise InvalidConfigError: on the first problem found
+    """
+    with open(config_file) as player_config_file:
+        raw_config = json.load(player_config_file)
+    return validate_player_config(raw_config, dataset)
+
+
+def run_sweep(config_file: str, slots: int):
+    dataset = load_dataset()
+    player_config = load_player_config(config_file, dataset)
+    sweep = SensitivitySweep(dataset, player_config, slots)
+    for line in format_sweep(sweep, sweep.run()):
+        print(line)
+
+
+def run_plan(config_file: str, slots: int):
+    """
+    Prints the blueprint mix for the crafting slots that earns the most
+    value per minute within the player's resource regeneration.
+    """
+    dataset = load_dataset()
+    player_config = load_player_config(config_file, dataset)
+    metrics = IncrementalCalculator(dataset).calculate(player_config)
+    regen = regeneration_rates(player_config.buildings, player_config.guild_boosts.resource_generation)
+    planner = CraftingPlanner(
+        values_per_minute=metrics["value_per_minute_per_slot"],
+        resources_per_minute=np.stack(
+            [metrics[f"{resource}_per_minute_per_slot"] for resource in RESOURCES], axis=1
+        ),
+        regen=regen,
+        slots=slots
+    )
+    with profiling.span("solve plan"):
+        plan = planner.solve()
+    for line in format_plan(plan, dataset.catalogue.names, slots, regen):
+        print(line)
+
+
+def run_monte_carlo(config_file: str, samples: int, seed: int, top: Optional[int]):
+    """
+    Prints the blueprints with the best expected value per minute once
+    quality procs and multicrafts are sampled.
+    """
+    dataset = load_dataset()
+    player_config = load_player_config(config_file, dataset)
+    scorer = IncrementalCalculator(dataset)
+    metrics = scorer.calculate(player_config)
+    quality_multipliers, multicraft_chances = dataset.catalogue.effects.quality()
+    with profiling.span("sample qualities"):
+        outcome = simulate_quality(
+            scorer.values, scorer.crafting_times, quality_multipliers, multicraft_chances, samples, seed,
+            quality_table(player_config.get("game_constants"))
+        )
+    lines = format_quality(
+        outcome, dataset.catalogue.names, metrics["value_per_minute_per_slot"], top or len(dataset.catalogue)
+    )
+    for line in lines:
+        print(line)
+
+
+def run_simulation(source: str, hours: float, slots: int, batch: bool = False):
+    """
+    Prints the gold/hour a player realizes when resources and idle slots are
+    accounted for, next to what the ranking promises.
+    :param source: config file, or a batch source of player configs
+    :param hours: simulated hours
+    :param slots: crafting slots
+    :param batch: source is a batch, one line per player
+    """
+    dataset = load_dataset()
+    if not batch:
+        player_config = load_player_config(source, dataset)
+        with profiling.span("simulate"):
+            result = simulate_player(dataset, player_config, hours, slots)
+        for line in format_simulation(result, dataset.catalogue.names):
+            print(line)
+        return
+    # one calculator for all players, it only rescores what differs from the previous player
+    scorer = IncrementalCalculator(dataset)
+    for player_name, raw_config in iter_player_configs(source):
+        try:
+            player_config = validate_player_config(raw_config, dataset)
+        except InvalidConfigError as error:
+            print(f"Skipping {player_name}: invalid config ({error})")
+            continue
+        with profiling.span("simulate"):
+            result = simulate_player(dataset, player_config, hours, slots, scorer=scorer)
+        print(f"{player_name}: " + format_simulation(result, dataset.catalogue.names)[0])
+
+
 def main():
     args = generate_args()
+    if not (args.profile or args.profile_trace):
+        run_checked(args)
+        return
+    profiler = profiling.enable()
+    try:
+        run_checked(args)
+    finally:
+        profiling.disable()
+        # stderr, so the profile never ends up in a piped result
+        for line in profiler.summary():
+            print(line, file=sys.stderr)
+        if args.profile_trace:
+            profiler.write_trace(args.profile_trace)
+
+
+def run_checked(args):
+    """
+    Runs the command line, an invalid player config ends it with a message instead of a traceback.
+    """
+    try:
+        run(args)
+    except InvalidConfigError as error:
+        sys.exit(f"Invalid config {args.config}: {error}")
+
+
+def run(args):
     if args.generate_data:
-        ShopTitansCalculator.generate_data(args.spreadsheet)
+        ShopTitansCalculator.generate_data(args.spreadsheet, args.config, args.sort, args.top)
         print("Data has been generated")
         sys.exit(0)
-    calc = ShopTitansCalculator(
-        config_file=args.config
+    # the snapshot is keyed by the spreadsheet hash, so this only rebuilds after a patch
+    with profiling.span("check snapshot"):
+        outdated = snapshot_outdated(args.spreadsheet)
+    if outdated:
+        ShopTitansCalculator.generate_data(args.spreadsheet, args.config, args.sort, args.top)
+        print("Spreadsheet changed, data has been regenerated")
+    if args.plan:
+        run_plan(args.config, args.slots)
+        sys.exit(0)
+    if args.sweep:
+        run_sweep(args.config, args.slots)
+        sys.exit(0)
+    if args.monte_carlo:
+        run_monte_carlo(args.config, args.samples, args.seed, args.top)
+        sys.exit(0)
+    if args.simulate is not None:
+        run_simulation(args.batch or args.config, args.simulate, args.slots, batch=args.batch is not None)
+        sys.exit(0)
+    if args.batch:
+        run_batch(
+            args.batch, args.output_dir, args.jobs, args.output_format, args.query,
+            None if args.no_cache else args.cache_dir
+        )
+        sys.exit(0)
+    with open(args.config) as config_file:
+        player_config = json.load(config_file)
+    calculate_cached(
+        player_config=player_config,
+        result_path=args.output or "result" + WRITERS[args.output_format].extension,
+        output_format=args.output_format,
+        query=args.query,
+        echo=not args.quiet,
+        cache=None if args.no_cache else ResultCache(args.cache_dir),
+        manifest=read_manifest()
     )
-    calc.calculate()
     sys.exit(0)
 
 
@@ -0,0 +1,59 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import multiprocessing
+import os
+from typing import Callable, Iterable, Iterator
+
+from blueprint_catalogue import GameDataset
+from game_data import DATA_DIRECTORY
+
+# tasks handed to a worker process at once, keeps IPC overhead low
+# without making the ordered result stream bursty
+DEFAULT_CHUNKSIZE = 4
+
+# dataset of the current process, set up once per worker
+_dataset: GameDataset = None
+
+
+def _initialize(data_directory: str):
+    """
+    Pool initializer. Every worker maps the snapshot files itself, so the
+    blueprint data is shared through the page cache and never pickled.
+    """
+    global _dataset
+    _dataset = GameDataset.load(data_directory)
+
+
+def shared_dataset() -> GameDataset:
+    return _dataset
+
+
+def _context():
+    # fork starts workers fastest and is not available on every platform
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def imap_ordered(function: Callable, tasks: Iterable, jobs: int = 1,
+                 data_directory: str = DATA_DIRECTORY, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator:
+    """
+    Maps function over tasks on a pool of jobs processes and yields the
+    results in task order as soon as they are ready. function has to be
+    a module level function and reads the data through shared_dataset().
+    :param function: called with one task
+    :param tasks: iterable of picklable tasks, consumed lazily
+    :param jobs: number of processes, 0 uses every CPU, 1 runs in this process
+    :param data_directory: snapshot directory the workers load
+    :param chunksize: tasks per pool dispatch
+    :return: iterator of results
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs == 1:
+        if _dataset is None:
+            _initialize(data_directory)
+        yield from map(function, tasks)
+        return
+    with _context().Pool(jobs, initializer=_initialize, initargs=(data_directory,)) as pool:
+        yield from pool.imap(function, tasks, chunksize)
@@ -0,0 +1,189 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+# the chrome trace format counts in microseconds
+TRACE_TIME_SCALE = 1e6
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullProfiler:
+    """
+    Profiler of a run without --profile, every call does nothing and
+    allocates nothing, so the instrumented code costs one call per span.
+    """
+    enabled = False
+
+    def span(self, name: str) -> _NullSpan:
+        return _NULL_SPAN
+
+    def count(self, name: str, amount: int = 1):
+        pass
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.profiler._depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        self.profiler._depth -= 1
+        self.profiler._finish(self.name, self.start, end, self.profiler._depth)
+        return False
+
+
+class Profiler:
+    """
+    Collects named spans (wall clock time of a stage, nested spans are
+    kept as children of the enclosing one), counters and the peak memory
+    Python allocated while it was running.
+    """
+    enabled = True
+
+    def __init__(self, trace_memory: bool = True):
+        self.start = time.perf_counter()
+        # (name, start, end, depth) of every finished span
+        self.spans: List[tuple] = list()
+        self.counters: Dict[str, int] = dict()
+        # set by stop()
+        self.end: Optional[float] = None
+        self.peak: Optional[int] = None
+        self._depth = 0
+        self._tracing_memory = trace_memory and not tracemalloc.is_tracing()
+        if self._tracing_memory:
+            tracemalloc.start()
+
+    def span(self, name: str) -> _Span:
+        """
+        with profiler.span("load game data"): ...
+        """
+        return _Span(self, name)
+
+    def _finish(self, name: str, start: float, end: float, depth: int):
+        self.spans.append((name, start, end, depth))
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def peak_memory(self) -> Optional[int]:
+        """
+        :return: most bytes Python had allocated at once since the profiler started, None if not traced
+        """
+        if self.end is not None:
+            return self.peak
+        if not tracemalloc.is_tracing():
+            return None
+        return tracemalloc.get_traced_memory()[1]
+
+    def stop(self):
+        self.peak = self.peak_memory()
+        self.end = time.perf_counter()
+        if self._tracing_memory:
+            tracemalloc.stop()
+            self._tracing_memory = False
+
+    def summary(self) -> List[str]:
+        """
+        :return: lines of the summary table, spans in the order they started, indented by depth
+        """
+        total = (self.end if self.end is not None else time.perf_counter()) - self.start
+        stages: Dict[tuple, List[float]] = dict()
+        for name, start, stop, depth in sorted(self.spans, key=lambda span: span[1]):
+            stages.setdefault((name, depth), list()).append(stop - start)
+        lines = [f"{'stage':<40}{'calls':>8}{'seconds':>12}{'%':>8}"]
+        for (name, depth), durations in stages.items():
+            seconds = sum(durations)
+            lines.append(
+                f"{'  ' * depth + name:<40}{len(durations):>8}{seconds:>12.4f}{seconds / total * 100:>8.1f}"
+            )
+        lines.append(f"{'total':<40}{'':>8}{total:>12.4f}{100:>8.1f}")
+        for name, amount in self.counters.items():
+            lines.append(f"{name}: {amount}")
+        peak = self.peak_memory()
+        if peak is not None:
+            lines.append(f"peak memory: {peak / (1 << 20):.1f} MiB")
+        return lines
+
+    def write_trace(self, path: str):
+        """
+        Writes the spans as a Chrome trace (chrome://tracing, ui.perfetto.dev),
+        counters and peak memory go into its metadata.
+        """
+        pid = os.getpid()
+        tid = threading.get_ident()
+        events = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self.start) * TRACE_TIME_SCALE,
+                "dur": (end - start) * TRACE_TIME_SCALE,
+                "pid": pid,
+                "tid": tid
+            }
+            for name, start, end, _ in self.spans
+        ]
+        metadata = dict(self.counters)
+        peak = self.peak_memory()
+        if peak is not None:
+            metadata["peak_memory_bytes"] = peak
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": metadata}, trace_file)
+
+
+_profiler = NullProfiler()
+
+
+def enable(trace_memory: bool = True) -> Profiler:
+    """
+    Replaces the null profiler, spans and counters are recorded from here on.
+    :param trace_memory: also trace the peak memory, which slows allocations down
+    """
+    global _profiler
+    _profiler = Profiler(trace_memory)
+    return _profiler
+
+
+def disable():
+    global _profiler
+    if _profiler.enabled:
+        _profiler.stop()
+    _profiler = NullProfiler()
+
+
+def enabled() -> bool:
+    return _profiler.enabled
+
+
+def span(name: str):
+    """
+    :return: context manager that times the stage name, does nothing unless enabled
+    """
+    return _profiler.span(name)
+
+
+def count(name: str, amount: int = 1):
+    _profiler.count(name, amount)
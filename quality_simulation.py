@@ -0,0 +1,146 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from additional_data import QualityDict
+
+DEFAULT_SAMPLES = 100000
+DEFAULT_SEED = 0
+# random numbers drawn at once, bounds the memory of one batch to a few arrays of this many floats
+BATCH_SIZE = 1 << 22
+
+
+class QualityOutcome(NamedTuple):
+    # all arrays have one entry per blueprint
+    # gold per craft, extra multicrafted items and their qualities included
+    expected_values: np.ndarray
+    variances: np.ndarray
+    expected_values_per_minute: np.ndarray
+    # variance of the gold a slot crafting the blueprint earns, added per minute
+    variances_per_minute: np.ndarray
+
+
+def quality_table(game_constants: Optional[dict]) -> Dict[str, dict]:
+    """
+    :param game_constants: game_constants of a player config
+    :return: qualities of the config, which replace QualityDict, or QualityDict if it has none
+    """
+    qualities = (game_constants or dict()).get("qualities")
+    return QualityDict if qualities is None else qualities
+
+
+def quality_values(qualities: Dict[str, dict] = QualityDict) -> np.ndarray:
+    """
+    :param qualities: quality name -> chance and value multiplier, like QualityDict
+    :return: value multiplier of Normal, then of every quality
+    """
+    return np.array([1.0] + [quality["value"] for quality in qualities.values()])
+
+
+def quality_chances(quality_multipliers: np.ndarray, qualities: Dict[str, dict] = QualityDict) -> np.ndarray:
+    """
+    :param quality_multipliers: product of the "Quality Chance xN" upgrades of every blueprint
+    :param qualities: see quality_values
+    :return: blueprints x quality_values chances, every row adds up to 1
+    """
+    chances = quality_multipliers[:, None] * np.array([quality["chance"] for quality in qualities.values()])
+    # chances above certain are scaled down, every craft then comes out above Normal
+    total = chances.sum(axis=1, keepdims=True)
+    chances = np.where(total > 1, chances / np.maximum(total, 1), chances)
+    return np.column_stack([1 - chances.sum(axis=1), chances])
+
+
+def _sample_multipliers(draws: np.ndarray, thresholds: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Categorical samples of every row at once: a uniform draw lands in the
+    quality whose cumulative chance range holds it.
+    :param draws: blueprints x samples uniform draws
+    :param thresholds: blueprints x (qualities - 1) cumulative chances
+    :param values: value multiplier of every quality, see quality_values
+    :return: value multiplier of every draw
+    """
+    qualities = np.zeros(draws.shape, dtype=np.intp)
+    for column in range(thresholds.shape[1]):
+        qualities += draws >= thresholds[:, column, None]
+    return values[qualities]
+
+
+def simulate_quality(values: np.ndarray, crafting_times: np.ndarray, quality_multipliers: np.ndarray,
+                     multicraft_chances: np.ndarray, samples: int = DEFAULT_SAMPLES,
+                     seed: int = DEFAULT_SEED, qualities: Dict[str, dict] = QualityDict) -> QualityOutcome:
+    """
+    Samples the outcome of samples crafts of every blueprint: the quality of
+    the item, whether a multicraft adds a second item and the quality of
+    that one. All blueprints are sampled together, in batches of BATCH_SIZE
+    draws, and only the sums and sums of squares are kept.
+    :param values: gold per Normal item
+    :param crafting_times: crafting times in seconds
+    :param quality_multipliers: product of the quality chance upgrades
+    :param multicraft_chances: chance of a second item
+    :param samples: crafts sampled per blueprint
+    :param seed: seed of the random numbers, the same seed gives the same outcome
+    :param qualities: chance and value multiplier of every quality above Normal, see quality_table
+    :return: expected gold and its variance per craft and per minute
+    """
+    rng = np.random.default_rng(seed)
+    thresholds = np.cumsum(quality_chances(quality_multipliers, qualities), axis=1)[:, :-1]
+    multiplier_values = quality_values(qualities)
+    multicraft_chances = np.clip(multicraft_chances, 0, 1)
+    # blueprints without multicraft never draw a second item
+    multicraft_rows = np.flatnonzero(multicraft_chances > 0)
+    total = np.zeros(len(values))
+    total_squares = np.zeros(len(values))
+    batch = max(1, BATCH_SIZE // max(len(values), 1))
+    for start in range(0, samples, batch):
+        size = min(batch, samples - start)
+        multipliers = _sample_multipliers(rng.random((len(values), size)), thresholds, multiplier_values)
+        if len(multicraft_rows):
+            extra = rng.random((len(multicraft_rows), size)) < multicraft_chances[multicraft_rows, None]
+            multipliers[multicraft_rows] += extra * _sample_multipliers(
+                rng.random((len(multicraft_rows), size)), thresholds[multicraft_rows], multiplier_values
+            )
+        total += multipliers.sum(axis=1)
+        total_squares += np.square(multipliers).sum(axis=1)
+    mean = total / samples
+    # unbiased sample variance of the multiplier, the value is a constant factor of it
+    variance = np.maximum(total_squares - samples * np.square(mean), 0) / max(samples - 1, 1)
+    expected_values = values * mean
+    variances = np.square(values) * variance
+    minutes = crafting_times / 60
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return QualityOutcome(
+            expected_values=expected_values,
+            variances=variances,
+            expected_values_per_minute=expected_values / minutes,
+            # a slot crafts 1 / minutes items per minute, the variances of independent crafts add up
+            variances_per_minute=variances / minutes
+        )
+
+
+def format_quality(outcome: QualityOutcome, names: List[str], values_per_minute: np.ndarray,
+                   top: int) -> List[str]:
+    """
+    :param outcome: simulated outcome of every blueprint
+    :param names: blueprint names
+    :param values_per_minute: value per minute without quality and multicraft, for comparison
+    :param top: number of blueprints, best expected value per minute first
+    """
+    spacings: Dict[str, int] = {
+        "name": 30,
+        "value/minute": 16,
+        "expected value/minute": 24,
+        "std dev/minute": 16
+    }
+    lines = ["".join(key.center(spacing) + "|" for key, spacing in spacings.items())]
+    rates = np.nan_to_num(outcome.expected_values_per_minute, nan=-np.inf)
+    for row in np.argsort(-rates, kind="stable")[:top].tolist():
+        cells = (
+            names[row],
+            round(float(values_per_minute[row]), 3),
+            round(float(outcome.expected_values_per_minute[row]), 3),
+            round(float(np.sqrt(outcome.variances_per_minute[row])), 3)
+        )
+        lines.append("".join(str(cell).center(spacing) + "|" for cell, spacing in zip(cells, spacings.values())))
+    return lines
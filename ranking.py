@@ -0,0 +1,267 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import math
+import operator
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ascensions import ascension_bonuses
+from blueprint_catalogue import GameDataset
+from class_definitions import ShopTitansPlayerConfig
+from component_costs import component_prices
+from skyline import objective_matrix, parse_objective, skyline
+from scoring_engine import ENERGY_METRIC_NAMES, METRIC_NAMES, RESOURCES, BlueprintMatrix, compute_energy_metrics, \
+    compute_metrics, market_multipliers, round_values
+
+DEFAULT_SORT = "value_per_minute_per_slot"
+
+COMPARISONS: Dict[str, Callable] = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    "=": operator.eq
+}
+
+
+class RankingQuery(NamedTuple):
+    # metric of METRIC_NAMES or ENERGY_METRIC_NAMES to rank by
+    sort: str = DEFAULT_SORT
+    # keep only the best top blueprints, None keeps all of them
+    top: Optional[int] = None
+    ascending: bool = False
+    # (comparison, tier), e.g. (">=", 8)
+    tier: Optional[Tuple[str, float]] = None
+    # required workers, by job or by worker name, a blueprint needs all of them
+    workers: Tuple[str, ...] = ()
+    # resources a blueprint must use, and resources it must not use
+    uses: Tuple[str, ...] = ()
+    without: Tuple[str, ...] = ()
+    # (resource, limit) pairs, a blueprint may use at most limit of the resource per minute per slot
+    max_per_minute: Tuple[Tuple[str, float], ...] = ()
+    # objectives of skyline.parse_objective, keeps only the blueprints no other blueprint beats in all of them
+    skyline: Tuple[str, ...] = ()
+
+
+class Ranking(NamedTuple):
+    # catalogue indexes of the ranked blueprints, best first
+    rows: np.ndarray
+    # all arrays below are aligned with rows
+    values: np.ndarray
+    crafting_times: np.ndarray
+    resources: np.ndarray
+    component_costs: np.ndarray
+    metrics: Dict[str, np.ndarray]
+
+
+def parse_comparison(text: str) -> Tuple[str, float]:
+    """
+    :param text: comparison like ">=8", "<5" or a plain number for ==
+    :return: (comparison, number)
+    """
+    text = text.strip()
+    for comparison in COMPARISONS:
+        if text.startswith(comparison):
+            return comparison, float(text[len(comparison):])
+    return "==", float(text)
+
+
+def _names(data: dict, key: str) -> Tuple[str, ...]:
+    """
+    :return: list value of key as a tuple of strings, a single string is a list of one
+    :raise ValueError: if the value is neither
+    """
+    value = data.get(key, ())
+    if isinstance(value, str):
+        return value,
+    if not isinstance(value, (list, tuple)):
+        raise ValueError(f"{key} has to be a list of names, not {value!r}")
+    return tuple(str(name) for name in value)
+
+
+def query_from_dict(data: dict) -> RankingQuery:
+    """
+    Ranking query of a JSON object, e.g. {"sort": "value_per_minute_per_slot", "top": 20,
+    "tier": ">=8", "workers": ["Wizard"], "without": ["jewels"], "max_per_minute": {"iron": 5},
+    "skyline": ["value_per_minute_per_slot", "iron_per_minute_per_slot"]}
+    :raise ValueError: on unknown keys or values of the wrong type
+    """
+    unknown = set(data) - set(RankingQuery._fields)
+    if unknown:
+        raise ValueError(f"unknown query keys {', '.join(sorted(unknown))}")
+    try:
+        top = data.get("top")
+        tier = data.get("tier")
+        return RankingQuery(
+            sort=str(data.get("sort", DEFAULT_SORT)),
+            top=None if top is None else int(top),
+            ascending=bool(data.get("ascending", False)),
+            tier=None if tier is None else parse_comparison(str(tier)),
+            workers=_names(data, "workers"),
+            uses=_names(data, "uses"),
+            without=_names(data, "without"),
+            max_per_minute=tuple(
+                (str(resource), float(limit)) for resource, limit in dict(data.get("max_per_minute", {})).items()
+            ),
+            skyline=_names(data, "skyline")
+        )
+    except TypeError as error:
+        raise ValueError(str(error))
+
+
+def _job(dataset: GameDataset, worker: str) -> str:
+    if worker in dataset.worker_names:
+        return worker
+    for job, name in dataset.worker_names.items():
+        if name == worker:
+            return job
+    raise ValueError(f"unknown worker {worker}")
+
+
+def _tier_bounds(comparison: str, tier: float) -> Tuple[Optional[int], Optional[int]]:
+    # tiers are whole numbers, so every comparison but != is one inclusive range
+    if comparison == ">=":
+        return math.ceil(tier), None
+    if comparison == ">":
+        return math.floor(tier) + 1, None
+    if comparison == "<=":
+        return None, math.floor(tier)
+    if comparison == "<":
+        return None, math.ceil(tier) - 1
+    if tier != int(tier):
+        return 1, 0
+    return int(tier), int(tier)
+
+
+def candidate_mask(dataset: GameDataset, query: RankingQuery) -> np.ndarray:
+    """
+    Filters that only need the catalogue, answered from its index before
+    anything is scored.
+    :return: mask of the blueprints that pass
+    """
+    for resource in query.uses + query.without:
+        if resource not in RESOURCES:
+            raise ValueError(f"unknown resource {resource}")
+    index = dataset.catalogue.index()
+    low_tier, high_tier = None, None
+    comparison = None if query.tier is None else query.tier[0]
+    if comparison is not None and comparison != "!=":
+        low_tier, high_tier = _tier_bounds(*query.tier)
+    mask = index.select(
+        low_tier=low_tier,
+        high_tier=high_tier,
+        jobs=[_job(dataset, worker) for worker in query.workers],
+        uses=query.uses,
+        without=query.without
+    )
+    if comparison == "!=":
+        mask &= ~index.select(*_tier_bounds("==", query.tier[1]))
+    return mask
+
+
+def top_k(keys: np.ndarray, k: Optional[int]) -> np.ndarray:
+    """
+    Positions of the k smallest keys in ascending order, ties in position
+    order. Only the selected keys are sorted, the rest is partitioned away.
+    :param keys: sort keys, NaN sorts last
+    :param k: number of positions, None for all
+    :return: positions into keys
+    """
+    keys = np.where(np.isnan(keys), np.inf, keys)
+    if k is not None and k < len(keys):
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        # the partition picks any of the keys equal to the k-th, take the first ones by position instead
+        boundary = keys[np.argpartition(keys, k - 1)[k - 1]]
+        below = np.flatnonzero(keys < boundary)
+        selected = np.concatenate((below, np.flatnonzero(keys == boundary)[:k - len(below)]))
+    else:
+        selected = np.arange(len(keys))
+    return selected[np.lexsort((selected, keys[selected]))]
+
+
+def rank(dataset: GameDataset, player_config: ShopTitansPlayerConfig, query: RankingQuery) -> Ranking:
+    """
+    Scores only the blueprints that pass the catalogue filters, then applies
+    the metric filters and the skyline and picks the top blueprints by the
+    sort metric.
+    :param dataset: game data
+    :param player_config: player to score
+    :param query: filters, sort and limit
+    :return: ranked blueprints with their metrics
+    """
+    if query.sort not in METRIC_NAMES + ENERGY_METRIC_NAMES:
+        raise ValueError(f"unknown metric {query.sort}")
+    if query.top is not None and query.top < 0:
+        raise ValueError("top can not be negative")
+    for objective in query.skyline:
+        parse_objective(objective)
+    catalogue = dataset.catalogue
+    rows = np.flatnonzero(candidate_mask(dataset, query))
+    values, base_crafting_times, resources = catalogue.upgraded()
+    values, base_crafting_times = catalogue.ascension_index().apply(
+        values[rows], base_crafting_times[rows], player_config.get("ascensions") or dict(), rows,
+        ascension_bonuses(player_config.get("game_constants"))
+    )
+    values = round_values(values)
+    resources = resources[rows]
+    craft_speed = player_config.guild_boosts.craft_speed
+    craft_times = {
+        worker: dataset.worker_craft_time(level, craft_speed)
+        for worker, level in player_config.workers.items()
+    }
+    crafting_times = catalogue.apply_workers(base_crafting_times, craft_times, dataset.worker_names, rows)
+    # components can be crafted by blueprints the filters dropped, so costs resolve over the whole catalogue
+    component_costs = catalogue.component_costs(
+        component_prices(player_config), player_config.get("ascensions") or dict(),
+        ascension_bonuses(player_config.get("game_constants"))
+    ).costs[rows]
+    matrix = BlueprintMatrix([catalogue.names[row] for row in rows], values, crafting_times, resources)
+    metrics = compute_metrics(matrix, profits=values - component_costs)
+    surcharge_multiplier, discount_multiplier = market_multipliers(player_config.get("game_constants"))
+    metrics.update(compute_energy_metrics(
+        matrix, component_costs, catalogue.energy().take(rows), player_config.get("max_energy"),
+        surcharge_multiplier, discount_multiplier
+    ))
+
+    keep = np.ones(len(rows), dtype=bool)
+    for resource, limit in query.max_per_minute:
+        if resource not in RESOURCES:
+            raise ValueError(f"unknown resource {resource}")
+        keep &= metrics[f"{resource}_per_minute_per_slot"] <= limit
+    kept = np.flatnonzero(keep)
+    if query.skyline:
+        kept = kept[skyline(objective_matrix(metrics, query.skyline)[kept])]
+    keys = metrics[query.sort][kept]
+    order = kept[top_k(keys if query.ascending else -keys, query.top)]
+    return Ranking(
+        rows=rows[order],
+        values=values[order],
+        crafting_times=crafting_times[order],
+        resources=resources[order],
+        component_costs=component_costs[order],
+        metrics={key: column[order] for key, column in metrics.items()}
+    )
+
+
+def ranking_rows(dataset: GameDataset, ranking: Ranking) -> List[dict]:
+    """
+    Plain rows of a ranking, e.g. for a JSON response. Metrics of resources
+    a blueprint does not use stay 0, metrics that can not be computed are None.
+    :return: one dict per ranked blueprint, best first
+    """
+    catalogue = dataset.catalogue
+    columns = {
+        "tier": catalogue.tiers[ranking.rows].astype(int).tolist(),
+        "value": ranking.values.astype(int).tolist(),
+        "crafting_time": ranking.crafting_times.tolist(),
+        "component_cost": ranking.component_costs.tolist(),
+        **{key: np.where(np.isnan(column), None, column).tolist() for key, column in ranking.metrics.items()}
+    }
+    return [
+        {"name": catalogue.names[row], **{key: column[position] for key, column in columns.items()}}
+        for position, row in enumerate(ranking.rows.tolist())
+    ]
@@ -0,0 +1,161 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+from batch import PLAYER_NAME_KEY
+from class_definitions import ShopTitansPlayerConfig
+
+CACHE_DIRECTORY = "result_cache"
+# least recently used results are evicted above this many bytes
+DEFAULT_MAX_BYTES = 256 << 20
+# bump whenever the calculation or the result formats change, older entries are never hit again
+RESULT_CACHE_VERSION = 7
+ENTRY_EXTENSION = ".result"
+# puts between two scans of the directory, other processes' writes are only seen by a scan
+SCAN_INTERVAL = 256
+
+
+def canonical_config(raw_config: dict) -> str:
+    """
+    Two configs that calculate the same result give the same string:
+    the config is normalized through ShopTitansPlayerConfig, keys are
+    sorted and the player name is left out.
+    :param raw_config: player config as loaded from JSON
+    :return: canonical JSON
+    """
+    raw_config = {key: value for key, value in raw_config.items() if key != PLAYER_NAME_KEY}
+    return json.dumps(ShopTitansPlayerConfig(**raw_config), sort_keys=True, separators=(",", ":"))
+
+
+def cache_key(raw_config: dict, manifest: dict, blueprints_key: str = None, **parts) -> str:
+    """
+    The key holds the parts of the snapshot the result depends on instead
+    of the spreadsheet hash, so a patch only invalidates the results of
+    the blueprints it changed.
+    :param raw_config: player config as loaded from JSON
+    :param manifest: manifest of the data snapshot the result is calculated from
+    :param blueprints_key: BlueprintCatalogue.dependency_key of the blueprints the result holds, all if None
+    :param parts: anything else the result depends on, e.g. output format or query, JSON serializable
+    :return: hex digest that addresses the result
+    """
+    key = {
+        "cache_version": RESULT_CACHE_VERSION,
+        "snapshot": [
+            manifest.get("version"),
+            manifest.get("shared_hash"),
+            blueprints_key if blueprints_key is not None else manifest.get("blueprints_hash")
+        ],
+        "config": canonical_config(raw_config),
+        "parts": parts
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Content addressed results on disk, one file per key. A hit refreshes
+    the file's modification time, so eviction removes the least recently
+    used files until the cache fits max_bytes again. Files are replaced
+    atomically, so any number of processes can share one directory.
+    The size of the directory is scanned once and then tracked per put,
+    it is only scanned again when the tracked size goes over max_bytes or
+    every SCAN_INTERVAL puts, so a batch of puts does not stat every entry
+    every time. The tracked size and eviction are guarded by a lock, so
+    threads can share one instance.
+    """
+
+    def __init__(self, directory: str = CACHE_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # bytes in the directory as of the last scan plus this process' puts, None before the first scan
+        self._size: Optional[int] = None
+        self._puts_since_scan = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_EXTENSION)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        :return: cached result, None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as entry:
+                data = entry.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # missing, or evicted by another process in between
+            return None
+        return data
+
+    def put(self, key: str, data: bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "wb") as entry:
+            entry.write(data)
+        with self._lock:
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(temporary_path, path)
+            self._puts_since_scan += 1
+            if self._size is not None:
+                self._size += len(data) - replaced
+            if self._size is None or self._size > self.max_bytes or self._puts_since_scan >= SCAN_INTERVAL:
+                self._evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits max_bytes.
+        """
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        entries = list()
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.name.endswith(ENTRY_EXTENSION):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        self._puts_since_scan = 0
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        self._size = total
+
+
+# one cache per directory in every process, so the tracked size outlives a single calculation
+_shared_caches: Dict[str, ResultCache] = dict()
+_shared_caches_lock = threading.Lock()
+
+
+def shared_cache(directory: str = CACHE_DIRECTORY) -> ResultCache:
+    """
+    :param directory: cache directory
+    :return: the ResultCache of directory of this process, created on the first call
+    """
+    with _shared_caches_lock:
+        cache = _shared_caches.get(directory)
+        if cache is None:
+            cache = _shared_caches[directory] = ResultCache(directory)
+        return cache
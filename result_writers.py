@@ -0,0 +1,230 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import csv
+import json
+import math
+import sys
+from typing import Dict, IO, Iterable, List, Optional
+
+from class_definitions import FinalBPData, OutputSpacings, TransformedBPData
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    # parquet output is optional, everything else works without pyarrow
+    pyarrow = None
+
+# bytes buffered before a result file is written to disk
+BUFFER_SIZE = 1 << 16
+# rows per parquet row group, bounds the memory of a parquet result
+ROW_GROUP_SIZE = 10000
+
+# how many chars every column takes up in the text table
+TEXT_SPACINGS = OutputSpacings(
+    # general
+    name=30,
+    value_per_minute_per_slot=40,
+    profit_per_minute_per_slot=40,
+    # t1
+    iron_per_minute_per_slot=40,
+    wood_per_minute_per_slot=40,
+    leather_per_minute_per_slot=40,
+    herbs_per_minute_per_slot=40,
+    # t2
+    steel_per_minute_per_slot=40,
+    ironwood_per_minute_per_slot=40,
+    fabric_per_minute_per_slot=40,
+    oils_per_minute_per_slot=40,
+    # t3
+    ether_per_minute_per_slot=40,
+    jewels_per_minute_per_slot=40,
+    # t1
+    value_per_iron=40,
+    value_per_wood=40,
+    value_per_leather=40,
+    value_per_herbs=40,
+    # t2
+    value_per_steel=40,
+    value_per_ironwood=40,
+    value_per_fabric=40,
+    value_per_oils=40,
+    # t3
+    value_per_ether=40,
+    value_per_jewels=40
+)
+
+# blueprint fields the machine readable formats add after the name
+BLUEPRINT_COLUMNS = ("tier", "value", "crafting_time")
+COLUMNS = (TransformedBPData.__slots__[0],) + BLUEPRINT_COLUMNS + TransformedBPData.__slots__[1:]
+
+
+def _row(bp: FinalBPData) -> list:
+    # NaN marks metrics of resources a blueprint does not use, it is None outside the text table
+    return [
+        None if isinstance(cell, float) and math.isnan(cell) else cell
+        for cell in (
+            bp.calculated_values.name,
+            *(getattr(bp.transformed_data, column) for column in BLUEPRINT_COLUMNS),
+            *(getattr(bp.calculated_values, column) for column in TransformedBPData.__slots__[1:])
+        )
+    ]
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("Parquet output needs pyarrow, run: pip install pyarrow")
+
+
+def _parquet_schema() -> "pyarrow.Schema":
+    """
+    :return: schema of COLUMNS, so an empty result has the same columns as a full one
+    """
+    types = {"name": pyarrow.string(), "tier": pyarrow.int64(), "value": pyarrow.int64()}
+    return pyarrow.schema([(column, types.get(column, pyarrow.float64())) for column in COLUMNS])
+
+
+class ResultWriter:
+    """
+    Streams result rows to a file object. Free text lines (the worker and
+    regeneration summary) are only kept by formats that can hold them.
+    """
+    extension = ".txt"
+    binary = False
+
+    def __init__(self, stream: IO):
+        self.stream = stream
+
+    def write_line(self, msg: str):
+        pass
+
+    def write_rows(self, rows: Iterable[FinalBPData]):
+        raise NotImplementedError
+
+    def close(self):
+        if self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TextTableWriter(ResultWriter):
+    """
+    Fixed width table, the format of result.txt.
+    """
+
+    def __init__(self, stream: IO, spacings: Dict[str, int] = TEXT_SPACINGS):
+        super().__init__(stream)
+        self.spacings = list(spacings.items())
+
+    def write_line(self, msg: str):
+        self.stream.write(f"{msg}\n")
+
+    def write_rows(self, rows: Iterable[FinalBPData]):
+        self.write_line("".join(key.replace("_per_", "/").center(spacing) + "|" for key, spacing in self.spacings))
+        write = self.stream.write
+        for bp in rows:
+            values = bp.calculated_values
+            cells = list()
+            for key, spacing in self.spacings:
+                value = getattr(values, key)
+                if isinstance(value, float):
+                    value = round(value, 3)
+                cells.append(str(value).center(spacing))
+            cells.append("\n")
+            write("|".join(cells))
+
+
+class JsonLinesWriter(ResultWriter):
+    extension = ".jsonl"
+
+    def write_rows(self, rows: Iterable[FinalBPData]):
+        encoder = json.JSONEncoder()
+        write = self.stream.write
+        for bp in rows:
+            write(encoder.encode(dict(zip(COLUMNS, _row(bp)))))
+            write("\n")
+
+
+class CsvWriter(ResultWriter):
+    extension = ".csv"
+
+    def write_rows(self, rows: Iterable[FinalBPData]):
+        writer = csv.writer(self.stream)
+        writer.writerow(COLUMNS)
+        writer.writerows(map(_row, rows))
+
+
+class ParquetWriter(ResultWriter):
+    """
+    Columnar output, written in row groups of ROW_GROUP_SIZE rows.
+    """
+    extension = ".parquet"
+    binary = True
+
+    def __init__(self, stream: IO):
+        _require_pyarrow()
+        super().__init__(stream)
+        self.writer: Optional["pyarrow.parquet.ParquetWriter"] = None
+        self.schema = _parquet_schema()
+
+    def _write_group(self, group: List[list]):
+        table = pyarrow.Table.from_pydict(
+            {column: list(cells) for column, cells in zip(COLUMNS, zip(*group))}, schema=self.schema
+        )
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(self.stream, self.schema)
+        self.writer.write_table(table)
+
+    def write_rows(self, rows: Iterable[FinalBPData]):
+        group = list()
+        for bp in rows:
+            group.append(_row(bp))
+            if len(group) == ROW_GROUP_SIZE:
+                self._write_group(group)
+                group = list()
+        if group:
+            self._write_group(group)
+
+    def close(self):
+        if self.writer is None and not self.stream.closed:
+            # no rows, the file still gets the schema so it can be read
+            pyarrow.parquet.write_table(self.schema.empty_table(), self.stream)
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        super().close()
+
+
+WRITERS = {
+    "text": TextTableWriter,
+    "jsonl": JsonLinesWriter,
+    "csv": CsvWriter,
+    "parquet": ParquetWriter
+}
+
+
+def open_writer(output_format: str, path: str) -> ResultWriter:
+    """
+    :param output_format: key of WRITERS
+    :param path: result file, opened with a BUFFER_SIZE buffer
+    :return: writer, close it (or use it as a context manager) to flush the file
+    """
+    writer_class = WRITERS[output_format]
+    if writer_class is ParquetWriter:
+        # fail before an empty result file is left behind
+        _require_pyarrow()
+    if writer_class.binary:
+        stream = open(path, "wb", buffering=BUFFER_SIZE)
+    else:
+        # csv does its own line endings
+        stream = open(path, "w", buffering=BUFFER_SIZE, newline="" if writer_class is CsvWriter else None)
+    try:
+        return writer_class(stream)
+    except Exception:
+        stream.close()
+        raise
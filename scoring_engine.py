@@ -0,0 +1,230 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from additional_data import DISCOUNT_MULTIPLIER, ROUNDING_THRESHOLDS, SURCHARGE_MULTIPLIER, ResourceBuildingTiersDict, \
+    ResourceBuildingsTranslationDict, ResourceProductionDict
+
+# column order of the resource matrix
+RESOURCES = (
+    # t1
+    "iron",
+    "wood",
+    "leather",
+    "herbs",
+    # t2
+    "steel",
+    "ironwood",
+    "fabric",
+    "oils",
+    # t3
+    "ether",
+    "jewels"
+)
+
+# order of the metrics in the output, same as the result table
+METRIC_NAMES = (
+    "value_per_minute_per_slot",
+    "profit_per_minute_per_slot",
+    *(f"{resource}_per_minute_per_slot" for resource in RESOURCES),
+    *(f"value_per_{resource}" for resource in RESOURCES)
+)
+
+# extra columns of the energy profit model, next to METRIC_NAMES
+ENERGY_METRIC_NAMES = (
+    "surcharge_profit_per_minute_per_slot",
+    "discount_profit_per_minute_per_slot",
+    "surcharge_energy_per_minute_per_slot",
+    "discount_energy_per_minute_per_slot",
+    "surcharge_gold_per_energy"
+)
+
+NO_RESOURCE_FOUND = -1
+
+
+class BlueprintMatrix:
+    """
+    All blueprints of a calculation as a structure of arrays, one
+    row per blueprint. Missing resources are NaN in the resource matrix.
+    """
+
+    def __init__(self, names: List[str], values: np.ndarray, crafting_times: np.ndarray, resources: np.ndarray):
+        self.names = names
+        # gold value after upgrades and rounding
+        self.values = values
+        # seconds
+        self.crafting_times = crafting_times
+        # blueprints x RESOURCES
+        self.resources = resources
+
+    def __len__(self):
+        return len(self.names)
+
+
+class EnergyTable:
+    """
+    Energy of selling every blueprint with a surcharge or a discount, and
+    the gold price of one energy: discounting is how energy is bought, so
+    energy costs the gold the cheapest discount gives up per energy.
+    Player independent, built once per catalogue.
+    """
+
+    def __init__(self, discount_energy: np.ndarray, surcharge_energy: np.ndarray, value_per_energy: float):
+        # energy gained by a discount and spent by a surcharge
+        self.discount_energy = discount_energy
+        self.surcharge_energy = surcharge_energy
+        # lowest value per energy a discount earns, the price of energy is the part of it a discount gives up
+        self.value_per_energy = value_per_energy
+
+    @classmethod
+    def build(cls, values: np.ndarray, discount_energy: np.ndarray, surcharge_energy: np.ndarray) -> "EnergyTable":
+        """
+        :param values: rounded upgraded values
+        :param discount_energy: energy a discount gives, NaN if unknown
+        :param surcharge_energy: energy a surcharge costs, NaN if unknown
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = values / discount_energy
+        ratios = ratios[np.isfinite(ratios) & (ratios > 0)]
+        return cls(discount_energy, surcharge_energy, float(ratios.min()) if len(ratios) else 0.0)
+
+    def gold_per_energy(self, discount_multiplier: float = DISCOUNT_MULTIPLIER) -> float:
+        """
+        :param discount_multiplier: selling price multiplier of a discounted sale
+        :return: gold the cheapest discount gives up per energy it earns
+        """
+        return self.value_per_energy * max(1 - discount_multiplier, 0)
+
+    def take(self, rows: np.ndarray) -> "EnergyTable":
+        return EnergyTable(self.discount_energy[rows], self.surcharge_energy[rows], self.value_per_energy)
+
+
+def market_multipliers(game_constants: Optional[dict]) -> Tuple[float, float]:
+    """
+    :param game_constants: game_constants of a player config, unset entries keep the additional_data estimates
+    :return: surcharge and discount multipliers
+    """
+    game_constants = game_constants or dict()
+    surcharge_multiplier = game_constants.get("surcharge_multiplier")
+    discount_multiplier = game_constants.get("discount_multiplier")
+    return (
+        SURCHARGE_MULTIPLIER if surcharge_multiplier is None else surcharge_multiplier,
+        DISCOUNT_MULTIPLIER if discount_multiplier is None else discount_multiplier
+    )
+
+
+def regeneration_rate(building: str, level: int, resource_generation: float) -> float:
+    """
+    :param building: building name, e.g. "IronMine"
+    :param level: building level
+    :param resource_generation: guild resource generation boost
+    :return: resources the building produces per minute
+    """
+    return ResourceProductionDict[ResourceBuildingTiersDict[building]][level] * resource_generation
+
+
+def regeneration_rates(buildings: dict, resource_generation: float) -> np.ndarray:
+    """
+    :param buildings: building name -> level
+    :param resource_generation: guild resource generation boost
+    :return: regeneration per minute of every resource, in RESOURCES order
+    """
+    resource_buildings = {resource: building for building, resource in ResourceBuildingsTranslationDict.items()}
+    return np.array([
+        regeneration_rate(resource_buildings[resource], buildings[resource_buildings[resource]], resource_generation)
+        for resource in RESOURCES
+    ])
+
+
+def round_values(values: np.ndarray) -> np.ndarray:
+    """
+    Rounds gold values with ROUNDING_THRESHOLDS. Like the scalar
+    ShopTitansCalculator._round, the first threshold a value reaches
+    decides its rounding base.
+    """
+    result = np.trunc(values)
+    pending = np.ones(len(values), dtype=bool)
+    for threshold, base in ROUNDING_THRESHOLDS.items():
+        matches = pending & (values >= threshold)
+        result[matches] = base * np.round(values[matches] / base)
+        pending &= ~matches
+    return result
+
+
+def effective_resources(resources: np.ndarray) -> np.ndarray:
+    """
+    Missing resources, and resources that upgrades brought down to 0
+    or below, all count as NO_RESOURCE_FOUND.
+    :param resources: blueprints x RESOURCES matrix, NaN where missing
+    :return: matrix with the same shape
+    """
+    resources = np.where(np.isnan(resources) | (resources == 0), NO_RESOURCE_FOUND, resources)
+    return np.maximum(resources, NO_RESOURCE_FOUND)
+
+
+def compute_metrics(matrix: BlueprintMatrix, profits: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """
+    Computes every metric of METRIC_NAMES for all blueprints at once.
+    Resources that are NO_RESOURCE_FOUND produce negative ratios, which
+    are clipped to 0 just like the per-blueprint calculation did.
+    :param matrix: blueprints to score
+    :param profits: profit per craft, defaults to the value
+    :return: dict of metric name -> array with one value per blueprint
+    """
+    values = matrix.values
+    if profits is None:
+        profits = values
+    # in mins
+    craft_times = matrix.crafting_times / 60
+    resources = effective_resources(matrix.resources)
+    per_minute = np.maximum(resources / craft_times[:, np.newaxis], 0)
+    per_resource = np.maximum(values[:, np.newaxis] / resources, 0)
+
+    metrics = {
+        "value_per_minute_per_slot": values / craft_times,
+        "profit_per_minute_per_slot": profits / craft_times
+    }
+    for column, resource in enumerate(RESOURCES):
+        metrics[f"{resource}_per_minute_per_slot"] = per_minute[:, column]
+    for column, resource in enumerate(RESOURCES):
+        metrics[f"value_per_{resource}"] = per_resource[:, column]
+    return metrics
+
+
+def compute_energy_metrics(matrix: BlueprintMatrix, component_costs: np.ndarray, energy: EnergyTable,
+                           max_energy: Optional[float] = None, surcharge_multiplier: float = SURCHARGE_MULTIPLIER,
+                           discount_multiplier: float = DISCOUNT_MULTIPLIER) -> Dict[str, np.ndarray]:
+    """
+    Computes every metric of ENERGY_METRIC_NAMES. Energy is priced at
+    energy.gold_per_energy, so a surcharge pays for the energy it spends
+    and a discount earns the energy it gives. Blueprints whose surcharge
+    costs more than max_energy can never be surcharged and get NaN.
+    :param matrix: blueprints to score
+    :param component_costs: gold spent on components per craft
+    :param energy: energy table of the same blueprints
+    :param max_energy: energy cap of the player, None for no cap
+    :param surcharge_multiplier: selling price multiplier of a surcharged sale, see market_multipliers
+    :param discount_multiplier: selling price multiplier of a discounted sale, see market_multipliers
+    :return: dict of metric name -> array with one value per blueprint
+    """
+    values = matrix.values
+    craft_times = matrix.crafting_times / 60
+    price = energy.gold_per_energy(discount_multiplier)
+    surcharge_profits = values * surcharge_multiplier - component_costs - energy.surcharge_energy * price
+    discount_profits = values * discount_multiplier - component_costs + energy.discount_energy * price
+    metrics = {
+        "surcharge_profit_per_minute_per_slot": surcharge_profits / craft_times,
+        "discount_profit_per_minute_per_slot": discount_profits / craft_times,
+        "surcharge_energy_per_minute_per_slot": energy.surcharge_energy / craft_times,
+        "discount_energy_per_minute_per_slot": energy.discount_energy / craft_times,
+        # extra gold of a surcharge over a plain sale, per energy spent
+        "surcharge_gold_per_energy": values * (surcharge_multiplier - 1) / energy.surcharge_energy
+    }
+    if max_energy is not None:
+        out_of_reach = energy.surcharge_energy > max_energy
+        for key in ("surcharge_profit_per_minute_per_slot", "surcharge_energy_per_minute_per_slot",
+                    "surcharge_gold_per_energy"):
+            metrics[key] = np.where(out_of_reach, np.nan, metrics[key])
+    return metrics
@@ -0,0 +1,241 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import heapq
+import math
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from additional_data import DEFAULT_CRAFTING_SLOTS
+from blueprint_catalogue import GameDataset
+from class_definitions import ShopTitansPlayerConfig
+from incremental import IncrementalCalculator
+from scoring_engine import RESOURCES, effective_resources, regeneration_rates
+
+DEFAULT_HOURS = 24 * 7
+# blueprints a slot chooses from, best value/minute first
+DEFAULT_CANDIDATES = 20
+# the spreadsheet has no storage sizes, so a full bin is assumed to hold this many minutes of regeneration
+DEFAULT_STORAGE_MINUTES = 120
+# regenerated amounts are floats, a wake up exactly when a resource is ready must not miss it by a rounding error
+EPSILON = 1e-9
+
+# event kinds
+CRAFT_DONE = 0
+RESOURCES_READY = 1
+
+
+class Event:
+    """
+    Entry of the event queue. Handled events go back to a pool and are
+    reused, a week of crafting allocates only as many as are queued at once.
+    """
+    __slots__ = ("time", "sequence", "kind", "slot", "row")
+
+    def __lt__(self, other: "Event") -> bool:
+        # the sequence keeps events of the same minute in the order they were queued
+        return (self.time, self.sequence) < (other.time, other.sequence)
+
+
+class EventQueue:
+    def __init__(self):
+        self._heap: List[Event] = list()
+        self._pool: List[Event] = list()
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, time: float, kind: int, slot: int = -1, row: int = -1):
+        event = self._pool.pop() if self._pool else Event()
+        event.time = time
+        event.sequence = self._sequence
+        event.kind = kind
+        event.slot = slot
+        event.row = row
+        self._sequence += 1
+        heapq.heappush(self._heap, event)
+
+    def pop(self) -> Event:
+        return heapq.heappop(self._heap)
+
+    def release(self, event: Event):
+        self._pool.append(event)
+
+
+class SimulationResult(NamedTuple):
+    hours: float
+    slots: int
+    # gold of the crafts finished within the hours
+    gold: float
+    # gold minus the components the crafts used
+    profit: float
+    gold_per_hour: float
+    profit_per_hour: float
+    # slots x hours spent crafting, 1.0 is no idle slot at all
+    utilization: float
+    # what the ranking promises: every slot on the best blueprint, resources never running out
+    naive_gold_per_hour: float
+    # catalogue index -> finished crafts, most crafted first
+    crafts: Dict[int, int]
+
+
+class CraftingSimulator:
+    """
+    Plays out crafting minute by minute as discrete events: a slot picks the
+    best candidate blueprint it can afford, pays the resources and is busy
+    for the crafting time. Resources regenerate continuously up to the
+    storage size, so they are only brought up to date when an event
+    happens. A slot that can afford nothing waits until the resources of
+    the first candidate that becomes affordable have regenerated.
+    """
+
+    def __init__(self, values: np.ndarray, component_costs: np.ndarray, crafting_times: np.ndarray,
+                 costs: np.ndarray, regen: np.ndarray, storage: np.ndarray, slots: int = DEFAULT_CRAFTING_SLOTS):
+        """
+        :param values: gold per craft of the candidates, best first
+        :param component_costs: gold spent on components per craft of the candidates
+        :param crafting_times: crafting times in seconds of the candidates, workers applied
+        :param costs: candidates x RESOURCES, 0 where a resource is not used
+        :param regen: regeneration per minute of every resource
+        :param storage: most of every resource that can be stored
+        :param slots: crafting slots
+        """
+        # candidates that need more than fits into storage can never be crafted
+        craftable = (costs <= storage).all(axis=1) & (crafting_times > 0)
+        self.candidates = np.flatnonzero(craftable).tolist()
+        self.values = values.tolist()
+        self.profits = (values - component_costs).tolist()
+        self.minutes = (crafting_times / 60).tolist()
+        self.costs = costs.tolist()
+        self.regen = regen.tolist()
+        self.storage = storage.tolist()
+        self.slots = slots
+        best = max(
+            (value / minutes for value, minutes in zip(self.values, self.minutes) if minutes > 0), default=0.0
+        )
+        self.naive_gold_per_hour = best * 60 * slots
+
+    def _ready_in(self, stock: List[float], costs: List[float]) -> float:
+        """
+        :return: minutes until the stock covers costs, inf if a resource never regenerates
+        """
+        wait = 0.0
+        for have, need, regen in zip(stock, costs, self.regen):
+            if need > have + EPSILON:
+                if regen <= 0:
+                    return math.inf
+                wait = max(wait, (need - have) / regen)
+        return wait
+
+    def run(self, hours: float = DEFAULT_HOURS, initial_stock: Optional[np.ndarray] = None) -> SimulationResult:
+        """
+        :param hours: how long to craft
+        :param initial_stock: resources at the start, empty storage if None
+        """
+        horizon = hours * 60
+        stock = [0.0] * len(RESOURCES) if initial_stock is None else initial_stock.tolist()
+        regen, storage, costs = self.regen, self.storage, self.costs
+        resources = range(len(regen))
+        queue = EventQueue()
+        idle: List[int] = list(range(self.slots))
+        now = 0.0
+        gold = profit = busy = 0.0
+        crafts: Dict[int, int] = dict()
+        # time of the earliest queued RESOURCES_READY event, later ones are only rechecks
+        wake_time = 0.0
+        queue.push(0.0, RESOURCES_READY)
+        while queue:
+            event = queue.pop()
+            if event.time > horizon:
+                queue.release(event)
+                break
+            elapsed = event.time - now
+            now = event.time
+            for resource in resources:
+                stock[resource] = min(storage[resource], stock[resource] + regen[resource] * elapsed)
+            if event.kind == CRAFT_DONE:
+                gold += self.values[event.row]
+                profit += self.profits[event.row]
+                crafts[event.row] = crafts.get(event.row, 0) + 1
+                idle.append(event.slot)
+            elif event.time >= wake_time:
+                wake_time = math.inf
+            queue.release(event)
+
+            # start crafts on the idle slots while anything is affordable
+            while idle:
+                for row in self.candidates:
+                    row_costs = costs[row]
+                    if all(stock[resource] + EPSILON >= row_costs[resource] for resource in resources):
+                        break
+                else:
+                    break
+                for resource in resources:
+                    stock[resource] -= row_costs[resource]
+                slot = idle.pop()
+                minutes = self.minutes[row]
+                busy += min(minutes, horizon - now)
+                queue.push(now + minutes, CRAFT_DONE, slot, row)
+            if idle and self.candidates:
+                wait = min(self._ready_in(stock, costs[row]) for row in self.candidates)
+                if wait < math.inf and now + wait < wake_time:
+                    wake_time = now + wait
+                    queue.push(wake_time, RESOURCES_READY)
+
+        return SimulationResult(
+            hours=hours,
+            slots=self.slots,
+            gold=gold,
+            profit=profit,
+            gold_per_hour=gold / hours if hours else 0.0,
+            profit_per_hour=profit / hours if hours else 0.0,
+            utilization=busy / (horizon * self.slots) if horizon and self.slots else 0.0,
+            naive_gold_per_hour=self.naive_gold_per_hour,
+            crafts=dict(sorted(crafts.items(), key=lambda item: -item[1]))
+        )
+
+
+def simulate_player(dataset: GameDataset, player_config: ShopTitansPlayerConfig, hours: float = DEFAULT_HOURS,
+                    slots: int = DEFAULT_CRAFTING_SLOTS, candidates: int = DEFAULT_CANDIDATES,
+                    storage_minutes: float = DEFAULT_STORAGE_MINUTES,
+                    scorer: IncrementalCalculator = None) -> SimulationResult:
+    """
+    Simulates a player crafting the top blueprints of the value/minute ranking.
+    :param dataset: game data
+    :param player_config: player to simulate
+    :param hours: how long to craft
+    :param slots: crafting slots
+    :param candidates: how many of the best ranked blueprints the slots choose from
+    :param storage_minutes: minutes of regeneration a full storage holds
+    :param scorer: calculator to reuse between players, only changed blueprints are rescored
+    :return: simulation result, crafts are keyed by catalogue index
+    """
+    scorer = scorer if scorer is not None else IncrementalCalculator(dataset)
+    metrics = scorer.calculate(player_config)
+    rates = np.nan_to_num(metrics["value_per_minute_per_slot"], nan=-np.inf)
+    rows = np.argsort(-rates, kind="stable")[:candidates]
+    regen = regeneration_rates(player_config.buildings, player_config.guild_boosts.resource_generation)
+    simulator = CraftingSimulator(
+        values=scorer.values[rows],
+        component_costs=scorer.component_costs[rows],
+        crafting_times=scorer.crafting_times[rows],
+        # costs that upgrades brought to 0 or below cost nothing
+        costs=np.maximum(effective_resources(scorer.resources[rows]), 0),
+        regen=regen,
+        storage=regen * storage_minutes,
+        slots=slots
+    )
+    result = simulator.run(hours)
+    return result._replace(crafts={int(rows[row]): count for row, count in result.crafts.items()})
+
+
+def format_simulation(result: SimulationResult, names: List[str]) -> List[str]:
+    lines = [
+        f"{result.hours} hours on {result.slots} slots: {round(result.gold_per_hour, 1)} gold/hour, "
+        f"{round(result.profit_per_hour, 1)} profit/hour, {round(result.utilization * 100, 1)}% slot utilization",
+        f"The ranking expects {round(result.naive_gold_per_hour, 1)} gold/hour with unlimited resources"
+    ]
+    for row, count in result.crafts.items():
+        lines.append(f"{count} x {names[row]}")
+    return lines
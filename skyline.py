@@ -0,0 +1,142 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from scoring_engine import ENERGY_METRIC_NAMES, METRIC_NAMES, RESOURCES
+
+# metrics where less is better, every other metric is maximized
+MINIMIZED_METRICS = (
+    *(f"{resource}_per_minute_per_slot" for resource in RESOURCES),
+    "surcharge_energy_per_minute_per_slot"
+)
+DIRECTIONS = ("max", "min")
+# candidates checked against each other at once
+BLOCK_SIZE = 256
+# candidate x skyline point pairs compared at once, bounds the memory of a check
+CHECK_SIZE = 1 << 20
+
+
+def parse_objective(text: str) -> Tuple[str, bool]:
+    """
+    :param text: metric name, optionally with the direction, e.g. "iron_per_minute_per_slot" or "value_per_iron:max"
+    :return: (metric, True if larger is better)
+    :raise ValueError: on unknown metrics or directions
+    """
+    metric, _, direction = text.strip().partition(":")
+    if metric not in METRIC_NAMES + ENERGY_METRIC_NAMES:
+        raise ValueError(f"unknown metric {metric}")
+    if direction and direction not in DIRECTIONS:
+        raise ValueError(f"unknown direction {direction}, use one of {', '.join(DIRECTIONS)}")
+    if not direction:
+        return metric, metric not in MINIMIZED_METRICS
+    return metric, direction == "max"
+
+
+def objective_matrix(metrics: Dict[str, np.ndarray], objectives: Iterable[str]) -> np.ndarray:
+    """
+    :param metrics: metric name -> one value per blueprint
+    :param objectives: see parse_objective
+    :return: blueprints x objectives, larger is better in every column, NaN is the worst value
+    """
+    columns = list()
+    for objective in objectives:
+        metric, maximize = parse_objective(objective)
+        column = metrics[metric] if maximize else -metrics[metric]
+        columns.append(np.where(np.isnan(column), -np.inf, column))
+    if not columns:
+        raise ValueError("a skyline needs at least one objective")
+    return np.stack(columns, axis=1)
+
+
+def _skyline_2d(points: np.ndarray) -> np.ndarray:
+    """
+    Sort by the first objective, then the second, best first: a point is
+    on the skyline if it is the best of its first objective value and beats
+    the second objective of every point with a better first objective.
+    """
+    order = np.lexsort((-points[:, 1], -points[:, 0]))
+    first, second = points[order, 0], points[order, 1]
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = first[1:] != first[:-1]
+    # position of the first, so best second objective, point of every group of equal first objectives
+    group_start = np.maximum.accumulate(np.where(starts, np.arange(len(order)), 0))
+    best = np.maximum.accumulate(second)
+    best_before = np.concatenate(([-np.inf], best[:-1]))[group_start]
+    group_best = second[group_start]
+    keep = (second == group_best) & ((group_best > best_before) | (group_start == 0))
+    return np.sort(order[keep])
+
+
+def _dominated(candidates: np.ndarray, dominators: np.ndarray) -> np.ndarray:
+    """
+    :return: mask of the candidates that any of the dominators dominates
+    """
+    at_least = np.ones((len(candidates), len(dominators)), dtype=bool)
+    better = np.zeros((len(candidates), len(dominators)), dtype=bool)
+    # one objective at a time, comparisons along a short last axis are slow
+    for column in range(candidates.shape[1]):
+        candidate, dominator = candidates[:, None, column], dominators[None, :, column]
+        at_least &= dominator >= candidate
+        better |= dominator > candidate
+    return (at_least & better).any(axis=1)
+
+
+def _skyline_sfs(points: np.ndarray) -> np.ndarray:
+    """
+    Sort-Filter-Skyline: sorted by the sum of the per objective ranks, a
+    point can only be dominated by points before it. The skyline of the
+    first block, the strongest points, first filters out everything they
+    dominate in one pass over all points. The rest is checked against the
+    skyline found so far in wide blocks, and the few candidates that
+    survive against each other a small block at a time.
+    """
+    ranks = np.zeros(len(points), dtype=np.int64)
+    for column in range(points.shape[1]):
+        ranks += np.unique(points[:, column], return_inverse=True)[1].reshape(-1)
+    order = np.argsort(-ranks, kind="stable")
+    first = order[:BLOCK_SIZE]
+    strongest = points[first[~_dominated(points[first], points[first])]]
+    size = max(BLOCK_SIZE, CHECK_SIZE // len(strongest))
+    remaining = np.concatenate([
+        ~_dominated(points[start:start + size], strongest) for start in range(0, len(points), size)
+    ])
+    order = order[remaining[order]]
+
+    skyline_rows: List[np.ndarray] = list()
+    skyline_points = np.zeros((0, points.shape[1]))
+    start = 0
+    while start < len(order):
+        # wide blocks while the skyline is small, a check compares block x skyline points
+        size = max(BLOCK_SIZE, CHECK_SIZE // max(len(skyline_points), 1))
+        rows = order[start:start + size]
+        start += size
+        rows = rows[~_dominated(points[rows], skyline_points)]
+        found = len(skyline_points)
+        for block_start in range(0, len(rows), BLOCK_SIZE):
+            block_rows = rows[block_start:block_start + BLOCK_SIZE]
+            block = points[block_rows]
+            # only the points found in this wide block are new to the candidates
+            keep = ~_dominated(block, skyline_points[found:])
+            block_rows, block = block_rows[keep], block[keep]
+            keep = ~_dominated(block, block)
+            skyline_rows.append(block_rows[keep])
+            skyline_points = np.concatenate((skyline_points, block[keep]))
+    return np.sort(np.concatenate(skyline_rows)) if skyline_rows else np.zeros(0, dtype=np.int64)
+
+
+def skyline(points: np.ndarray) -> np.ndarray:
+    """
+    Rows no other row dominates, i.e. is at least as good in every objective
+    and better in one. Equal rows do not dominate each other.
+    :param points: rows x objectives, larger is better, see objective_matrix
+    :return: indexes of the skyline rows, ascending
+    """
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if points.shape[1] == 1:
+        return np.flatnonzero(points[:, 0] == points[:, 0].max())
+    if points.shape[1] == 2:
+        return _skyline_2d(points)
+    return _skyline_sfs(points)
@@ -0,0 +1,164 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+from typing import Dict, List, NamedTuple, Optional
+
+from blueprint_catalogue import GameDataset
+from class_definitions import ShopTitansPlayerConfig
+from game_data import BLUEPRINTS_SHEET, DATA_DIRECTORY, SnapshotError, fingerprint_rows, generate_snapshot, \
+    open_sheet
+from ranking import DEFAULT_SORT, RankingQuery, rank
+
+# ranking moves are reported for the blueprints in the top this many before or after the patch
+DEFAULT_REPORT_TOP = 20
+
+
+class BlueprintChanges(NamedTuple):
+    added: List[str]
+    removed: List[str]
+    # blueprint name -> columns whose cells changed
+    changed: Dict[str, List[str]]
+    # unchanged blueprints that use an added, removed or changed blueprint as a component
+    dependents: List[str]
+
+
+class RankMove(NamedTuple):
+    name: str
+    # 1 is the best, None if the blueprint is not in that snapshot
+    old_rank: Optional[int]
+    new_rank: Optional[int]
+
+
+class PatchReport(NamedTuple):
+    manifest: dict
+    # None if there was no readable snapshot before
+    changes: Optional[BlueprintChanges]
+    sort: str
+    # empty without a player config to rank with
+    moves: List[RankMove]
+
+
+def _read_columns(data_directory: str) -> Optional[Dict[str, list]]:
+    """
+    :return: columns of the Blueprints sheet of the snapshot, None if there is none of this version
+    """
+    try:
+        table = open_sheet(BLUEPRINTS_SHEET, data_directory)
+    except (FileNotFoundError, SnapshotError):
+        return None
+    return {name: table.column(name) for name in table.column_names}
+
+
+def _rows_by_name(columns: Dict[str, list]) -> Dict[str, int]:
+    rows = dict()
+    for row, name in enumerate(columns.get("Name", list())):
+        # components refer to the first blueprint of a name, so does the diff
+        rows.setdefault(name, row)
+    return rows
+
+
+def blueprint_changes(old_columns: Dict[str, list], new_columns: Dict[str, list],
+                      dataset: GameDataset) -> BlueprintChanges:
+    """
+    Compares the fingerprints of the Blueprints rows of two snapshots by
+    blueprint name, only rows whose fingerprints differ are compared cell
+    by cell.
+    :param old_columns: Blueprints sheet before the patch
+    :param new_columns: Blueprints sheet after the patch
+    :param dataset: game data after the patch, its component graph finds the dependents
+    """
+    old_rows, new_rows = _rows_by_name(old_columns), _rows_by_name(new_columns)
+    old_fingerprints, new_fingerprints = fingerprint_rows(old_columns), fingerprint_rows(new_columns)
+    changed = dict()
+    for name, new_row in new_rows.items():
+        old_row = old_rows.get(name)
+        if old_row is None or old_fingerprints[old_row] == new_fingerprints[new_row]:
+            continue
+        changed[name] = [
+            column for column in sorted(set(old_columns) | set(new_columns))
+            # repr, so NaN cells equal each other like they do in the fingerprint
+            if column not in old_columns or column not in new_columns
+            or repr(old_columns[column][old_row]) != repr(new_columns[column][new_row])
+        ]
+    added = [name for name in new_rows if name not in old_rows]
+    removed = [name for name in old_rows if name not in new_rows]
+    patched = set(added) | set(removed) | set(changed)
+    catalogue = dataset.catalogue
+    dependents = [
+        catalogue.names[row] for row in catalogue.component_graph().dependents(patched).nonzero()[0].tolist()
+        if catalogue.names[row] not in patched
+    ]
+    return BlueprintChanges(added=added, removed=removed, changed=changed, dependents=dependents)
+
+
+def rank_positions(dataset: GameDataset, player_config: ShopTitansPlayerConfig, sort: str) -> Dict[str, int]:
+    """
+    :return: blueprint name -> rank of the whole catalogue by sort, 1 is the best
+    """
+    names = dataset.catalogue.names
+    positions = dict()
+    for position, row in enumerate(rank(dataset, player_config, RankingQuery(sort=sort)).rows.tolist()):
+        positions.setdefault(names[row], position + 1)
+    return positions
+
+
+def ranking_moves(old_positions: Dict[str, int], new_positions: Dict[str, int],
+                  top: int = DEFAULT_REPORT_TOP) -> List[RankMove]:
+    """
+    :return: blueprints in the top of either ranking whose rank changed, by their new rank, dropped ones last
+    """
+    moves = [
+        RankMove(name, old_positions.get(name), new_positions.get(name))
+        for name in set(old_positions) | set(new_positions)
+        if old_positions.get(name) != new_positions.get(name)
+        and min(old_positions.get(name, top + 1), new_positions.get(name, top + 1)) <= top
+    ]
+    return sorted(moves, key=lambda move: (move.new_rank is None, move.new_rank or move.old_rank, move.name))
+
+
+def regenerate(spreadsheet_file: str, player_config: ShopTitansPlayerConfig = None, sort: str = DEFAULT_SORT,
+               top: int = DEFAULT_REPORT_TOP, data_directory: str = DATA_DIRECTORY) -> PatchReport:
+    """
+    Regenerates the snapshot and reports what the patch changed. The
+    ranking before the patch is calculated before any sheet is replaced.
+    :param spreadsheet_file: path to the xlsx file
+    :param player_config: player whose ranking moves are reported, None to skip them
+    :param sort: metric of the ranking
+    :param top: see ranking_moves
+    :param data_directory: directory that holds the snapshot
+    """
+    old_columns = _read_columns(data_directory)
+    old_positions = None
+    if old_columns is not None and player_config is not None:
+        old_positions = rank_positions(GameDataset.load(data_directory), player_config, sort)
+    manifest = generate_snapshot(spreadsheet_file, data_directory)
+    if old_columns is None:
+        return PatchReport(manifest=manifest, changes=None, sort=sort, moves=list())
+    dataset = GameDataset.load(data_directory)
+    changes = blueprint_changes(old_columns, _read_columns(data_directory), dataset)
+    moves = list()
+    if old_positions is not None:
+        moves = ranking_moves(old_positions, rank_positions(dataset, player_config, sort), top)
+    return PatchReport(manifest=manifest, changes=changes, sort=sort, moves=moves)
+
+
+def format_report(report: PatchReport) -> List[str]:
+    lines = [f"Rewritten sheets: {', '.join(report.manifest['rewritten_sheets']) or 'none'}"]
+    changes = report.changes
+    if changes is None:
+        lines.append("No earlier snapshot of this version to compare with")
+        return lines
+    lines.append(
+        f"{len(changes.added)} blueprints added, {len(changes.removed)} removed, {len(changes.changed)} changed, "
+        f"{len(changes.dependents)} more use one of them as a component"
+    )
+    lines.extend(f"+ {name}" for name in changes.added)
+    lines.extend(f"- {name}" for name in changes.removed)
+    lines.extend(f"~ {name}: {', '.join(columns)}" for name, columns in changes.changed.items())
+    lines.extend(f"> {name}" for name in changes.dependents)
+    if report.moves:
+        lines.append(f"Ranking moves by {report.sort}:")
+    for move in report.moves:
+        old_rank = "new" if move.old_rank is None else move.old_rank
+        new_rank = "dropped" if move.new_rank is None else move.new_rank
+        lines.append(f"{move.name}: {old_rank} -> {new_rank}")
+    return lines
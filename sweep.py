@@ -0,0 +1,155 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+from additional_data import DEFAULT_CRAFTING_SLOTS, ResourceBuildingsTranslationDict, ResourceProductionDict, \
+    ResourceBuildingTiersDict
+from ascensions import ascension_bonuses
+from blueprint_catalogue import GameDataset
+from class_definitions import ShopTitansPlayerConfig
+from scoring_engine import RESOURCES, regeneration_rate, regeneration_rates, round_values
+
+
+class SweepResult(NamedTuple):
+    upgrade: str
+    from_level: int
+    to_level: int
+    best_value_per_minute: float
+    gain: float
+    best_blueprint: str
+
+
+def sustained_value_per_minute(values: np.ndarray, crafting_times: np.ndarray, costs: np.ndarray,
+                               regen: np.ndarray, slots: int) -> np.ndarray:
+    """
+    Value per minute of every blueprint when all slots craft it, capped
+    by the resource regeneration: a blueprint can not be crafted faster
+    than its most limiting resource comes back.
+    :param values: value per craft
+    :param crafting_times: crafting time in seconds
+    :param costs: blueprints x RESOURCES, NaN where the resource is not used
+    :param regen: regeneration per minute of every resource
+    :param slots: crafting slots
+    :return: value per minute of every blueprint
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crafts_per_minute = slots / (crafting_times / 60)
+        # fmin skips the NaN of unused resources
+        resource_limit = np.fmin.reduce(regen / costs, axis=1)
+        return values * np.fmin(crafts_per_minute, resource_limit)
+
+
+class SensitivitySweep:
+    """
+    Scores the player once, then answers "what if this worker or building
+    was one level higher" by recomputing only the blueprints the upgrade
+    touches: a worker only changes the crafting time of the blueprints
+    that require them, a building only the cap of blueprints using its
+    resource. Upgrades, rounding and everything else are reused.
+    """
+
+    def __init__(self, dataset: GameDataset, player_config: ShopTitansPlayerConfig,
+                 slots: int = DEFAULT_CRAFTING_SLOTS):
+        self.dataset = dataset
+        self.player_config = player_config
+        self.slots = slots
+        catalogue = dataset.catalogue
+        values, crafting_times, resources = catalogue.upgraded()
+        values, crafting_times = catalogue.ascension_index().apply(
+            values, crafting_times, player_config.get("ascensions") or dict(),
+            bonuses=ascension_bonuses(player_config.get("game_constants"))
+        )
+        self.values = round_values(values)
+        self.base_crafting_times = crafting_times
+        # costs that upgrades brought to 0 or below do not limit anything
+        self.costs = np.where(resources > 0, resources, np.nan)
+        self.craft_times = {
+            worker: dataset.worker_craft_time(level, player_config.guild_boosts.craft_speed)
+            for worker, level in player_config.workers.items()
+        }
+        self.regen = regeneration_rates(player_config.buildings, player_config.guild_boosts.resource_generation)
+        self.crafting_times = catalogue.apply_workers(crafting_times, self.craft_times, dataset.worker_names)
+        self.rates = sustained_value_per_minute(
+            self.values, self.crafting_times, self.costs, self.regen, slots
+        )
+        self.best = float(np.nanmax(self.rates))
+
+    def _result(self, upgrade: str, from_level: int, rows: np.ndarray, rates: np.ndarray) -> SweepResult:
+        upgraded_rates = self.rates.copy()
+        upgraded_rates[rows] = rates
+        best_index = int(np.nanargmax(upgraded_rates))
+        best = float(upgraded_rates[best_index])
+        return SweepResult(
+            upgrade=upgrade,
+            from_level=from_level,
+            to_level=from_level + 1,
+            best_value_per_minute=best,
+            gain=best - self.best,
+            best_blueprint=self.dataset.catalogue.names[best_index]
+        )
+
+    def worker(self, worker: str) -> SweepResult:
+        level = self.player_config.workers[worker]
+        jobs = {name: job for job, name in self.dataset.worker_names.items()}
+        rows = np.flatnonzero(self.dataset.catalogue.uses_job(jobs[worker]))
+        craft_times = dict(self.craft_times)
+        craft_times[worker] = self.dataset.worker_craft_time(level + 1, self.player_config.guild_boosts.craft_speed)
+        crafting_times = self.dataset.catalogue.apply_workers(
+            self.base_crafting_times[rows], craft_times, self.dataset.worker_names, rows
+        )
+        rates = sustained_value_per_minute(
+            self.values[rows], crafting_times, self.costs[rows], self.regen, self.slots
+        )
+        return self._result(f"Worker {worker}", level, rows, rates)
+
+    def building(self, building: str) -> SweepResult:
+        level = self.player_config.buildings[building]
+        column = RESOURCES.index(ResourceBuildingsTranslationDict[building])
+        rows = np.flatnonzero(~np.isnan(self.costs[:, column]))
+        regen = self.regen.copy()
+        regen[column] = regeneration_rate(building, level + 1, self.player_config.guild_boosts.resource_generation)
+        rates = sustained_value_per_minute(
+            self.values[rows], self.crafting_times[rows], self.costs[rows], regen, self.slots
+        )
+        return self._result(f"Building {building}", level, rows, rates)
+
+    def run(self) -> List[SweepResult]:
+        """
+        :return: one result for every worker and building that is not maxed, best gain first
+        """
+        max_worker_level = max(self.dataset.worker_level_speeds)
+        results = [
+            self.worker(worker) for worker, level in self.player_config.workers.items()
+            if level < max_worker_level
+        ]
+        results += [
+            self.building(building) for building, level in self.player_config.buildings.items()
+            if level < max(ResourceProductionDict[ResourceBuildingTiersDict[building]])
+        ]
+        return sorted(results, key=lambda result: result.gain, reverse=True)
+
+
+def format_sweep(sweep: SensitivitySweep, results: List[SweepResult]) -> List[str]:
+    spacings: Dict[str, int] = {
+        "upgrade": 30,
+        "levels": 10,
+        "best value/minute": 20,
+        "gain": 12,
+        "best blueprint": 30
+    }
+    lines = [
+        f"Best sustained value/minute on {sweep.slots} slots: {round(sweep.best, 3)}",
+        "".join(key.center(spacing) + "|" for key, spacing in spacings.items())
+    ]
+    for result in results:
+        cells = (
+            result.upgrade,
+            f"{result.from_level} -> {result.to_level}",
+            round(result.best_value_per_minute, 3),
+            round(result.gain, 3),
+            result.best_blueprint
+        )
+        lines.append("".join(str(cell).center(spacing) + "|" for cell, spacing in zip(cells, spacings.values())))
+    return lines
@@ -0,0 +1,56 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+
+from blueprint_index import BlueprintIndex
+from scoring_engine import RESOURCES
+
+
+class Catalogue:
+    """
+    The parts of a BlueprintCatalogue the index reads, for five blueprints.
+    """
+    jobs = ["Blacksmith", "Jeweler"]
+    tiers = np.array([3.0, 1.0, 10.0, 3.0, 12.0])
+    # required job of every blueprint, index into jobs
+    required = np.array([0, 0, 1, 1, 0])
+
+    def __len__(self):
+        return len(self.tiers)
+
+    def uses_job(self, job: str) -> np.ndarray:
+        return self.required == self.jobs.index(job)
+
+    def upgraded(self):
+        resources = np.full((len(self), len(RESOURCES)), np.nan)
+        resources[:, RESOURCES.index("iron")] = [5, 3, np.nan, 0, 10]
+        resources[:, RESOURCES.index("jewels")] = [np.nan, np.nan, 2, 1, -1]
+        return np.ones(len(self)), np.ones(len(self)), resources
+
+
+class BlueprintIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = BlueprintIndex(Catalogue())
+
+    def test_tier_range(self):
+        self.assertEqual(self.index.tier_range().tolist(), [1, 0, 3, 2, 4])
+        self.assertEqual(self.index.tier_range(3, 10).tolist(), [0, 3, 2])
+        self.assertEqual(self.index.tier_range(low=11).tolist(), [4])
+        self.assertEqual(self.index.tier_range(high=0).tolist(), [])
+
+    def test_resources_after_upgrades(self):
+        # missing costs and costs upgrades brought to 0 or below are not used
+        self.assertEqual(self.index.resources["iron"].tolist(), [True, True, False, False, True])
+        self.assertEqual(self.index.resources["jewels"].tolist(), [False, False, True, True, False])
+
+    def test_select(self):
+        self.assertEqual(np.flatnonzero(self.index.select(low_tier=10, jobs=["Jeweler"])).tolist(), [2])
+        self.assertEqual(np.flatnonzero(self.index.select(jobs=["Blacksmith"], uses=["iron"])).tolist(), [0, 1, 4])
+        self.assertEqual(np.flatnonzero(self.index.select(high_tier=3, without=["iron"])).tolist(), [3])
+        self.assertEqual(self.index.select().sum(), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import unittest
+
+from class_definitions import ComponentRequirement, FinalBPData, TransformedBP, TransformedBPData
+
+
+class SlottedRecordTest(unittest.TestCase):
+    def test_positional_and_keyword_fields(self):
+        requirement = ComponentRequirement("Iron Ore", amount=2)
+        self.assertEqual(requirement.name, "Iron Ore")
+        self.assertEqual(requirement.amount, 2)
+        self.assertEqual(requirement["amount"], 2)
+        self.assertEqual(requirement.keys(), ["name", "amount"])
+        self.assertEqual(requirement.items(), [("name", "Iron Ore"), ("amount", 2)])
+
+    def test_unset_fields(self):
+        blueprint = TransformedBP(name="Squire Sword", tier=1)
+        self.assertIsNone(blueprint.iron)
+        self.assertEqual(blueprint.get("iron", 0), 0)
+        self.assertNotIn("iron", blueprint.keys())
+        with self.assertRaises(KeyError):
+            blueprint["iron"]
+        blueprint.set_attribute("iron", 5)
+        self.assertEqual(blueprint.get("iron", 0), 5)
+        self.assertIn("iron", blueprint.keys())
+
+    def test_none_is_not_unset(self):
+        blueprint = TransformedBP(name="Squire Sword", workers=None)
+        self.assertIsNone(blueprint.get("workers", list()))
+        self.assertIsNone(blueprint["workers"])
+        self.assertEqual(blueprint.keys(), ["name", "workers"])
+
+    def test_unknown_fields(self):
+        with self.assertRaises(AttributeError):
+            TransformedBP(name="Squire Sword", colour="red")
+        with self.assertRaises(AttributeError):
+            TransformedBP().colour
+        with self.assertRaises(TypeError):
+            ComponentRequirement("Iron Ore", 2, 10, 1)
+        self.assertEqual(TransformedBP().get("colour", 1), 1)
+
+    def test_equality(self):
+        first = FinalBPData(
+            transformed_data=TransformedBP(name="Squire Sword", tier=1),
+            calculated_values=TransformedBPData(name="Squire Sword", value_per_iron=2.5)
+        )
+        second = FinalBPData(
+            transformed_data=TransformedBP(name="Squire Sword", tier=1),
+            calculated_values=TransformedBPData(name="Squire Sword", value_per_iron=2.5)
+        )
+        self.assertEqual(first, second)
+        second.transformed_data.set_attribute("value", 50)
+        self.assertNotEqual(first, second)
+        self.assertNotEqual(TransformedBP(name="Squire Sword"), TransformedBPData(name="Squire Sword"))
+        self.assertEqual(repr(TransformedBP(name="Squire Sword", tier=1)), "TransformedBP(name='Squire Sword', tier=1)")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+
+from component_costs import ComponentCycleError, ComponentGraph, NOT_CRAFTED
+
+
+def graph(components: dict) -> ComponentGraph:
+    """
+    :param components: blueprint name -> (component name, amount) pairs
+    """
+    names = list(components)
+    return ComponentGraph(names, [
+        [(name, "Common", amount) for name, amount in pairs] + [("", "", 0.0)] * (2 - len(pairs))
+        for pairs in components.values()
+    ])
+
+
+class ComponentGraphTest(unittest.TestCase):
+    def setUp(self):
+        # Blade <- Sword <- Greatsword, Sword also needs a quest component
+        self.graph = graph({
+            "Greatsword": [("Sword", 2)],
+            "Sword": [("Blade", 1), ("Iron Ore", 3)],
+            "Blade": [],
+            "Shield": [("Iron Ore", 1)]
+        })
+
+    def test_sources(self):
+        self.assertEqual(self.graph.sources.tolist(), [[1, NOT_CRAFTED], [2, NOT_CRAFTED],
+                                                       [NOT_CRAFTED, NOT_CRAFTED], [NOT_CRAFTED, NOT_CRAFTED]])
+
+    def test_order_puts_components_first(self):
+        position = {row: index for index, row in enumerate(self.graph.order)}
+        self.assertEqual(sorted(self.graph.order), [0, 1, 2, 3])
+        self.assertLess(position[2], position[1])
+        self.assertLess(position[1], position[0])
+
+    def test_cycle(self):
+        with self.assertRaises(ComponentCycleError) as context:
+            graph({"A": [("B", 1)], "B": [("C", 1)], "C": [("A", 1)], "D": []})
+        self.assertIn("A, B, C", str(context.exception))
+
+    def test_resolve_prices_values_and_missing(self):
+        amounts = np.array([[2.0, 0.0], [1.0, 3.0], [0.0, 0.0], [1.0, 0.0]])
+        values = np.array([1000.0, 100.0, 10.0, 50.0])
+        costs = self.graph.resolve(amounts, {"Iron Ore": 5.0}, values)
+        # crafted components cost their value, priced components their price
+        self.assertEqual(costs.costs.tolist(), [200.0, 25.0, 0.0, 5.0])
+        self.assertEqual(costs.missing, set())
+        self.assertEqual(costs.from_components, set())
+        # a price wins over crafting, an unpriced quest component is missing
+        costs = self.graph.resolve(amounts, {"Sword": 60.0}, values)
+        self.assertEqual(costs.costs.tolist(), [120.0, 10.0, 0.0, 0.0])
+        self.assertEqual(costs.missing, {"Iron Ore"})
+
+    def test_resolve_without_value_falls_back_to_components(self):
+        amounts = np.array([[2.0, 0.0], [1.0, 3.0], [0.0, 0.0], [1.0, 0.0]])
+        values = np.array([1000.0, np.nan, 10.0, 50.0])
+        costs = self.graph.resolve(amounts, {"Iron Ore": 5.0}, values)
+        self.assertEqual(costs.costs.tolist(), [50.0, 25.0, 0.0, 5.0])
+        # costed from its own components, not free
+        self.assertEqual(costs.missing, set())
+        self.assertEqual(costs.from_components, {"Sword"})
+
+    def test_with_components_and_dependents(self):
+        self.assertEqual(self.graph.with_components(np.array([True, False, False, False])).tolist(),
+                         [True, True, True, False])
+        self.assertEqual(self.graph.dependents({"Blade"}).tolist(), [True, True, False, False])
+        self.assertEqual(self.graph.dependents({"Iron Ore"}).tolist(), [True, True, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import itertools
+import unittest
+
+import numpy as np
+
+from crafting_planner import CraftingPlanner, simplex, undominated
+
+
+class SimplexTest(unittest.TestCase):
+    def test_known_optimum(self):
+        # maximize 3x + 5y, x <= 4, 2y <= 12, 3x + 2y <= 18: x = 2, y = 6
+        optimum, solution, _ = simplex(np.array([3.0, 5.0]), np.array([[1.0, 0.0], [0.0, 2.0], [3.0, 2.0]]),
+                                       np.array([4.0, 12.0, 18.0]))
+        self.assertAlmostEqual(optimum, 36.0)
+        np.testing.assert_allclose(solution, [2.0, 6.0])
+
+    def test_unbounded(self):
+        self.assertIsNone(simplex(np.array([1.0, 1.0]), np.array([[1.0, -1.0]]), np.array([1.0])))
+
+
+class UndominatedTest(unittest.TestCase):
+    def test_drops_dominated_and_duplicates(self):
+        values = np.array([10.0, 8.0, 10.0, 12.0])
+        resources = np.array([[1.0, 1.0], [2.0, 1.0], [1.0, 1.0], [0.0, 3.0]])
+        self.assertEqual(undominated(values, resources).tolist(), [0, 3])
+
+
+class CraftingPlannerTest(unittest.TestCase):
+    def test_whole_slots_match_exhaustive_search(self):
+        rng = np.random.default_rng(0)
+        for _ in range(10):
+            values = rng.uniform(1, 100, 5)
+            resources = rng.uniform(0, 10, (5, 2))
+            regen = rng.uniform(5, 30, 2)
+            slots = 4
+            plan = CraftingPlanner(values, resources, regen, slots).solve(relative_gap=0.0)
+            best = 0.0
+            for counts in itertools.product(range(slots + 1), repeat=len(values)):
+                counts = np.array(counts)
+                if counts.sum() <= slots and (counts @ resources <= regen + 1e-9).all():
+                    best = max(best, float(counts @ values))
+            self.assertAlmostEqual(plan.value_per_minute, best, places=6)
+            for _, count in plan.assignments:
+                self.assertEqual(count, int(count))
+
+    def test_relaxation_bounds_whole_slots(self):
+        rng = np.random.default_rng(1)
+        values, resources, regen = rng.uniform(1, 100, 20), rng.uniform(0, 10, (20, 3)), rng.uniform(5, 30, 3)
+        planner = CraftingPlanner(values, resources, regen, 6)
+        self.assertGreaterEqual(planner.solve_relaxation().value_per_minute + 1e-9, planner.solve().value_per_minute)
+
+
+if __name__ == '__main__':
+    unittest.main()
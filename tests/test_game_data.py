@@ -0,0 +1,103 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import json
+import math
+import os
+import tempfile
+import unittest
+
+from game_data import MANIFEST_FILE, SNAPSHOT_VERSION, SheetTable, SnapshotError, encode_sheet, hash_file, \
+    snapshot_outdated
+
+COLUMNS = {
+    "Name": ["Squire Sword", "Arming Sword", "Squire Sword"],
+    "Value": [50.0, "---", 175.0],
+    "Tier": [1.0, 2.0, 3.0],
+    "Upgrade": ["---", 5.0, "Value x1.5"]
+}
+
+
+class SheetTableTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, data: bytes) -> str:
+        path = os.path.join(self.directory.name, "sheet.bin")
+        with open(path, "wb") as sheet_file:
+            sheet_file.write(data)
+        return path
+
+    def test_round_trip(self):
+        table = SheetTable(self.write(encode_sheet(COLUMNS)))
+        self.assertEqual(table.rows, 3)
+        self.assertEqual(table.column_names, list(COLUMNS))
+        self.assertEqual(table.records()[1], {"Name": "Arming Sword", "Value": "---", "Tier": 2.0, "Upgrade": 5.0})
+        for name, values in COLUMNS.items():
+            self.assertEqual(table.column(name), values)
+
+    def test_column_kinds(self):
+        table = SheetTable(self.write(encode_sheet(COLUMNS)))
+        self.assertEqual([table.kind(name) for name in COLUMNS], ["string", "number", "number", "mixed"])
+        values = table.numbers("Value").tolist()
+        self.assertEqual(values[0], 50.0)
+        self.assertTrue(math.isnan(values[1]))
+        # strings are interned once
+        self.assertEqual(len(set(table.string_ids("Name").tolist())), 2)
+        with self.assertRaises(SnapshotError):
+            table.numbers("Name")
+        with self.assertRaises(SnapshotError):
+            table.string_ids("Upgrade")
+
+    def test_rejects_other_versions(self):
+        data = bytearray(encode_sheet(COLUMNS))
+        data[8] += 1
+        with self.assertRaises(SnapshotError):
+            SheetTable(self.write(bytes(data)))
+        with self.assertRaises(SnapshotError):
+            SheetTable(self.write(b"not a snapshot" + bytes(data)))
+
+
+class SnapshotOutdatedTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data_directory = os.path.join(self.directory.name, "data")
+        self.spreadsheet = os.path.join(self.directory.name, "spreadsheet.xlsx")
+        self.write_spreadsheet(b"patch 1")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_spreadsheet(self, data: bytes):
+        with open(self.spreadsheet, "wb") as spreadsheet:
+            spreadsheet.write(data)
+
+    def write_manifest(self, **manifest):
+        os.makedirs(self.data_directory, exist_ok=True)
+        with open(os.path.join(self.data_directory, MANIFEST_FILE), "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+
+    def test_hash_check(self):
+        self.assertTrue(snapshot_outdated(self.spreadsheet, self.data_directory))
+        self.write_manifest(version=SNAPSHOT_VERSION, source_hash=hash_file(self.spreadsheet))
+        self.assertFalse(snapshot_outdated(self.spreadsheet, self.data_directory))
+        self.write_spreadsheet(b"patch 2")
+        self.assertTrue(snapshot_outdated(self.spreadsheet, self.data_directory))
+
+    def test_layout_version(self):
+        self.write_manifest(version=SNAPSHOT_VERSION - 1, source_hash=hash_file(self.spreadsheet))
+        self.assertTrue(snapshot_outdated(self.spreadsheet, self.data_directory))
+
+    def test_missing_spreadsheet(self):
+        os.remove(self.spreadsheet)
+        with self.assertRaises(FileNotFoundError):
+            snapshot_outdated(self.spreadsheet, self.data_directory)
+        # what was generated before is used
+        self.write_manifest(version=SNAPSHOT_VERSION, source_hash="patch 1")
+        self.assertFalse(snapshot_outdated(self.spreadsheet, self.data_directory))
+
+
+if __name__ == '__main__':
+    unittest.main()
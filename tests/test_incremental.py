@@ -0,0 +1,160 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import copy
+import tempfile
+import unittest
+
+import numpy as np
+
+from ascensions import NO_ASCENSION
+from blueprint_catalogue import COMPONENT_COLUMNS, EMPTY_CELL, WORKER_COLUMNS, GameDataset
+from class_definitions import Ascensions, BuildingLevels, ShopTitansPlayerConfig, WorkerLevels, \
+    WorkerTranslationDict
+from game_data import write_snapshot
+from incremental import IncrementalCalculator
+from scoring_engine import RESOURCES
+from upgrade_effects import UPGRADE_KEYS
+
+# name, type, tier, value, crafting time, jobs, resources, components (name, amount), upgrades
+# like in the spreadsheet, every resource column holds a number somewhere
+BLUEPRINTS = (
+    ("Squire Sword", "Sword", 1, 50, 60, ("Blacksmith",), {"iron": 5}, (),
+     ("x1.25 Value Increase", "-20% Craft Time Reduction", "-1 Iron Spent", EMPTY_CELL, EMPTY_CELL,
+      "x1.5 Value Increase", EMPTY_CELL, EMPTY_CELL)),
+    ("Arming Sword", "Sword", 3, 400, 600, ("Blacksmith", "Jeweler"), {"iron": 10, "jewels": 1},
+     (("Squire Sword", 1), ("Iron Ore", 2)),
+     ("x1.5 Value Increase", "-1 Iron Ore Spent", EMPTY_CELL, EMPTY_CELL, EMPTY_CELL,
+      "-25% Craft Time Reduction", EMPTY_CELL, EMPTY_CELL)),
+    ("Longsword", "Sword", 5, 3000, 3600, ("Blacksmith",), {"iron": 20, "steel": 4}, (("Arming Sword", 2),),
+     (EMPTY_CELL,) * len(UPGRADE_KEYS)),
+    ("Hunting Bow", "Bow", 2, 150, 300, ("Tailor",), {"wood": 6, "leather": 4, "herbs": 2, "fabric": 1},
+     (("Feather", 3),),
+     ("-20% Craft Time Reduction", EMPTY_CELL, EMPTY_CELL, EMPTY_CELL, EMPTY_CELL,
+      "x1.25 Value Increase", EMPTY_CELL, EMPTY_CELL)),
+    ("Oak Staff", "Staff", 4, 1200, 1800, ("Tailor", "Jeweler"), {"wood": 12, "ironwood": 3, "oils": 1, "ether": 2}, (),
+     ("-2 Wood Spent", "x1.25 Value Increase", EMPTY_CELL, EMPTY_CELL, EMPTY_CELL,
+      EMPTY_CELL, EMPTY_CELL, EMPTY_CELL))
+)
+# job -> worker name, the same as the spreadsheet
+WORKERS = dict(zip(WorkerTranslationDict.__annotations__, WorkerLevels.__annotations__))
+
+
+def sheets() -> dict:
+    """
+    :return: Blueprints, Workers and Worker Levels sheets with the BLUEPRINTS
+    """
+    blueprints = {
+        "Name": [row[0] for row in BLUEPRINTS],
+        "Type": [row[1] for row in BLUEPRINTS],
+        "Tier": [float(row[2]) for row in BLUEPRINTS],
+        "Value": [float(row[3]) for row in BLUEPRINTS],
+        "Crafting Time (seconds)": [float(row[4]) for row in BLUEPRINTS]
+    }
+    for position, column in enumerate(WORKER_COLUMNS):
+        blueprints[column] = [row[5][position] if position < len(row[5]) else EMPTY_CELL for row in BLUEPRINTS]
+    for resource in RESOURCES:
+        blueprints[resource] = [float(row[6][resource]) if resource in row[6] else EMPTY_CELL for row in BLUEPRINTS]
+    for position, (name_column, quality_column, amount_column) in enumerate(COMPONENT_COLUMNS):
+        components = [row[7][position] if position < len(row[7]) else (EMPTY_CELL, EMPTY_CELL) for row in BLUEPRINTS]
+        blueprints[name_column] = [name for name, _ in components]
+        blueprints[quality_column] = [EMPTY_CELL] * len(BLUEPRINTS)
+        blueprints[amount_column] = [EMPTY_CELL if amount == EMPTY_CELL else float(amount) for _, amount in components]
+    for slot, key in enumerate(UPGRADE_KEYS):
+        blueprints[key] = [row[8][slot] for row in BLUEPRINTS]
+    blueprints["Discount Energy"] = [value / 100 + 5 for value in blueprints["Value"]]
+    blueprints["Surcharge Energy"] = [value / 50 + 10 for value in blueprints["Value"]]
+    return {
+        "Blueprints": blueprints,
+        "Workers": {"Worker": list(WORKERS), "Name": list(WORKERS.values())},
+        "Worker Levels": {
+            "Worker Level": [1.0, 2.0, 3.0, 4.0],
+            "Crafting Speed Bonus": [EMPTY_CELL, 0.05, 0.1, 0.2]
+        }
+    }
+
+
+def player(worker_level: int, ascension: int) -> dict:
+    return {
+        "workers": {worker: worker_level for worker in WORKERS.values()},
+        "buildings": {building: 1 for building in BuildingLevels.__annotations__},
+        "guild_boosts": {"craft_speed": 0.9, "resource_generation": 1.0, "quest_rest_speed": 1.0, "xp_earned": 1.0},
+        "ascensions": {ascension_type: ascension for ascension_type in Ascensions.__annotations__},
+        "quest_component_prices": {"Iron Ore": 40, "Feather": 25},
+        "non_quest_component_prices": dict(),
+        "max_energy": 500
+    }
+
+
+class IncrementalCalculatorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        write_snapshot(sheets(), "test", "test", cls.directory.name)
+        cls.dataset = GameDataset.load(cls.directory.name)
+        cls.players = [player(4, 0), player(4, 1), player(2, 1), player(3, 3)]
+        # a player with different levels per worker
+        cls.players[3]["workers"]["Julia"] = 2
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def assert_full_recompute(self, scorer: IncrementalCalculator, raw_config: dict):
+        player_config = ShopTitansPlayerConfig(**raw_config)
+        metrics = scorer.calculate(player_config)
+        expected = IncrementalCalculator(self.dataset).calculate(player_config)
+        self.assertEqual(set(metrics), set(expected))
+        for name, column in expected.items():
+            np.testing.assert_array_equal(metrics[name], column, err_msg=name)
+
+    def test_players_in_sequence(self):
+        scorer = IncrementalCalculator(self.dataset)
+        for raw_config in self.players:
+            self.assert_full_recompute(scorer, raw_config)
+
+    def test_single_changes(self):
+        scorer = IncrementalCalculator(self.dataset)
+        raw_config = copy.deepcopy(self.players[0])
+        self.assert_full_recompute(scorer, raw_config)
+        raw_config["workers"]["Julia"] -= 1
+        self.assert_full_recompute(scorer, raw_config)
+        self.assertLess(scorer.recomputed, len(self.dataset.catalogue))
+        ascension = next(iter(raw_config["ascensions"]))
+        raw_config["ascensions"][ascension] += 1
+        self.assert_full_recompute(scorer, raw_config)
+        component = next(iter(raw_config["quest_component_prices"]))
+        raw_config["quest_component_prices"][component] *= 2
+        self.assert_full_recompute(scorer, raw_config)
+        # buildings do not change any per blueprint metric
+        building = next(iter(raw_config["buildings"]))
+        raw_config["buildings"][building] = 1
+        self.assert_full_recompute(scorer, raw_config)
+        self.assertEqual(scorer.recomputed, 0)
+
+    def test_game_constants(self):
+        scorer = IncrementalCalculator(self.dataset)
+        raw_config = copy.deepcopy(self.players[0])
+        self.assert_full_recompute(scorer, raw_config)
+        surcharge_profits = scorer.metrics["surcharge_profit_per_minute_per_slot"]
+        raw_config["game_constants"] = {"surcharge_multiplier": 3}
+        self.assert_full_recompute(scorer, raw_config)
+        self.assertEqual(scorer.recomputed, len(self.dataset.catalogue))
+        raised = scorer.metrics["surcharge_profit_per_minute_per_slot"]
+        finite = np.isfinite(surcharge_profits)
+        self.assertTrue(finite.any())
+        self.assertTrue((raised[finite] > surcharge_profits[finite]).all())
+
+        raw_config["ascensions"] = {ascension: 1 for ascension in raw_config["ascensions"]}
+        self.assert_full_recompute(scorer, raw_config)
+        values = scorer.values
+        raw_config["game_constants"]["ascension_bonuses"] = {"1": {"value": 1, "crafting_time": 0.5}}
+        self.assert_full_recompute(scorer, raw_config)
+        self.assertEqual(scorer.recomputed, len(self.dataset.catalogue))
+        ascended = self.dataset.catalogue.ascension_index().types != NO_ASCENSION
+        self.assertTrue(ascended.any())
+        self.assertTrue((scorer.values[ascended] > values[ascended]).all())
+        np.testing.assert_array_equal(scorer.values[~ascended], values[~ascended])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+
+from additional_data import QualityDict
+from quality_simulation import quality_chances, quality_table, simulate_quality
+
+
+class QualitySimulationTest(unittest.TestCase):
+    def test_chances_add_up(self):
+        chances = quality_chances(np.array([1.0, 2.0, 1000.0]))
+        np.testing.assert_allclose(chances.sum(axis=1), 1)
+        self.assertTrue((chances >= 0).all())
+        # far above certain, nothing comes out Normal
+        self.assertEqual(chances[2, 0], 0)
+
+    def test_quality_table(self):
+        self.assertIs(quality_table(None), QualityDict)
+        qualities = {"Superior": {"chance": 0.5, "value": 2}}
+        self.assertIs(quality_table({"qualities": qualities}), qualities)
+
+    def test_certain_quality(self):
+        values = np.array([100.0, 250.0])
+        outcome = simulate_quality(
+            values, np.array([60.0, 120.0]), np.ones(2), np.zeros(2), samples=1000,
+            qualities={"Superior": {"chance": 1, "value": 2}}
+        )
+        np.testing.assert_allclose(outcome.expected_values, values * 2)
+        np.testing.assert_allclose(outcome.variances, 0, atol=1e-6)
+        np.testing.assert_allclose(outcome.expected_values_per_minute, [200.0, 250.0])
+
+    def test_same_seed_same_outcome(self):
+        arguments = (np.array([100.0, 10.0]), np.array([60.0, 30.0]), np.array([1.0, 3.0]), np.array([0.0, 0.5]))
+        first = simulate_quality(*arguments, samples=5000, seed=3)
+        second = simulate_quality(*arguments, samples=5000, seed=3)
+        np.testing.assert_array_equal(first.expected_values, second.expected_values)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+
+from ranking import query_from_dict, top_k
+
+
+class TopKTest(unittest.TestCase):
+    def test_ties_keep_position_order(self):
+        keys = np.array([3.0, 1.0, 2.0, 1.0, 1.0])
+        self.assertEqual(top_k(keys, 2).tolist(), [1, 3])
+        self.assertEqual(top_k(keys, None).tolist(), [1, 3, 4, 2, 0])
+
+    def test_nan_sorts_last(self):
+        keys = np.array([np.nan, 2.0, np.nan, 1.0])
+        self.assertEqual(top_k(keys, None).tolist(), [3, 1, 0, 2])
+        self.assertEqual(top_k(keys, 3).tolist(), [3, 1, 0])
+
+    def test_limits(self):
+        keys = np.array([2.0, 1.0])
+        self.assertEqual(top_k(keys, 0).tolist(), [])
+        self.assertEqual(top_k(keys, 5).tolist(), [1, 0])
+
+    def test_matches_full_sort(self):
+        keys = np.random.default_rng(0).integers(0, 50, 1000).astype(float)
+        for k in (1, 10, 999):
+            self.assertEqual(top_k(keys, k).tolist(), np.argsort(keys, kind="stable")[:k].tolist())
+
+
+class QueryFromDictTest(unittest.TestCase):
+    def test_query(self):
+        query = query_from_dict({"sort": "profit_per_minute_per_slot", "top": 5, "tier": ">=8",
+                                 "workers": ["Wizard"], "max_per_minute": {"iron": 5}})
+        self.assertEqual(query.top, 5)
+        self.assertEqual(query.tier, (">=", 8.0))
+        self.assertEqual(query.workers, ("Wizard",))
+        self.assertEqual(query.max_per_minute, (("iron", 5.0),))
+
+    def test_single_names(self):
+        query = query_from_dict({"workers": "Wizard", "uses": "iron", "skyline": "value_per_minute_per_slot"})
+        self.assertEqual(query.workers, ("Wizard",))
+        self.assertEqual(query.uses, ("iron",))
+        self.assertEqual(query.skyline, ("value_per_minute_per_slot",))
+        with self.assertRaises(ValueError) as context:
+            query_from_dict({"without": {"iron": True}})
+        self.assertIn("without has to be a list", str(context.exception))
+
+    def test_unknown_key(self):
+        with self.assertRaises(ValueError):
+            query_from_dict({"sorting": "value"})
+
+
+if __name__ == '__main__':
+    unittest.main()
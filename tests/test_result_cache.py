@@ -0,0 +1,95 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from result_cache import ResultCache, cache_key, shared_cache
+
+MANIFEST = {"version": 5, "shared_hash": "shared", "blueprints_hash": "blueprints"}
+
+
+def load_config() -> dict:
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")) as config:
+        return json.load(config)
+
+
+class CacheKeyTest(unittest.TestCase):
+    def setUp(self):
+        self.config = load_config()
+
+    def test_stable(self):
+        self.assertEqual(cache_key(self.config, MANIFEST, output_format="text"),
+                         cache_key(json.loads(json.dumps(self.config)), MANIFEST, output_format="text"))
+
+    def test_ignores_key_order_and_name(self):
+        reordered = dict(reversed(list(self.config.items())), name="someone")
+        self.assertEqual(cache_key(self.config, MANIFEST, output_format="text"),
+                         cache_key(reordered, MANIFEST, output_format="text"))
+
+    def test_changes_with_inputs(self):
+        key = cache_key(self.config, MANIFEST, output_format="text")
+        changed = json.loads(json.dumps(self.config))
+        changed["guild_boosts"]["craft_speed"] = 0.5
+        self.assertNotEqual(key, cache_key(changed, MANIFEST, output_format="text"))
+        self.assertNotEqual(key, cache_key(self.config, MANIFEST, output_format="csv"))
+        self.assertNotEqual(key, cache_key(self.config, dict(MANIFEST, shared_hash="patched"), output_format="text"))
+        self.assertNotEqual(key, cache_key(self.config, MANIFEST, "some blueprints", output_format="text"))
+        # the spreadsheet hash alone does not invalidate
+        self.assertEqual(key, cache_key(self.config, dict(MANIFEST, source_hash="other"), output_format="text"))
+
+
+class ResultCacheTest(unittest.TestCase):
+    def test_get_put_and_evict(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory, max_bytes=250)
+            self.assertIsNone(cache.get("a"))
+            cache.put("a", b"a" * 100)
+            cache.put("b", b"b" * 100)
+            self.assertEqual(cache.get("a"), b"a" * 100)
+            os.utime(os.path.join(directory, "b.result"), (0, 0))
+            cache.put("c", b"c" * 100)
+            cache.evict()
+            self.assertIsNone(cache.get("b"))
+            self.assertEqual(cache.get("c"), b"c" * 100)
+
+    def test_put_scans_only_when_needed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory, max_bytes=1000)
+            scans = list()
+            evict = cache._evict
+            cache._evict = lambda: scans.append(1) or evict()
+            for number in range(9):
+                cache.put(str(number), b"x" * 100)
+            # the first put scans, the rest is tracked
+            self.assertEqual(len(scans), 1)
+            cache.put("a", b"x" * 100)
+            cache.put("b", b"x" * 100)
+            self.assertEqual(len(scans), 2)
+            self.assertLessEqual(sum(entry.stat().st_size for entry in os.scandir(directory)), 1000)
+
+    def test_threads_share_one_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory, max_bytes=1 << 20)
+            threads = [
+                threading.Thread(target=lambda thread=thread: [
+                    cache.put(f"{thread}-{number % 5}", b"x" * (number + 1)) for number in range(50)
+                ])
+                for thread in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(cache._size, sum(entry.stat().st_size for entry in os.scandir(directory)))
+
+    def test_shared_cache_per_directory(self):
+        with tempfile.TemporaryDirectory() as directory, tempfile.TemporaryDirectory() as other:
+            self.assertIs(shared_cache(directory), shared_cache(directory))
+            self.assertIsNot(shared_cache(directory), shared_cache(other))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import csv
+import json
+import math
+import os
+import tempfile
+import unittest
+
+from class_definitions import FinalBPData, TransformedBP, TransformedBPData
+from result_writers import COLUMNS, open_writer, pyarrow
+
+
+def record(name: str, value: int, metric: float) -> FinalBPData:
+    metrics = {column: metric for column in TransformedBPData.__slots__[1:]}
+    # a resource the blueprint does not use
+    metrics["iron_per_minute_per_slot"] = math.nan
+    return FinalBPData(
+        transformed_data=TransformedBP(name=name, tier=3, value=value, crafting_time=90.0),
+        calculated_values=TransformedBPData(name=name, **metrics)
+    )
+
+
+RECORDS = [record("Squire Sword", 50, 1.5), record("Arming Sword", 175, 2.25)]
+
+
+class ResultWritersTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, output_format: str, records: list) -> str:
+        path = os.path.join(self.directory.name, f"result.{output_format}")
+        with open_writer(output_format, path) as writer:
+            writer.write_line("summary line")
+            writer.write_rows(records)
+        return path
+
+    def test_text(self):
+        with open(self.write("text", RECORDS)) as result:
+            lines = result.read().splitlines()
+        self.assertEqual(lines[0], "summary line")
+        self.assertEqual(len(lines), 4)
+        self.assertIn("Arming Sword", lines[3])
+        self.assertIn("nan", lines[2])
+
+    def test_jsonl(self):
+        with open(self.write("jsonl", RECORDS)) as result:
+            rows = [json.loads(line) for line in result]
+        self.assertEqual([list(row) for row in rows], [list(COLUMNS)] * 2)
+        self.assertEqual(rows[1]["value"], 175)
+        self.assertIsNone(rows[0]["iron_per_minute_per_slot"])
+        self.assertEqual(rows[0]["value_per_minute_per_slot"], 1.5)
+
+    def test_csv(self):
+        with open(self.write("csv", RECORDS), newline="") as result:
+            rows = list(csv.reader(result))
+        self.assertEqual(tuple(rows[0]), COLUMNS)
+        self.assertEqual(rows[1][:3], ["Squire Sword", "3", "50"])
+        self.assertEqual(rows[1][COLUMNS.index("iron_per_minute_per_slot")], "")
+
+    def test_empty(self):
+        with open(self.write("jsonl", list())) as result:
+            self.assertEqual(result.read(), "")
+        with open(self.write("csv", list()), newline="") as result:
+            self.assertEqual([tuple(row) for row in csv.reader(result)], [COLUMNS])
+
+    @unittest.skipIf(pyarrow is None, "parquet output needs pyarrow")
+    def test_parquet(self):
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(self.write("parquet", RECORDS))
+        self.assertEqual(tuple(table.column_names), COLUMNS)
+        self.assertEqual(table.column("value").to_pylist(), [50, 175])
+        self.assertEqual(table.column("iron_per_minute_per_slot").null_count, 2)
+
+    @unittest.skipIf(pyarrow is None, "parquet output needs pyarrow")
+    def test_empty_parquet(self):
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(self.write("parquet", list()))
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(tuple(table.column_names), COLUMNS)
+        self.assertEqual(str(table.schema.field("value").type), "int64")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+
+from main import ShopTitansCalculator
+from scoring_engine import METRIC_NAMES, NO_RESOURCE_FOUND, RESOURCES, BlueprintMatrix, compute_metrics, \
+    round_values
+
+
+def scalar_metrics(value: float, crafting_time: float, resources: dict) -> dict:
+    """
+    The metrics of one blueprint the way the calculator computed them before they were vectorized.
+    """
+    craft_time = crafting_time / 60
+    metrics = {
+        "value_per_minute_per_slot": value / craft_time,
+        "profit_per_minute_per_slot": value / craft_time
+    }
+    amounts = dict()
+    for resource in RESOURCES:
+        amount = resources.get(resource, NO_RESOURCE_FOUND)
+        # if upgrades make a resource go to 0, choose -1
+        amounts[resource] = max(NO_RESOURCE_FOUND if amount == 0 else amount, NO_RESOURCE_FOUND)
+    for resource in RESOURCES:
+        metrics[f"{resource}_per_minute_per_slot"] = max(amounts[resource] / craft_time, 0)
+    for resource in RESOURCES:
+        metrics[f"value_per_{resource}"] = max(value / amounts[resource], 0)
+    return metrics
+
+
+class ComputeMetricsTest(unittest.TestCase):
+    def test_matches_scalar_path(self):
+        rng = np.random.default_rng(3)
+        size = 200
+        values = np.trunc(rng.uniform(10, 2000000, size))
+        crafting_times = rng.uniform(30, 200000, size)
+        resources = np.trunc(rng.uniform(-5, 400, (size, len(RESOURCES))))
+        # unused resources, and resources upgrades took down to exactly 0
+        resources[rng.random(resources.shape) < 0.6] = np.nan
+        resources[rng.random(resources.shape) < 0.05] = 0
+        metrics = compute_metrics(BlueprintMatrix([str(row) for row in range(size)], values, crafting_times, resources))
+        self.assertEqual(tuple(metrics), METRIC_NAMES)
+
+        for row in range(size):
+            used = {
+                resource: resources[row, column]
+                for column, resource in enumerate(RESOURCES) if not np.isnan(resources[row, column])
+            }
+            expected = scalar_metrics(values[row], crafting_times[row], used)
+            for name in METRIC_NAMES:
+                self.assertEqual(metrics[name][row], expected[name], f"{name} of row {row}")
+
+    def test_profits(self):
+        matrix = BlueprintMatrix(["a", "b"], np.array([100.0, 300.0]), np.array([60.0, 120.0]),
+                                 np.full((2, len(RESOURCES)), np.nan))
+        metrics = compute_metrics(matrix, profits=np.array([40.0, -60.0]))
+        np.testing.assert_array_equal(metrics["value_per_minute_per_slot"], [100.0, 150.0])
+        np.testing.assert_array_equal(metrics["profit_per_minute_per_slot"], [40.0, -30.0])
+
+
+class RoundValuesTest(unittest.TestCase):
+    def test_matches_scalar_round(self):
+        values = np.concatenate([
+            np.arange(0, 2000, 0.5),
+            np.random.default_rng(4).uniform(0, 1e8, 2000),
+            # exactly between two rounding steps
+            np.array([12500.0, 125000.0, 1250000.0, 12500000.0])
+        ])
+        expected = [ShopTitansCalculator._round(value) for value in values.tolist()]
+        self.assertEqual(round_values(values).tolist(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+
+from scoring_engine import RESOURCES
+from simulator import CRAFT_DONE, RESOURCES_READY, CraftingSimulator, EventQueue
+
+
+def costs(*rows: dict) -> np.ndarray:
+    """
+    :param rows: resource -> amount of every candidate, unlisted resources cost nothing
+    """
+    return np.array([[float(row.get(resource, 0)) for resource in RESOURCES] for row in rows])
+
+
+def regen(**rates: float) -> np.ndarray:
+    return np.array([float(rates.get(resource, 0)) for resource in RESOURCES])
+
+
+class EventQueueTest(unittest.TestCase):
+    def test_order(self):
+        queue = EventQueue()
+        queue.push(5.0, CRAFT_DONE, slot=0, row=1)
+        queue.push(2.0, RESOURCES_READY)
+        queue.push(5.0, CRAFT_DONE, slot=1, row=2)
+        events = list()
+        while queue:
+            event = queue.pop()
+            events.append((event.time, event.kind, event.slot))
+            queue.release(event)
+        # same time, queued first comes first
+        self.assertEqual(events, [(2.0, RESOURCES_READY, -1), (5.0, CRAFT_DONE, 0), (5.0, CRAFT_DONE, 1)])
+        # handled events are reused
+        queue.push(1.0, RESOURCES_READY)
+        self.assertEqual(len(queue._pool), 2)
+
+
+class CraftingSimulatorTest(unittest.TestCase):
+    def test_unlimited_resources(self):
+        simulator = CraftingSimulator(
+            values=np.array([60.0]), component_costs=np.array([20.0]), crafting_times=np.array([600.0]),
+            costs=costs(dict()), regen=regen(), storage=regen(), slots=2
+        )
+        result = simulator.run(hours=1)
+        # a 10 minute craft on 2 slots, 6 times each
+        self.assertEqual(result.crafts, {0: 12})
+        self.assertEqual(result.gold, 720.0)
+        self.assertEqual(result.profit, 480.0)
+        self.assertEqual(result.gold_per_hour, result.naive_gold_per_hour)
+        self.assertAlmostEqual(result.utilization, 1.0)
+
+    def test_waits_for_resources(self):
+        simulator = CraftingSimulator(
+            values=np.array([100.0]), component_costs=np.zeros(1), crafting_times=np.array([60.0]),
+            costs=costs({"iron": 10}), regen=regen(iron=1), storage=regen(iron=100), slots=1
+        )
+        result = simulator.run(hours=1)
+        # iron for a craft every 10 minutes, the one started at minute 60 is not done in time
+        self.assertEqual(result.crafts, {0: 5})
+        self.assertAlmostEqual(result.utilization, 5 / 60)
+        self.assertEqual(result.naive_gold_per_hour, 6000.0)
+        # a full storage at the start pays for ten crafts right away
+        stocked = simulator.run(hours=1, initial_stock=regen(iron=100))
+        self.assertGreater(stocked.crafts[0], result.crafts[0])
+
+    def test_falls_back_to_affordable_candidates(self):
+        simulator = CraftingSimulator(
+            values=np.array([1000.0, 500.0, 50.0]), component_costs=np.zeros(3),
+            crafting_times=np.array([60.0, 60.0, 60.0]),
+            # ether never regenerates, the second needs more jewels than fit in storage
+            costs=costs({"ether": 1}, {"jewels": 200}, {"iron": 1}),
+            regen=regen(iron=10, jewels=10), storage=regen(iron=100, jewels=100), slots=1
+        )
+        self.assertEqual(simulator.candidates, [2])
+        result = simulator.run(hours=1)
+        self.assertEqual(list(result.crafts), [2])
+        self.assertLess(result.gold_per_hour, result.naive_gold_per_hour)
+
+    def test_nothing_craftable(self):
+        simulator = CraftingSimulator(
+            values=np.array([1000.0]), component_costs=np.zeros(1), crafting_times=np.array([60.0]),
+            costs=costs({"ether": 1}), regen=regen(), storage=regen(ether=10), slots=3
+        )
+        result = simulator.run(hours=2)
+        self.assertEqual(result.crafts, dict())
+        self.assertEqual(result.gold, 0.0)
+        self.assertEqual(result.utilization, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+
+from skyline import objective_matrix, parse_objective, skyline
+
+
+def brute_force_skyline(points: np.ndarray) -> np.ndarray:
+    return np.array([
+        row for row in range(len(points))
+        if not ((points >= points[row]).all(axis=1) & (points > points[row]).any(axis=1)).any()
+    ], dtype=np.int64)
+
+
+class SkylineTest(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        for dimensions in (1, 2, 3, 5):
+            for trial in range(20):
+                size = int(rng.integers(1, 600))
+                # few distinct values, so there are many ties
+                points = rng.integers(0, 6, (size, dimensions)).astype(float)
+                if trial % 3 == 0:
+                    points[rng.random(size) < 0.1, 0] = -np.inf
+                np.testing.assert_array_equal(skyline(points), brute_force_skyline(points))
+
+    def test_large_sfs_matches_brute_force(self):
+        points = np.random.default_rng(1).random((3000, 4))
+        np.testing.assert_array_equal(skyline(points), brute_force_skyline(points))
+
+    def test_empty(self):
+        self.assertEqual(len(skyline(np.zeros((0, 3)))), 0)
+
+    def test_parse_objective(self):
+        self.assertEqual(parse_objective("value_per_minute_per_slot"), ("value_per_minute_per_slot", True))
+        self.assertEqual(parse_objective("iron_per_minute_per_slot"), ("iron_per_minute_per_slot", False))
+        self.assertEqual(parse_objective("iron_per_minute_per_slot:max"), ("iron_per_minute_per_slot", True))
+        with self.assertRaises(ValueError):
+            parse_objective("bogus")
+        with self.assertRaises(ValueError):
+            parse_objective("value_per_minute_per_slot:up")
+
+    def test_objective_matrix_direction_and_nan(self):
+        metrics = {
+            "value_per_minute_per_slot": np.array([1.0, np.nan]),
+            "iron_per_minute_per_slot": np.array([2.0, 3.0])
+        }
+        matrix = objective_matrix(metrics, ["value_per_minute_per_slot", "iron_per_minute_per_slot"])
+        np.testing.assert_array_equal(matrix, [[1.0, -2.0], [-np.inf, -3.0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import unittest
+
+from component_costs import ComponentGraph
+from snapshot_diff import BlueprintChanges, PatchReport, RankMove, blueprint_changes, format_report, ranking_moves
+
+
+def blueprints(rows: list) -> dict:
+    """
+    :param rows: (name, value, component name) of every blueprint, "---" for no component
+    :return: the columns of a Blueprints sheet
+    """
+    return {
+        "Name": [name for name, _, _ in rows],
+        "Value": [value for _, value, _ in rows],
+        "Component1": [component for _, _, component in rows]
+    }
+
+
+class Dataset:
+    """
+    The parts of a GameDataset blueprint_changes reads.
+    """
+
+    def __init__(self, columns: dict):
+        self.catalogue = self
+        self.names = columns["Name"]
+        self.graph = ComponentGraph(self.names, [
+            [("" if component == "---" else component, "Common", 1.0)] for component in columns["Component1"]
+        ])
+
+    def component_graph(self) -> ComponentGraph:
+        return self.graph
+
+
+class BlueprintChangesTest(unittest.TestCase):
+    def test_changes(self):
+        old = blueprints([
+            ("Blade", 100.0, "---"),
+            ("Sword", 300.0, "Blade"),
+            ("Greatsword", 900.0, "Sword"),
+            ("Shield", 200.0, "---"),
+            ("Bow", 150.0, "---")
+        ])
+        new = blueprints([
+            ("Blade", 120.0, "---"),
+            ("Sword", 300.0, "Blade"),
+            ("Greatsword", 900.0, "Sword"),
+            ("Shield", 200.0, "---"),
+            ("Staff", 400.0, "---")
+        ])
+        changes = blueprint_changes(old, new, Dataset(new))
+        self.assertEqual(changes.added, ["Staff"])
+        self.assertEqual(changes.removed, ["Bow"])
+        self.assertEqual(changes.changed, {"Blade": ["Value"]})
+        # through Sword too
+        self.assertEqual(changes.dependents, ["Sword", "Greatsword"])
+
+    def test_new_column(self):
+        old = blueprints([("Blade", 100.0, "---")])
+        new = dict(blueprints([("Blade", 100.0, "---")]), Tier=[1.0])
+        self.assertEqual(blueprint_changes(old, new, Dataset(new)).changed, {"Blade": ["Tier"]})
+
+    def test_no_changes(self):
+        columns = blueprints([("Blade", float("nan"), "---"), ("Sword", 300.0, "Blade")])
+        self.assertEqual(blueprint_changes(columns, columns, Dataset(columns)),
+                         BlueprintChanges(added=[], removed=[], changed={}, dependents=[]))
+
+
+class RankingMovesTest(unittest.TestCase):
+    def test_moves(self):
+        old = {"Blade": 1, "Sword": 2, "Shield": 3, "Bow": 4, "Staff": 30}
+        new = {"Sword": 1, "Blade": 2, "Shield": 3, "Staff": 25, "Axe": 4}
+        moves = ranking_moves(old, new, top=4)
+        self.assertEqual(moves, [
+            RankMove("Sword", 2, 1),
+            RankMove("Blade", 1, 2),
+            RankMove("Axe", None, 4),
+            RankMove("Bow", 4, None)
+        ])
+
+
+class FormatReportTest(unittest.TestCase):
+    def test_report(self):
+        report = PatchReport(
+            manifest={"rewritten_sheets": ["Blueprints", "Blueprint Fingerprints"]},
+            changes=BlueprintChanges(added=["Staff"], removed=["Bow"], changed={"Blade": ["Tier", "Value"]},
+                                     dependents=["Sword"]),
+            sort="value_per_minute_per_slot",
+            moves=[RankMove("Sword", 2, 1), RankMove("Bow", 4, None), RankMove("Staff", None, 3)]
+        )
+        self.assertEqual(format_report(report), [
+            "Rewritten sheets: Blueprints, Blueprint Fingerprints",
+            "1 blueprints added, 1 removed, 1 changed, 1 more use one of them as a component",
+            "+ Staff",
+            "- Bow",
+            "~ Blade: Tier, Value",
+            "> Sword",
+            "Ranking moves by value_per_minute_per_slot:",
+            "Sword: 2 -> 1",
+            "Bow: 4 -> dropped",
+            "Staff: new -> 3"
+        ])
+
+    def test_first_snapshot(self):
+        report = PatchReport(manifest={"rewritten_sheets": []}, changes=None, sort="value_per_minute_per_slot",
+                             moves=[])
+        self.assertEqual(format_report(report), [
+            "Rewritten sheets: none",
+            "No earlier snapshot of this version to compare with"
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+
+from scoring_engine import RESOURCES
+from upgrade_effects import COMPONENT_NAME_COLUMNS, UPGRADE_KEYS, UpgradeEffect, UpgradeEffectTable, parse_upgrade
+
+
+class ParseUpgradeTest(unittest.TestCase):
+    def test_value(self):
+        self.assertEqual(parse_upgrade("x1.25 Value Increase"), UpgradeEffect(value_multiplier=1.25))
+
+    def test_time(self):
+        self.assertAlmostEqual(parse_upgrade("-25% Craft Time Reduction").time_multiplier, 0.75)
+
+    def test_resource(self):
+        self.assertEqual(parse_upgrade("-3 Iron Spent"), UpgradeEffect(resource="iron", resource_delta=-3.0))
+
+    def test_component(self):
+        self.assertEqual(parse_upgrade("-1 Silver Dust Spent"),
+                         UpgradeEffect(component="Silver Dust", component_delta=-1.0))
+
+    def test_quality_and_multicraft(self):
+        self.assertEqual(parse_upgrade("Quality Chance x2"), UpgradeEffect(quality_multiplier=2.0))
+        self.assertAlmostEqual(parse_upgrade("+10% Multicraft Chance").multicraft_chance, 0.1)
+
+    def test_no_effect(self):
+        for text in (None, 1.0, "", "---", "Unlock Recipe"):
+            self.assertEqual(parse_upgrade(text), UpgradeEffect(), text)
+
+
+class UpgradeEffectTableTest(unittest.TestCase):
+    def setUp(self):
+        slots = len(UPGRADE_KEYS)
+        value_multipliers = np.ones((1, slots))
+        value_multipliers[0, :2] = 1.5
+        self.table = UpgradeEffectTable(
+            value_multipliers=value_multipliers,
+            time_multipliers=np.full((1, slots), 0.5),
+            resource_deltas=np.zeros((1, slots, len(RESOURCES))),
+            component_deltas=np.zeros((1, slots, len(COMPONENT_NAME_COLUMNS))),
+            quality_multipliers=np.ones((1, slots)),
+            multicraft_chances=np.zeros((1, slots))
+        )
+
+    def test_values_truncated_after_every_slot(self):
+        values, _, _ = self.table.apply(np.array([101.0]), np.array([64.0]), np.zeros((1, len(RESOURCES))))
+        # 101 -> 151.5 -> 151 -> 226.5 -> 226, truncating once would give 227
+        np.testing.assert_array_equal(values, [226.0])
+
+    def test_cumulative_matches_apply(self):
+        value_states, time_states, _ = self.table.cumulative(
+            np.array([101.0]), np.array([64.0]), np.zeros((1, len(RESOURCES)))
+        )
+        for upgrades in range(len(UPGRADE_KEYS) + 1):
+            values, crafting_times, _ = self.table.apply(
+                np.array([101.0]), np.array([64.0]), np.zeros((1, len(RESOURCES))), upgrades
+            )
+            np.testing.assert_array_equal(value_states[:, upgrades], values)
+            np.testing.assert_array_equal(time_states[:, upgrades], crafting_times)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,249 @@
+#!/bin/bash python
+# -*- coding: utf-8 -*-
+import re
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from scoring_engine import RESOURCES
+
+EFFECTS_SHEET = "Upgrade Effects"
+
+UPGRADE_KEYS = (
+    "Crafting Upgrade 1",
+    "Crafting Upgrade 2",
+    "Crafting Upgrade 3",
+    "Crafting Upgrade 4",
+    "Crafting Upgrade 5",
+    "Ascension Upgrade 1",
+    "Ascension Upgrade 2",
+    "Ascension Upgrade 3"
+)
+
+RESOURCE_SPENT_REGEX = re.compile(r"-(\d+) (\w+) Spent")
+COMPONENT_SPENT_REGEX = re.compile(r"-(\d+) (.+) Spent")
+QUALITY_CHANCE_REGEX = re.compile(r"Quality Chance x(\d+(?:\.\d+)?)")
+MULTICRAFT_CHANCE_REGEX = re.compile(r"\+(\d+(?:\.\d+)?)% Multicraft Chance")
+# name columns of the two components of a blueprint
+COMPONENT_NAME_COLUMNS = ("Component1", "Component2")
+
+
+class UpgradeEffect(NamedTuple):
+    value_multiplier: float = 1.0
+    time_multiplier: float = 1.0
+    # lowercase resource name and the (negative) change of its cost
+    resource: Optional[str] = None
+    resource_delta: float = 0.0
+    # component name and the (negative) change of its amount
+    component: Optional[str] = None
+    component_delta: float = 0.0
+    # multiplies the chance of every quality above Normal
+    quality_multiplier: float = 1.0
+    # chance of crafting one more item, added up over the upgrades
+    multicraft_chance: float = 0.0
+
+
+def parse_upgrade(text) -> UpgradeEffect:
+    """
+    Parses the free text of a crafting or ascension upgrade, e.g.
+    "x1.25 Value Increase", "-25% Craft Time Reduction", "-3 Iron Spent",
+    "-1 Silver Dust Spent", "Quality Chance x2" or "+10% Multicraft Chance".
+    Upgrades that do not change value, time, resources, component amounts,
+    quality or multicraft chances have no effect.
+    :param text: cell value of an upgrade column
+    :return: UpgradeEffect
+    """
+    if not isinstance(text, str):
+        return UpgradeEffect()
+    if "Value Increase" in text:
+        return UpgradeEffect(value_multiplier=float(text.split()[0][1:]))
+    if "Craft Time Reduction" in text:
+        return UpgradeEffect(time_multiplier=float(1 - (float(text.split()[0][1:-1]) / 100)))
+    match = QUALITY_CHANCE_REGEX.match(text)
+    if match:
+        return UpgradeEffect(quality_multiplier=float(match.group(1)))
+    match = MULTICRAFT_CHANCE_REGEX.match(text)
+    if match:
+        return UpgradeEffect(multicraft_chance=float(match.group(1)) / 100)
+    match = RESOURCE_SPENT_REGEX.match(text)
+    if match:
+        amount, resource = match.groups()
+        if resource.lower() in RESOURCES:
+            return UpgradeEffect(resource=resource.lower(), resource_delta=-float(amount))
+    match = COMPONENT_SPENT_REGEX.match(text)
+    if match:
+        amount, component = match.groups()
+        return UpgradeEffect(component=component, component_delta=-float(amount))
+    return UpgradeEffect()
+
+
+def value_multiplier_column(slot: int) -> str:
+    return f"{UPGRADE_KEYS[slot]} Value Multiplier"
+
+
+def time_multiplier_column(slot: int) -> str:
+    return f"{UPGRADE_KEYS[slot]} Time Multiplier"
+
+
+def quality_multiplier_column(slot: int) -> str:
+    return f"{UPGRADE_KEYS[slot]} Quality Multiplier"
+
+
+def multicraft_chance_column(slot: int) -> str:
+    return f"{UPGRADE_KEYS[slot]} Multicraft Chance"
+
+
+def resource_delta_column(slot: int, resource: str) -> str:
+    return f"{UPGRADE_KEYS[slot]} {resource} Delta"
+
+
+def component_delta_column(slot: int, position: int) -> str:
+    return f"{UPGRADE_KEYS[slot]} {COMPONENT_NAME_COLUMNS[position]} Delta"
+
+
+def build_effect_columns(blueprint_columns: Dict[str, list]) -> Dict[str, list]:
+    """
+    Compiles the upgrade texts of every blueprint into numeric columns,
+    stored in the snapshot next to the Blueprints sheet, row for row.
+    :param blueprint_columns: columns of the Blueprints sheet
+    :return: columns of the Upgrade Effects sheet
+    """
+    rows = len(next(iter(blueprint_columns.values()), list()))
+    columns = dict()
+    for slot, key in enumerate(UPGRADE_KEYS):
+        effects = [parse_upgrade(text) for text in blueprint_columns.get(key, [None] * rows)]
+        columns[value_multiplier_column(slot)] = [effect.value_multiplier for effect in effects]
+        columns[time_multiplier_column(slot)] = [effect.time_multiplier for effect in effects]
+        columns[quality_multiplier_column(slot)] = [effect.quality_multiplier for effect in effects]
+        columns[multicraft_chance_column(slot)] = [effect.multicraft_chance for effect in effects]
+        for resource in RESOURCES:
+            columns[resource_delta_column(slot, resource)] = [
+                effect.resource_delta if effect.resource == resource else 0.0 for effect in effects
+            ]
+        # a component upgrade names the component, it applies to the column holding that name
+        for position, name_column in enumerate(COMPONENT_NAME_COLUMNS):
+            columns[component_delta_column(slot, position)] = [
+                effect.component_delta if effect.component is not None and effect.component == name else 0.0
+                for effect, name in zip(effects, blueprint_columns.get(name_column, [None] * rows))
+            ]
+    return columns
+
+
+class UpgradeEffectTable:
+    """
+    Typed upgrade effects of every blueprint, one column per upgrade slot.
+    """
+
+    def __init__(self, value_multipliers: np.ndarray, time_multipliers: np.ndarray, resource_deltas: np.ndarray,
+                 component_deltas: np.ndarray, quality_multipliers: np.ndarray, multicraft_chances: np.ndarray):
+        # blueprints x UPGRADE_KEYS
+        self.value_multipliers = value_multipliers
+        self.time_multipliers = time_multipliers
+        self.quality_multipliers = quality_multipliers
+        self.multicraft_chances = multicraft_chances
+        # blueprints x UPGRADE_KEYS x RESOURCES
+        self.resource_deltas = resource_deltas
+        # blueprints x UPGRADE_KEYS x COMPONENT_NAME_COLUMNS
+        self.component_deltas = component_deltas
+
+    @classmethod
+    def from_sheet(cls, table) -> "UpgradeEffectTable":
+        slots = range(len(UPGRADE_KEYS))
+        return cls(
+            value_multipliers=np.stack(
+                [np.asarray(table.numbers(value_multiplier_column(slot))) for slot in slots], axis=1
+            ),
+            time_multipliers=np.stack(
+                [np.asarray(table.numbers(time_multiplier_column(slot))) for slot in slots], axis=1
+            ),
+            quality_multipliers=np.stack(
+                [np.asarray(table.numbers(quality_multiplier_column(slot))) for slot in slots], axis=1
+            ),
+            multicraft_chances=np.stack(
+                [np.asarray(table.numbers(multicraft_chance_column(slot))) for slot in slots], axis=1
+            ),
+            resource_deltas=np.stack([
+                np.stack(
+                    [np.asarray(table.numbers(resource_delta_column(slot, resource))) for resource in RESOURCES], axis=1
+                )
+                for slot in slots
+            ], axis=1),
+            component_deltas=np.stack([
+                np.stack([
+                    np.asarray(table.numbers(component_delta_column(slot, position)))
+                    for position in range(len(COMPONENT_NAME_COLUMNS))
+                ], axis=1)
+                for slot in slots
+            ], axis=1)
+        )
+
+    def apply(self, values: np.ndarray, crafting_times: np.ndarray, resources: np.ndarray,
+              upgrades: int = len(UPGRADE_KEYS)) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Applies the first upgrades slots to every blueprint. Slots are
+        applied one after another so the floats match applying them
+        upgrade by upgrade. Values are whole gold amounts, so they are
+        truncated after every slot, like the int value of the original
+        blueprint records was. Missing (NaN) resources stay missing.
+        :param values: base values
+        :param crafting_times: base crafting times in seconds
+        :param resources: base blueprints x RESOURCES costs
+        :param upgrades: number of unlocked upgrade slots
+        :return: upgraded values, crafting times and resources
+        """
+        values = values.copy()
+        crafting_times = crafting_times.copy()
+        resources = resources.copy()
+        for slot in range(upgrades):
+            values = np.trunc(values * self.value_multipliers[:, slot])
+            crafting_times *= self.time_multipliers[:, slot]
+            resources += self.resource_deltas[:, slot]
+        return values, crafting_times, resources
+
+    def active_upgrades(self, upgrades: int = len(UPGRADE_KEYS)) -> int:
+        """
+        :param upgrades: number of unlocked upgrade slots
+        :return: number of upgrades that change anything
+        """
+        active = (self.value_multipliers[:, :upgrades] != 1) | (self.time_multipliers[:, :upgrades] != 1)
+        active |= (self.quality_multipliers[:, :upgrades] != 1) | (self.multicraft_chances[:, :upgrades] != 0)
+        active |= (self.resource_deltas[:, :upgrades] != 0).any(axis=2)
+        active |= (self.component_deltas[:, :upgrades] != 0).any(axis=2)
+        return int(np.count_nonzero(active))
+
+    def quality(self, upgrades: int = len(UPGRADE_KEYS)) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param upgrades: number of unlocked upgrade slots
+        :return: quality chance multiplier and multicraft chance of every blueprint
+        """
+        return (
+            self.quality_multipliers[:, :upgrades].prod(axis=1),
+            self.multicraft_chances[:, :upgrades].sum(axis=1)
+        )
+
+    def apply_components(self, amounts: np.ndarray, upgrades: int = len(UPGRADE_KEYS)) -> np.ndarray:
+        """
+        :param amounts: base blueprints x COMPONENT_NAME_COLUMNS amounts
+        :param upgrades: number of unlocked upgrade slots
+        :return: upgraded amounts, never below 0
+        """
+        return np.maximum(amounts + self.component_deltas[:, :upgrades].sum(axis=1), 0)
+
+    def cumulative(self, values: np.ndarray, crafting_times: np.ndarray,
+                   resources: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Every upgrade state of every blueprint, so the state after any
+        number of unlocked upgrades is a lookup instead of a recalculation.
+        :return: values and crafting times (blueprints x upgrades + 1) and
+            resources (blueprints x upgrades + 1 x RESOURCES)
+        """
+        slots = len(UPGRADE_KEYS)
+        value_states = np.empty((len(values), slots + 1))
+        time_states = np.empty((len(values), slots + 1))
+        resource_states = np.empty((len(values), slots + 1, len(RESOURCES)))
+        value_states[:, 0], time_states[:, 0], resource_states[:, 0] = values, crafting_times, resources
+        for slot in range(slots):
+            value_states[:, slot + 1] = np.trunc(value_states[:, slot] * self.value_multipliers[:, slot])
+            time_states[:, slot + 1] = time_states[:, slot] * self.time_multipliers[:, slot]
+            resource_states[:, slot + 1] = resource_states[:, slot] + self.resource_deltas[:, slot]
+        return value_states, time_states, resource_states